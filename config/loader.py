@@ -5,7 +5,7 @@ from pydantic import ValidationError
 from rich.console import Console
 from rich.text import Text
 
-from .schemas import ModelsConfig, InputConfig, AppConfig
+from .schemas import ModelsConfig, InputConfig, AppConfig, PreprocessingConfig, HttpConfig
 
 console = Console()
 
@@ -17,6 +17,8 @@ class ConfigLoader:
         self.config_dir = config_dir or Path(__file__).parent
         self.models_config_path = self.config_dir / "yaml" / "model_config.yaml"
         self.input_config_path = self.config_dir / "yaml" / "input_config.yaml"
+        self.preprocessing_config_path = self.config_dir / "yaml" / "preprocessing_config.yaml"
+        self.http_config_path = self.config_dir / "yaml" / "http_config.yaml"
     
     def load_models_config(self) -> ModelsConfig:
         """Load and validate models configuration."""
@@ -52,6 +54,40 @@ class ConfigLoader:
         except yaml.YAMLError as e:
             raise ValueError(f"Invalid YAML in input config: {e}")
     
+    def load_preprocessing_config(self) -> PreprocessingConfig:
+        """Load and validate the image preprocessing configuration (optional, images are sent unchanged without it)."""
+        if not self.preprocessing_config_path.exists():
+            return PreprocessingConfig()
+        try:
+            with open(self.preprocessing_config_path, 'r') as f:
+                data = yaml.safe_load(f) or {}
+            return PreprocessingConfig(**data)
+        except ValidationError as e:
+            console.print(Text("❌ Preprocessing configuration validation failed:", style="bold red"))
+            for error in e.errors():
+                field = " -> ".join(str(loc) for loc in error['loc'])
+                console.print(Text(f"  {field}: {error['msg']}", style="red"))
+            raise
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML in preprocessing config: {e}")
+    
+    def load_http_config(self) -> HttpConfig:
+        """Load and validate the HTTP client pool configuration (optional, defaults are used without it)."""
+        if not self.http_config_path.exists():
+            return HttpConfig()
+        try:
+            with open(self.http_config_path, 'r') as f:
+                data = yaml.safe_load(f) or {}
+            return HttpConfig(**data)
+        except ValidationError as e:
+            console.print(Text("❌ HTTP configuration validation failed:", style="bold red"))
+            for error in e.errors():
+                field = " -> ".join(str(loc) for loc in error['loc'])
+                console.print(Text(f"  {field}: {error['msg']}", style="red"))
+            raise
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML in HTTP config: {e}")
+    
     def load_app_config(self, verbose: bool = True) -> AppConfig:
         """Load and validate complete application configuration."""
         models_config = self.load_models_config()
@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
-from pathlib import Path
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Dict, List, Literal, Optional
 import os
 
+from utils.archive import dataset_folder_exists
+from utils.catalog import list_images, list_subcategories
+
 
 class ModelConfig(BaseModel):
     """Configuration for a single model."""
@@ -12,6 +14,9 @@ class ModelConfig(BaseModel):
     link: Optional[str] = Field(None, description="URL link to model information or documentation")
     enabled: bool = Field(default=False, description="Whether the model is enabled")
     api_key_env: str = Field(..., description="Environment variable name for API key")
+    deadline: Optional[float] = Field(None, gt=0, description="Seconds after which a request is abandoned and recorded as failed, for a later retry (None waits for the SDK timeout)")
+    hedge: bool = Field(default=False, description="Send a duplicate request when one takes longer than the model's p95 latency")
+    max_output_tokens: Optional[int] = Field(None, ge=1, description="Output token limit of every request (with max_output_ratio, the lower of the two applies; None leaves the provider SDK's default)")
     
     @field_validator('api_key_env')
     def validate_api_key_exists(cls, v):
@@ -57,23 +62,37 @@ class InputPathConfig(BaseModel):
     path: str = Field(..., description="Path to the dataset directory")
     images_to_process: int = Field(default=1, ge=1, description="Number of images to process")
     prioritize_scanned: bool = Field(default=False, description="Prioritize images that have already been scanned")
+    lines_per_request: int = Field(default=1, ge=1, le=50, description="Number of line images packed into one request")
+    packing: Literal["images", "tile"] = Field(default="images", description="Send packed lines as separate images of one message or as one tiled image")
+    batch: bool = Field(default=False, description="Submit jobs through the providers' asynchronous batch endpoints where available")
+    stream: bool = Field(default=False, description="Stream responses to record time to first token and tokens per second")
+    max_hedge_rate: float = Field(default=0.05, ge=0, le=1, description="Maximum share of the requests of a hedged model that get a duplicate")
+    max_concurrency: int = Field(default=8, ge=1, le=64, description="Upper bound of the adaptive number of in-flight requests per model")
+    longest_first: bool = Field(default=True, description="Dispatch each model's jobs longest expected first (from past latency and ground truth length)")
+    output: Literal["auto", "verbose", "progress"] = Field(default="auto", description="Print every result ('verbose') or a live progress table per model with the results logged to logs/results ('progress'); 'auto' uses progress when not running in a terminal")
+    stratified: bool = Field(default=False, description="Evaluate a stratified sample of images_to_process images across every subcategory under path (e.g., the corpus root), reusing evaluated images first")
+    adaptive: bool = Field(default=False, description="Sample images per model until its CER confidence interval is narrow enough, reusing stored results (images_to_process becomes the budget of new images per model)")
+    target_cer_ci: float = Field(default=0.02, gt=0, le=1, description="Width of the 95% confidence interval of the mean CER at which adaptive sampling stops (0.02 = 2 points)")
+    min_images: int = Field(default=20, ge=2, description="Results a model needs before adaptive sampling may stop")
+    retry_failed: bool = Field(default=False, description="Only rerun the jobs of this path that failed in earlier runs")
+    max_output_ratio: Optional[float] = Field(default=None, ge=1.0, description="Limit output to this multiple of the ground truth length (aborting streamed generations early); reasoning tokens count towards the limit")
     
     @field_validator('path')
     def validate_path_exists(cls, v):
         """Validate that the path exists."""
-        if not Path(v).exists():
+        if not dataset_folder_exists(v):
             raise ValueError(f"Path does not exist: {v}")
         return v
     
-    @field_validator('path')
-    def validate_has_images(cls, v):
-        """Validate that the path contains PNG images."""
-        path = Path(v)
-        if path.exists():
-            png_files = list(path.glob("*.png"))
-            if not png_files:
-                raise ValueError(f"No PNG images found in: {v}")
-        return v
+    @model_validator(mode='after')
+    def validate_has_images(self):
+        """Validate that the path contains PNG images (or subcategories when stratified)."""
+        if self.stratified:
+            if not list_subcategories(self.path):
+                raise ValueError(f"No subcategories found under: {self.path}")
+        elif not list_images(self.path):
+            raise ValueError(f"No PNG images found in: {self.path}")
+        return self
 
 
 class InputConfig(BaseModel):
@@ -88,6 +107,54 @@ class InputConfig(BaseModel):
         return v
 
 
+class PreprocessingProfile(BaseModel):
+    """Image preprocessing applied before an image is sent to a model."""
+    target_height: Optional[int] = Field(None, ge=8, description="Downscale images taller than this height (pixels)")
+    color: Literal["original", "grayscale", "bilevel"] = Field(default="original", description="Color conversion")
+    bilevel_threshold: int = Field(default=128, ge=0, le=255, description="Gray level separating black from white in bilevel mode")
+    format: Literal["png", "webp"] = Field(default="png", description="Output format (always lossless)")
+
+
+class PreprocessingConfig(BaseModel):
+    """Configuration of the image preprocessing profiles and the providers using them."""
+    profiles: Dict[str, PreprocessingProfile] = Field(default_factory=dict, description="Named preprocessing profiles")
+    providers: Dict[str, str] = Field(default_factory=dict, description="Profile used by each provider (e.g., OpenAI: compact)")
+    default: Optional[str] = Field(None, description="Profile used by providers without their own (None sends images unchanged)")
+    
+    @model_validator(mode='after')
+    def validate_profiles_exist(self):
+        """Ensure every referenced profile is defined."""
+        referenced = set(self.providers.values()) | ({self.default} if self.default else set())
+        missing = referenced - set(self.profiles)
+        if missing:
+            raise ValueError(f"Undefined preprocessing profile(s): {', '.join(sorted(missing))}")
+        return self
+    
+    def profile_for(self, provider: str) -> Optional[str]:
+        """Get the name of the profile used by a provider (None if images are sent unchanged)."""
+        return self.providers.get(provider, self.default)
+
+
+class HttpPoolSettings(BaseModel):
+    """Connection pool and timeouts of the HTTP client shared by the models of a provider."""
+    max_connections: int = Field(default=32, ge=1, description="Maximum concurrent connections per pool")
+    max_keepalive_connections: int = Field(default=16, ge=0, description="Idle connections kept open for reuse")
+    keepalive_expiry: float = Field(default=120.0, ge=0, description="Seconds an idle connection is kept open")
+    connect_timeout: float = Field(default=10.0, gt=0, description="Seconds to establish a connection (including TLS)")
+    read_timeout: float = Field(default=600.0, gt=0, description="Seconds to wait for a response (reasoning models can take minutes)")
+    http2: bool = Field(default=True, description="Negotiate HTTP/2 when the server and the h2 package support it")
+
+
+class HttpConfig(BaseModel):
+    """Configuration of the shared HTTP client pools, with optional per-provider overrides."""
+    default: HttpPoolSettings = Field(default_factory=HttpPoolSettings, description="Settings of every provider's pool")
+    providers: Dict[str, HttpPoolSettings] = Field(default_factory=dict, description="Settings overriding the default per provider")
+    
+    def settings_for(self, provider: str) -> HttpPoolSettings:
+        """Get the pool settings of a provider."""
+        return self.providers.get(provider, self.default)
+
+
 class AppConfig(BaseModel):
     """Main application configuration combining models and inputs."""
     models_config: ModelsConfig
@@ -2,6 +2,7 @@ class BenchmarkDashboard {
     constructor() {
         this.data = {};
         this.manifest = {};
+        this.corpusRollup = null;
         this.modelLinks = {};
         this.router = new URLRouter();
         this.router.onViewChange = (view, params) => this.handleViewChange(view, params);
@@ -217,7 +218,7 @@ class BenchmarkDashboard {
                     <span class="metric">Accuracy: ${accuracy.toFixed(1)}%</span>
                     <span class="metric">CER: ${cer.toFixed(1)}%</span>
                     <span class="metric">WER: ${wer.toFixed(1)}%</span>
-                    <span class="metric">Time: ${time.toFixed(2)}s</span>
+                    <span class="metric">Time: ${time == null ? 'n/a' : `${time.toFixed(2)}s`}</span>
                 </div>
                 
                 <div class="model-response-text">${this.escapeHtml(response)}</div>
@@ -463,6 +464,16 @@ class BenchmarkDashboard {
                 });
             }
 
+            // Load the precomputed corpus rollup if available
+            if (manifest.rollups && manifest.rollups.corpus) {
+                try {
+                    this.corpusRollup = await this.fetchWithTimeout(`data/json/${manifest.rollups.corpus}`);
+                } catch (error) {
+                    console.warn('Could not load corpus rollup:', error.message);
+                    this.corpusRollup = null;
+                }
+            }
+
         } catch (error) {
             throw new Error(`Failed to load benchmark data: ${error.message}`);
         }
@@ -485,7 +496,33 @@ class BenchmarkDashboard {
         return this.escapeHtml(modelName);
     }
 
+    // Models evaluated only through batch APIs have no measured time (null)
+    formatTime(time) {
+        return time == null ? 'n/a' : time.toFixed(2);
+    }
+
+    fastestTime(times) {
+        const measured = times.filter(time => time != null);
+        return measured.length > 0 ? Math.min(...measured) : null;
+    }
+
     calculateModelAverages() {
+        // Use the precomputed corpus rollup (weighted by each model's image count) when available
+        if (this.corpusRollup) {
+            const modelAverages = {};
+            Object.entries(this.corpusRollup).forEach(([modelName, rollup]) => {
+                modelAverages[modelName] = {
+                    avg_wer: rollup.avg_wer,
+                    avg_cer: rollup.avg_cer,
+                    avg_accuracy: rollup.avg_accuracy,
+                    avg_time: rollup.avg_time,
+                    totalImages: rollup.images,
+                    benchmarkCount: rollup.subcategories
+                };
+            });
+            return modelAverages;
+        }
+
         const modelStats = {};
 
         // Collect all results for each model
@@ -538,17 +575,20 @@ class BenchmarkDashboard {
                 acc.wer += result.avg_wer * imageCount;
                 acc.cer += result.avg_cer * imageCount;
                 acc.accuracy += result.avg_accuracy * imageCount;
-                acc.time += result.avg_time * imageCount;
+                if (result.avg_time != null) {
+                    acc.time += result.avg_time * imageCount;
+                    acc.timeWeight += imageCount;
+                }
                 acc.totalWeight += imageCount;
 
                 return acc;
-            }, { wer: 0, cer: 0, accuracy: 0, time: 0, totalWeight: 0 });
+            }, { wer: 0, cer: 0, accuracy: 0, time: 0, totalWeight: 0, timeWeight: 0 });
 
             modelAverages[modelName] = {
                 avg_wer: weightedTotals.totalWeight > 0 ? weightedTotals.wer / weightedTotals.totalWeight : 0,
                 avg_cer: weightedTotals.totalWeight > 0 ? weightedTotals.cer / weightedTotals.totalWeight : 0,
                 avg_accuracy: weightedTotals.totalWeight > 0 ? weightedTotals.accuracy / weightedTotals.totalWeight : 0,
-                avg_time: weightedTotals.totalWeight > 0 ? weightedTotals.time / weightedTotals.totalWeight : 0,
+                avg_time: weightedTotals.timeWeight > 0 ? weightedTotals.time / weightedTotals.timeWeight : null,
                 totalImages: stats.totalImages,
                 benchmarkCount: count
             };
@@ -580,7 +620,7 @@ class BenchmarkDashboard {
             wer: Math.min(...allModels.map(m => m.avg_wer)),
             cer: Math.min(...allModels.map(m => m.avg_cer)),
             accuracy: Math.max(...allModels.map(m => m.avg_accuracy)),
-            time: Math.min(...allModels.map(m => m.avg_time))
+            time: this.fastestTime(allModels.map(m => m.avg_time))
         };
 
         let html = `
@@ -626,7 +666,7 @@ class BenchmarkDashboard {
             const werClass = modelData.avg_wer === best.wer ? 'best-score' : '';
             const cerClass = modelData.avg_cer === best.cer ? 'best-score' : '';
             const accClass = modelData.avg_accuracy === best.accuracy ? 'best-score' : '';
-            const timeClass = modelData.avg_time === best.time ? 'best-score' : '';
+            const timeClass = modelData.avg_time != null && modelData.avg_time === best.time ? 'best-score' : '';
 
             html += `
                 <tr>
@@ -635,7 +675,7 @@ class BenchmarkDashboard {
                     <td class="${accClass}">${modelData.avg_accuracy.toFixed(2)}</td>
                     <td class="${cerClass}">${modelData.avg_cer.toFixed(2)}</td>
                     <td class="${werClass}">${modelData.avg_wer.toFixed(2)}</td>
-                    <td class="${timeClass}">${modelData.avg_time.toFixed(2)}</td>
+                    <td class="${timeClass}">${this.formatTime(modelData.avg_time)}</td>
                     <td>${modelData.totalImages}</td>
                 </tr>`;
         });
@@ -668,6 +708,10 @@ class BenchmarkDashboard {
                     valueB = b.avg_wer;
                     break;
                 case 'time':
+                    // Models without a measured time go last either way
+                    if (a.avg_time == null || b.avg_time == null) {
+                        return (a.avg_time == null) - (b.avg_time == null);
+                    }
                     valueA = a.avg_time;
                     valueB = b.avg_time;
                     break;
@@ -794,7 +838,7 @@ class BenchmarkDashboard {
             const werClass = modelData.avg_wer === best.wer ? 'best-score' : '';
             const cerClass = modelData.avg_cer === best.cer ? 'best-score' : '';
             const accClass = modelData.avg_accuracy === best.accuracy ? 'best-score' : '';
-            const timeClass = modelData.avg_time === best.time ? 'best-score' : '';
+            const timeClass = modelData.avg_time != null && modelData.avg_time === best.time ? 'best-score' : '';
 
             html += `
                 <tr>
@@ -803,7 +847,7 @@ class BenchmarkDashboard {
                     <td class="${accClass}">${modelData.avg_accuracy.toFixed(2)}</td>
                     <td class="${cerClass}">${modelData.avg_cer.toFixed(2)}</td>
                     <td class="${werClass}">${modelData.avg_wer.toFixed(2)}</td>
-                    <td class="${timeClass}">${modelData.avg_time.toFixed(2)}</td>
+                    <td class="${timeClass}">${this.formatTime(modelData.avg_time)}</td>
                     <td>${modelData.images || 0}</td>
                 </tr>`;
         });
@@ -817,7 +861,7 @@ class BenchmarkDashboard {
             wer: Math.min(...models.map(m => subcategoryData[m].avg_wer)),
             cer: Math.min(...models.map(m => subcategoryData[m].avg_cer)),
             accuracy: Math.max(...models.map(m => subcategoryData[m].avg_accuracy)),
-            time: Math.min(...models.map(m => subcategoryData[m].avg_time))
+            time: this.fastestTime(models.map(m => subcategoryData[m].avg_time))
         };
         return best;
     }
@@ -887,7 +931,7 @@ class BenchmarkDashboard {
                     const werClass = modelData.avg_wer === best.wer ? 'best-score' : '';
                     const cerClass = modelData.avg_cer === best.cer ? 'best-score' : '';
                     const accClass = modelData.avg_accuracy === best.accuracy ? 'best-score' : '';
-                    const timeClass = modelData.avg_time === best.time ? 'best-score' : '';
+                    const timeClass = modelData.avg_time != null && modelData.avg_time === best.time ? 'best-score' : '';
 
                     html += `
                         <tr>
@@ -896,7 +940,7 @@ class BenchmarkDashboard {
                             <td class="${accClass}">${modelData.avg_accuracy.toFixed(2)}</td>
                             <td class="${cerClass}">${modelData.avg_cer.toFixed(2)}</td>
                             <td class="${werClass}">${modelData.avg_wer.toFixed(2)}</td>
-                            <td class="${timeClass}">${modelData.avg_time.toFixed(2)}</td>
+                            <td class="${timeClass}">${this.formatTime(modelData.avg_time)}</td>
                             <td>${modelData.images || 0}</td>
                         </tr>`;
                 });
@@ -71,7 +71,8 @@ class IndividualFileLoader {
                     wer: modelData.wer || 0,
                     cer: modelData.cer || 0,
                     accuracy: modelData.accuracy || 0,
-                    time: modelData.time || 0
+                    // None for batch results, whose latency isn't measured per request
+                    time: modelData.time ?? null
                 };
             } else {
                 console.warn(`Invalid data structure for model ${modelName} in ${filePath}`);
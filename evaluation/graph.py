@@ -4,9 +4,21 @@ import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend for crash fix
 import matplotlib.pyplot as plt
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional
 
-def create_graph(path: str):
-    """Create a graph of the accuracy, CER, and WER per evaluated model."""
+# Supported output formats (raster or vector)
+CHART_FORMATS = ("png", "svg")
+
+FIGURE_SIZE = (10, 6)
+
+# Figure reused by each worker process of the batch renderer
+_worker_figure = None
+
+
+def _load_frames(path: str):
+    """Load an aggregated JSON file into the dataframes used by the charts."""
     with open(f"{path}", "r") as f:
         data = json.load(f)
 
@@ -18,9 +30,11 @@ def create_graph(path: str):
     df_cer_wer = df[["model", "avg_cer", "avg_wer"]].melt(
         id_vars="model", var_name="metric", value_name="value"
     )
+    return df, df_cer_wer, model_order
 
-    fig, axes = plt.subplots(nrows=2, ncols=1, figsize=(10, 6))
 
+def _draw(fig, axes, df, df_cer_wer, model_order):
+    """Draw the accuracy and CER/WER bar plots on the given axes."""
     # --- Plot 1: Accuracy ---
     ax1 = axes[0]
     sns.barplot(
@@ -39,7 +53,7 @@ def create_graph(path: str):
     ax1.set_ylabel("")
     ax1.set_xlim(80, 100)
     ax1.set_xticks(range(80, 101, 5))
-    
+
     for container in ax1.containers:
         ax1.bar_label(container, fmt="%.2f", padding=3)
 
@@ -60,15 +74,84 @@ def create_graph(path: str):
     ax2.set_xlim(0, 100)
     ax2.set_xticks(range(0, 101, 10))
     ax2.legend(title="Metrics")
-    
+
     for container in ax2.containers:
         ax2.bar_label(container, fmt="%.2f", padding=3)
 
-    plt.tight_layout()
-    # plt.show()
-    plt.savefig(f"{path}.png")
+    fig.tight_layout()
+
+
+def chart_path(path: str, fmt: str) -> str:
+    """Get the chart output path for an aggregated JSON file."""
+    return f"{path}.{fmt}"
+
+
+def create_graph(path: str, fmt: str = "png") -> str:
+    """Create a graph of the accuracy, CER, and WER per evaluated model."""
+    if fmt not in CHART_FORMATS:
+        raise ValueError(f"Unsupported chart format: {fmt}. Supported: {CHART_FORMATS}")
+
+    df, df_cer_wer, model_order = _load_frames(path)
+
+    fig, axes = plt.subplots(nrows=2, ncols=1, figsize=FIGURE_SIZE)
+    try:
+        _draw(fig, axes, df, df_cer_wer, model_order)
+        # plt.show()
+        output_path = chart_path(path, fmt)
+        fig.savefig(output_path, format=fmt)
+    finally:
+        plt.close(fig)
+    return output_path
+
+
+def _init_worker():
+    """Create the figure template once per worker process."""
+    global _worker_figure
+    _worker_figure = plt.subplots(nrows=2, ncols=1, figsize=FIGURE_SIZE)
+
+
+def _render_in_worker(path: str, fmt: str) -> str:
+    """Render a chart in a worker process, reusing its figure template."""
+    fig, axes = _worker_figure
+    for ax in axes:
+        ax.clear()
+
+    df, df_cer_wer, model_order = _load_frames(path)
+    _draw(fig, axes, df, df_cer_wer, model_order)
+    output_path = chart_path(path, fmt)
+    fig.savefig(output_path, format=fmt)
+    return output_path
+
+
+def create_graphs(paths: Iterable[str], fmt: str = "png", workers: Optional[int] = None) -> List[str]:
+    """Render the charts of many aggregated JSON files in one batch.
+
+    Charts are rendered by a pool of worker processes that import matplotlib/seaborn
+    once and reuse the same figure for every chart they draw.
+
+    Args:
+        paths: Aggregated JSON files (e.g., 'docs/data/json/GT4HistOCR/corpus/EarlyModernLatin/1471-Orthographia-Tortellius.json')
+        fmt: Output format, 'png' or 'svg'
+        workers: Number of worker processes (defaults to the number of CPUs)
+
+    Returns:
+        List of written chart paths, in the same order as the input paths
+    """
+    if fmt not in CHART_FORMATS:
+        raise ValueError(f"Unsupported chart format: {fmt}. Supported: {CHART_FORMATS}")
+
+    paths = list(paths)
+    if not paths:
+        return []
+
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers == 1:
+        return [create_graph(path, fmt) for path in paths]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        return list(executor.map(_render_in_worker, paths, [fmt] * len(paths)))
 
 
 if  __name__ == "__main__":
     # Manual creation if needed
-    create_graph("docs/data/json/GT4HistOCR/corpus/EarlyModernLatin/1471-Orthographia-Tortellius.json")
\ No newline at end of file
+    create_graph("docs/data/json/GT4HistOCR/corpus/EarlyModernLatin/1471-Orthographia-Tortellius.json")
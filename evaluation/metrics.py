@@ -1,8 +1,9 @@
 from diff_match_patch import diff_match_patch
 from jiwer import wer, cer
-from bert_score import score
 from rich.text import Text
 
+from utils.archive import read_dataset_buffer
+
 def get_diff(candidate: str, reference: str):
     """Get the differences between the candidate and reference strings."""
     dmp = diff_match_patch()
@@ -44,8 +45,24 @@ def get_metrics(candidate: str, reference: str):
     
     return w_error, c_error
 
+def score_transcription(gt_path: str, transcription: str):
+    """Read the ground truth of an image and score a transcription against it.
+
+    Runs in the worker processes of the scoring pipeline, so it only takes and returns picklable values
+    (and this module must stay cheap to import, see get_bert_score).
+
+    Returns:
+        Tuple of (ground truth, diff, accuracy, WER, CER)
+    """
+    gt = str(read_dataset_buffer(gt_path), 'utf-8').rstrip('\n')  # Fixed issue with /n impacting accuracy metrics...
+    diff, accuracy = get_diff(gt, transcription)
+    wer, cer = get_metrics(gt, transcription)
+    return gt, diff, accuracy, wer, cer
+
 # Not in use for now (there's no reason at the moment to dig on semantic acceptability or meaning preservation)
 def get_bert_score(candidate: str, reference: str):
     """Get the BERT score between the candidate and reference strings."""
+    # Imported here, loading the model stack would slow down every scoring worker
+    from bert_score import score
     P, R, F1 = score([candidate], [reference], lang="en", verbose=True)
     return P, R, F1
\ No newline at end of file
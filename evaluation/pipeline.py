@@ -0,0 +1,53 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# The pool starts while request threads are running, and forking a multi-threaded process
+# can leave locks (HTTP clients, logging) held forever in the children; workers are
+# forked from a clean single-threaded server instead, or spawned where there is none
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class ScoringPipeline:
+    """Scores responses in worker processes and reports them from a single writer thread.
+
+    Keeps the event loop free for network I/O: diffs and error rates are computed by
+    a pool of worker processes, printing and saving results (which must not interleave,
+    several models write to the same result files) by one writer thread. At most
+    max_pending results are in the pipeline; more wait for a place (backpressure), so
+    requests hold their concurrency slot and dispatch slows down to the scoring speed.
+
+    Use it as an async context manager, the pools are shut down on exit. Scoring
+    functions should live in modules that are cheap to import (see START_METHOD).
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: int = 64):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._scorers: Optional[ProcessPoolExecutor] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        self._scorers = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(START_METHOD))
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="writer")
+        self._slots = asyncio.Semaphore(self.max_pending)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._writer.shutdown)
+        await loop.run_in_executor(None, self._scorers.shutdown)
+
+    async def process(self, score: Callable, args: tuple, report: Callable[..., T]) -> T:
+        """Run score(*args) in a worker process, then report(*scores) in the writer thread.
+
+        score and its arguments must be picklable (a module level function and plain values).
+        """
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            scores = await loop.run_in_executor(self._scorers, score, *args)
+            return await loop.run_in_executor(self._writer, report, *scores)
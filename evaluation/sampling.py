@@ -0,0 +1,202 @@
+import json
+import math
+import random
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from evaluation.stats import CONFIDENCE_LEVEL, METRICS, MetricStats, add_result, new_model_stats
+from utils.catalog import result_path
+
+# Metrics stored as percentages in the per-image results
+PERCENT_METRICS = ("wer", "cer", "accuracy")
+# Two-sided normal quantile of CONFIDENCE_LEVEL, to size the next round
+Z_SCORE = 1.96
+
+
+def load_stored_results(image_paths: Iterable[str], names: Dict[str, str]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Stored metrics of images, as fractions like the results of a run.
+
+    Args:
+        image_paths: Images to look up
+        names: Key to use for each model display name in the stored results (e.g., model ID)
+
+    Returns:
+        Metrics per image per model key
+    """
+    stored = {key: {} for key in names.values()}
+    for image_path in image_paths:
+        path = result_path(image_path)
+        if not path.exists():
+            continue
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            continue
+        for display_name, key in names.items():
+            metrics = data.get(display_name)
+            if isinstance(metrics, dict) and all(metric in metrics for metric in METRICS):
+                stored[key][image_path] = {metric: metrics[metric] / 100 if metric in PERCENT_METRICS else metrics[metric]
+                                           for metric in METRICS}
+    return stored
+
+
+class SequentialSampler:
+    """Sequential sampling of the images of each model until its mean CER is known precisely enough.
+
+    Stored results count first. A model then gets rounds of new images until the
+    confidence interval of its mean CER is at most target_width wide (with at least
+    min_images results), its budget of new evaluations is spent, or no images are
+    left. Rounds are sized from the observed CER variance, so models with a stable
+    CER stop after few calls and noisy ones get more; a round has at least
+    min_round_size images (budget and images permitting), as each one is a run of its
+    own and tiny rounds would barely use the concurrency of the models.
+
+    Every model draws new images in the same random order, so models tend to be
+    evaluated on the same images.
+    """
+
+    def __init__(self, image_paths: List[str], stored: Dict[str, Dict[str, Dict[str, float]]], target_width: float,
+                 budget: int, min_images: int = 20, round_size: int = 20, min_round_size: int = 10,
+                 seed: Optional[int] = None):
+        self.target_width = target_width
+        self.budget = budget
+        self.min_images = min_images
+        self.round_size = round_size
+        self.min_round_size = min_round_size
+        order = list(image_paths)
+        random.Random(seed).shuffle(order)
+        self.stats: Dict[str, Dict[str, MetricStats]] = {}
+        self.remaining: Dict[str, List[str]] = {}
+        self.reused: Dict[str, int] = {}
+        self.spent: Dict[str, int] = {}
+        for model, results in stored.items():
+            self.stats[model] = new_model_stats()
+            for result in results.values():
+                add_result(self.stats[model], result)
+            self.reused[model] = len(results)
+            self.remaining[model] = [image_path for image_path in order if image_path not in results]
+            self.spent[model] = 0
+
+    def width(self, model: str) -> Optional[float]:
+        """Width of the confidence interval of a model's mean CER, None before two results."""
+        interval = self.stats[model]["cer"].interval(CONFIDENCE_LEVEL)
+        return interval[1] - interval[0] if interval else None
+
+    def converged(self, model: str) -> bool:
+        width = self.width(model)
+        return self.stats[model]["cer"].count >= self.min_images and width is not None and width <= self.target_width
+
+    def status(self, model: str) -> str:
+        """Why a model stopped (or 'sampling' while it hasn't)."""
+        if self.converged(model):
+            return "converged"
+        if self.spent[model] >= self.budget:
+            return "budget spent"
+        if not self.remaining[model]:
+            return "no images left"
+        return "sampling"
+
+    def _round_size(self, model: str) -> int:
+        cer = self.stats[model]["cer"]
+        if cer.count < 2:
+            # No variance to go by yet
+            return max(self.min_round_size, self.min_images - cer.count, 1)
+        # Results needed for the target width under a normal approximation of the mean
+        needed = math.ceil((2 * Z_SCORE) ** 2 * cer.variance / self.target_width ** 2)
+        return max(min(self.round_size, needed - cer.count), self.min_images - cer.count, self.min_round_size, 1)
+
+    def next_round(self) -> Dict[str, List[str]]:
+        """Images to evaluate next for every model still sampling (empty once all stopped)."""
+        selected = {}
+        for model in self.stats:
+            if self.status(model) != "sampling":
+                continue
+            size = min(self._round_size(model), self.budget - self.spent[model])
+            selected[model] = self.remaining[model][:size]
+            self.remaining[model] = self.remaining[model][size:]
+            self.spent[model] += len(selected[model])
+        return selected
+
+    def update(self, model: str, stats: Dict[str, MetricStats]) -> None:
+        """Merge the results of a round of a model."""
+        for metric, metric_stats in stats.items():
+            self.stats[model].setdefault(metric, MetricStats()).merge(metric_stats)
+
+
+LENGTH_BANDS = ("short", "medium", "long")
+
+
+def period_of(subcategory: str) -> str:
+    """Century of a subcategory from the year it starts with (e.g., '1471-Orthographia-Tortellius' -> '15th c.')."""
+    match = re.match(r"(\d{4})", subcategory)
+    return f"{int(match.group(1)) // 100 + 1}th c." if match else "undated"
+
+
+def stratum_keys(entries: List[Dict]) -> Dict[str, Tuple[str, str, str]]:
+    """Stratum of every cataloged image: (category, period, line length band).
+
+    Categories are the corpus collections, which differ by language and typeface;
+    length bands split the lines of the given entries into terciles of ground truth length.
+    """
+    lengths = sorted(entry["gt_length"] or 0 for entry in entries)
+    cuts = [lengths[len(lengths) * n // 3] for n in (1, 2)] if lengths else [0, 0]
+
+    def band(length: int) -> str:
+        return LENGTH_BANDS[sum(length >= cut for cut in cuts)]
+
+    return {entry["path"]: (entry["category"], period_of(entry["subcategory"]), band(entry["gt_length"] or 0))
+            for entry in entries}
+
+
+def allocate(sizes: Dict[Tuple, int], total: int) -> Dict[Tuple, int]:
+    """Split a sample size across strata in proportion to their sizes (largest remainder).
+
+    Every stratum gets at least one image when the sample is large enough, so small
+    strata are represented; no stratum gets more images than it has.
+    """
+    total = min(total, sum(sizes.values()))
+    weight = sum(sizes.values())
+    quotas = {key: total * size / weight for key, size in sizes.items()}
+    allocation = {key: min(size, int(quotas[key])) for key, size in sizes.items()}
+    if total >= len(sizes):
+        allocation = {key: max(count, 1) if sizes[key] else 0 for key, count in allocation.items()}
+    # Take back from the strata furthest above their quota, then hand out to those furthest below
+    while sum(allocation.values()) > total:
+        key = max(allocation, key=lambda key: allocation[key] - quotas[key] if allocation[key] > 1 else -math.inf)
+        allocation[key] -= 1
+    while sum(allocation.values()) < total:
+        key = max((key for key in sizes if allocation[key] < sizes[key]), key=lambda key: quotas[key] - allocation[key])
+        allocation[key] += 1
+    return allocation
+
+
+def stratified_sample(entries: List[Dict], total: int, evaluated: Optional[Dict[str, int]] = None,
+                      seed: Optional[int] = None) -> List[str]:
+    """Draw a sample of cataloged images spread proportionally over strata (see stratum_keys).
+
+    Within a stratum, images already evaluated by the most models are taken first, so
+    the sample reuses stored results and only the missing evaluations cost API calls;
+    ties are broken at random.
+
+    Args:
+        entries: Catalog entries to draw from
+        total: Sample size
+        evaluated: Number of models with a stored result of each image
+
+    Returns:
+        Image paths, sorted
+    """
+    evaluated = evaluated or {}
+    rng = random.Random(seed)
+    strata: Dict[Tuple, List[str]] = {}
+    for path, key in stratum_keys(entries).items():
+        strata.setdefault(key, []).append(path)
+    allocation = allocate({key: len(paths) for key, paths in strata.items()}, total)
+
+    sample = []
+    for key, paths in strata.items():
+        rng.shuffle(paths)
+        paths.sort(key=lambda path: evaluated.get(path, 0), reverse=True)
+        sample.extend(paths[:allocation[key]])
+    return sorted(sample)
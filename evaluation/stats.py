@@ -0,0 +1,328 @@
+import math
+import random
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Default seed of the bootstrap replicates, so re-aggregating the same results gives the same intervals
+BOOTSTRAP_SEED = "ocr-benchmark"
+
+
+class TDigest:
+    """Mergeable quantile sketch (merging t-digest).
+
+    Keeps a bounded number of weighted centroids, dense at the tails, so percentiles
+    of large streams can be estimated and digests of separate shards can be merged.
+    """
+
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self._centroids: List[List[float]] = []  # [mean, weight], sorted by mean
+        self._buffer: List[List[float]] = []
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        """Add a value to the digest."""
+        self._buffer.append([value, weight])
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) > 5 * self.compression:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> None:
+        """Merge another digest into this one."""
+        self._buffer.extend([list(c) for c in other._centroids])
+        self._buffer.extend([list(c) for c in other._buffer])
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _scale(self, q: float) -> float:
+        """Scale function k1: allows small centroids near the tails, bigger ones in the middle."""
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def _compress(self) -> None:
+        points = sorted(self._centroids + self._buffer, key=lambda c: c[0])
+        self._buffer = []
+        if not points:
+            self._centroids = []
+            return
+
+        total = sum(w for _, w in points)
+        merged = []
+        weight_before = 0.0
+        current = list(points[0])
+        for mean, weight in points[1:]:
+            proposed = current[1] + weight
+            if self._scale((weight_before + proposed) / total) - self._scale(weight_before / total) <= 1:
+                current[0] += (mean - current[0]) * weight / proposed
+                current[1] = proposed
+            else:
+                merged.append(current)
+                weight_before += current[1]
+                current = [mean, weight]
+        merged.append(current)
+        self._centroids = merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-th quantile (0 <= q <= 1). Returns None for an empty digest."""
+        if self._buffer:
+            self._compress()
+        if not self._centroids:
+            return None
+        if len(self._centroids) == 1 or q <= 0:
+            return self.min if q <= 0 else self._centroids[0][0]
+        if q >= 1:
+            return self.max
+
+        total = sum(w for _, w in self._centroids)
+        target = q * total
+
+        # Interpolate between centroid centers, using min/max as the outer anchors
+        previous_position, previous_value = 0.0, self.min
+        cumulative = 0.0
+        for mean, weight in self._centroids:
+            position = cumulative + weight / 2
+            if target < position:
+                span = position - previous_position
+                fraction = (target - previous_position) / span if span > 0 else 0
+                return previous_value + (mean - previous_value) * fraction
+            previous_position, previous_value = position, mean
+            cumulative += weight
+
+        span = total - previous_position
+        fraction = (target - previous_position) / span if span > 0 else 0
+        return previous_value + (self.max - previous_value) * fraction
+
+    def to_list(self) -> List[List[float]]:
+        """Serialize the centroids for JSON storage."""
+        self._compress()
+        return [[round(mean, 4), weight] for mean, weight in self._centroids]
+
+    @classmethod
+    def from_list(cls, centroids: Iterable[Iterable[float]], minimum: float, maximum: float,
+                  compression: float = 100) -> "TDigest":
+        """Rebuild a digest from serialized centroids."""
+        digest = cls(compression)
+        digest._centroids = sorted([list(c) for c in centroids], key=lambda c: c[0])
+        digest.min = minimum
+        digest.max = maximum
+        return digest
+
+
+class PoissonBootstrap:
+    """Mergeable bootstrap of the mean (Poisson bootstrap).
+
+    Each replicate weights every observation by a Poisson(1) draw instead of resampling
+    the whole dataset, so replicates are built in a single pass and merged across shards
+    by adding their sums. Draws are seeded (see BOOTSTRAP_SEED), so the same
+    observations added in the same order give the same interval.
+    """
+
+    def __init__(self, replicates: int = 200, rng: Optional[random.Random] = None, seed: Any = BOOTSTRAP_SEED):
+        self.replicates = replicates
+        self.sums = [0.0] * replicates
+        self.weights = [0] * replicates
+        self._rng = rng or random.Random(seed)
+
+    def draw(self) -> List[int]:
+        """Draw the replicate weights of one observation."""
+        limit = math.exp(-1)
+        weights = []
+        for _ in range(self.replicates):
+            k, p = 0, self._rng.random()
+            while p > limit:
+                k += 1
+                p *= self._rng.random()
+            weights.append(k)
+        return weights
+
+    def add(self, value: float, weights: Optional[List[int]] = None) -> None:
+        """Add an observation, optionally with weights shared with other metrics of the same image."""
+        weights = weights or self.draw()
+        for i, weight in enumerate(weights):
+            if weight:
+                self.sums[i] += weight * value
+                self.weights[i] += weight
+
+    def merge(self, other: "PoissonBootstrap") -> None:
+        """Merge the replicates of another shard."""
+        for i in range(min(self.replicates, other.replicates)):
+            self.sums[i] += other.sums[i]
+            self.weights[i] += other.weights[i]
+
+    def interval(self, level: float = 0.95) -> Optional[Tuple[float, float]]:
+        """Percentile confidence interval of the mean. Returns None without data."""
+        means = sorted(s / w for s, w in zip(self.sums, self.weights) if w)
+        if len(means) < 2:
+            return None
+        tail = (1 - level) / 2
+        low = means[int(tail * (len(means) - 1))]
+        high = means[int(math.ceil((1 - tail) * (len(means) - 1)))]
+        return (low, high)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the replicates for JSON storage."""
+        return {"sums": [round(s, 4) for s in self.sums], "weights": self.weights}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PoissonBootstrap":
+        """Rebuild replicates from their serialized form."""
+        bootstrap = cls(len(data["sums"]))
+        bootstrap.sums = list(data["sums"])
+        bootstrap.weights = list(data["weights"])
+        return bootstrap
+
+
+class MetricStats:
+    """Single-pass, mergeable summary of a metric: count, mean, variance, min/max and quantiles."""
+
+    def __init__(self, seed: Any = BOOTSTRAP_SEED):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean (Welford)
+        self.digest = TDigest()
+        self.bootstrap: Optional[PoissonBootstrap] = PoissonBootstrap(seed=seed)
+
+    def add(self, value: float, weights: Optional[List[int]] = None) -> None:
+        """Add a single observation.
+
+        Args:
+            value: Observed value
+            weights: Bootstrap weights of the observation, pass the same draw to the
+                metrics of one result so they are resampled together
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.digest.add(value)
+        if self.bootstrap is not None:
+            self.bootstrap.add(value, weights)
+
+    def merge(self, other: "MetricStats") -> None:
+        """Merge the summary of another shard (Chan et al. parallel update)."""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+        else:
+            total = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / total
+            self.m2 += other.m2 + delta * delta * self.count * other.count / total
+            self.count = total
+        self.digest.merge(other.digest)
+        if self.bootstrap is not None and other.bootstrap is not None:
+            self.bootstrap.merge(other.bootstrap)
+        else:
+            # Summaries approximated from averages have no replicates to merge
+            self.bootstrap = None
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 for less than two observations)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-th quantile (0 <= q <= 1)."""
+        return self.digest.quantile(q)
+
+    def interval(self, level: float = 0.95) -> Optional[Tuple[float, float]]:
+        """Bootstrap confidence interval of the mean."""
+        return self.bootstrap.interval(level) if self.bootstrap is not None else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the summary for JSON storage."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": self.digest.min if self.count else None,
+            "max": self.digest.max if self.count else None,
+            "digest": self.digest.to_list(),
+            "bootstrap": self.bootstrap.to_dict() if self.bootstrap is not None else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MetricStats":
+        """Rebuild a summary from its serialized form."""
+        stats = cls()
+        stats.count = data["count"]
+        stats.mean = data["mean"]
+        stats.m2 = data["m2"]
+        if stats.count:
+            stats.digest = TDigest.from_list(data["digest"], data["min"], data["max"])
+        bootstrap = data.get("bootstrap")
+        stats.bootstrap = PoissonBootstrap.from_dict(bootstrap) if bootstrap else None
+        return stats
+
+    @classmethod
+    def from_values(cls, values: Iterable[float]) -> "MetricStats":
+        """Build a summary from a sequence of observations."""
+        stats = cls()
+        for value in values:
+            stats.add(value)
+        return stats
+
+
+# Metrics stored for every model result, with the prefix used in aggregated files
+METRICS = ("wer", "cer", "accuracy", "time")
+# Metrics only stored for streamed results (time to first token, generation speed)
+STREAMING_METRICS = ("ttft", "tokens_per_sec")
+PERCENTILES = (50, 90, 99)
+CONFIDENCE_LEVEL = 0.95
+
+
+def summarize(stats: Dict[str, MetricStats]) -> Dict[str, Any]:
+    """Flatten metric summaries into the fields stored in aggregated files.
+
+    Args:
+        stats: Summary per metric name (e.g., {'wer': MetricStats, ...})
+
+    Returns:
+        Dictionary with avg_*, var_*, p<N>_* and ci95_* fields, None for metrics without
+        values (e.g., time of batch results). Streaming metrics are only included when
+        some results were streamed, with their count in 'streamed'.
+    """
+    metrics = METRICS + tuple(metric for metric in STREAMING_METRICS if metric in stats and stats[metric].count)
+    fields = {}
+    for metric in metrics:
+        fields[f"avg_{metric}"] = stats[metric].mean if stats[metric].count else None
+    for metric in metrics:
+        fields[f"var_{metric}"] = stats[metric].variance if stats[metric].count else None
+    for percentile in PERCENTILES:
+        for metric in metrics:
+            fields[f"p{percentile}_{metric}"] = stats[metric].quantile(percentile / 100)
+    for metric in metrics:
+        interval = stats[metric].interval(CONFIDENCE_LEVEL)
+        fields[f"ci95_{metric}"] = list(interval) if interval else None
+    if len(metrics) > len(METRICS):
+        fields["streamed"] = stats["ttft"].count
+    return fields
+
+
+def new_model_stats(seed: Any = BOOTSTRAP_SEED) -> Dict[str, MetricStats]:
+    """Create empty summaries for every metric of a model.
+
+    Args:
+        seed: Seed of the bootstrap draws, give shards that are merged later different
+            seeds (e.g., their folder and model) so their draws are independent
+    """
+    return {metric: MetricStats(seed=f"{seed}/{metric}") for metric in METRICS + STREAMING_METRICS}
+
+
+def add_result(stats: Dict[str, MetricStats], result: Dict[str, float]) -> None:
+    """Add one result to the summaries of a model, resampling its metrics together.
+
+    Args:
+        stats: Summaries per metric, as created by new_model_stats()
+        result: Metric values of one image (e.g., {'wer': 12.5, 'cer': 3.1, ...}), streaming
+            metrics are optional and time is None for batch results
+    """
+    weights = stats[METRICS[0]].bootstrap.draw() if stats[METRICS[0]].bootstrap is not None else None
+    for metric in METRICS:
+        if result[metric] is not None:
+            stats[metric].add(result[metric], weights)
+    for metric in STREAMING_METRICS:
+        if result.get(metric) is not None:
+            stats.setdefault(metric, MetricStats()).add(result[metric], weights)
@@ -1,16 +1,16 @@
-from utils.encoding import image_to_base64, image_to_bytes, model_check
-from agno.agent import Agent
+from utils.encoding import model_check
+from utils.preprocess import load_image
+from models.model_utils import get_model_provider, output_token_attribute
+from typing import Optional, Sequence, Tuple
+import base64
+import math
+import time
+from agno.agent import Agent, RunResponse
 from agno.media import Image
+from agno.run.response import RunResponseContentEvent
 
-def create_agent(model) -> Agent:
-    """Create an agent instance with the given model."""
-    return Agent(
-        model=model,
-        markdown=True,
-        retries=4,
-        delay_between_retries=3,
-        exponential_backoff=True,
-        system_message="""
+# Instructions shared by every request, synchronous or batched
+SYSTEM_MESSAGE = """
         
            You are a transcription expert trained on historical texts from Early Modern Europe (1500–1800), including German, Latin and Greek printed works. Your task is to extract the exact textual content from a scanned image, strictly preserving all visual details and typographic features.
            Do not modernize or normalize. Understand the text and use the correct spacing and characters. Sometimes some words that should be separate looks like they are stuck together due to limited spacing, so be aware of that.
@@ -37,13 +37,104 @@ def create_agent(model) -> Agent:
             
             Output only the literal, character-accurate transcription of the image content. No formatting, metadata, summaries, or commentary.
             
-        """,
+        """
+
+# Tokens allowed on top of the ground truth based output limit (line numbers, whitespace)
+OUTPUT_TOKEN_MARGIN = 16
+
+# Retries of a failed request (retryable errors only), waiting RETRY_DELAY * 2^attempt seconds between attempts
+RETRIES = 4
+RETRY_DELAY = 3
+
+# Prompt sent with each line image
+PROMPT = "What text do you see in this image? Please provide an accurate transcription. Return only the transcription, nothing else."
+
+def create_agent(model) -> Agent:
+    """Create an agent instance with the given model."""
+    return Agent(
+        model=model,
+        markdown=True,
+        # Retries are left to the scheduler, which only retries retryable errors
+        retries=0,
+        system_message=SYSTEM_MESSAGE,
     )
 
-def create_image_obj(model, image_path: str) -> Image:
-    """Create an image object for the given model and image path."""
+def create_image_obj(model, image_path: str, payload: Optional[Tuple] = None) -> Image:
+    """Create an image object for the given model and image path.
+    
+    The image is preprocessed with the profile of the model's provider, unless an
+    already loaded payload (image bytes, MIME type, profile name) is given.
+    """
+    data, mime_type, _ = payload or load_image(image_path, get_model_provider(model.id))
     if model_check(model) == "bytes":
-        return Image(content=image_to_bytes(image_path))
+        return Image(content=bytes(data), format=mime_type.split("/")[1])
     elif model_check(model) == "base64":
-        return Image(url=f"data:image/png;base64,{image_to_base64(image_path)}")
-    return None
\ No newline at end of file
+        return Image(url=f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}")
+    return None
+
+def output_token_limit(gt_chars: int, ratio: float) -> int:
+    """Output tokens allowed for a transcription of gt_chars characters, assuming at most one token per character."""
+    return math.ceil(gt_chars * ratio) + OUTPUT_TOKEN_MARGIN
+
+def cap_output_tokens(model, max_tokens: int, configured: Optional[int] = None) -> int:
+    """Limit the output tokens of every request of a model.
+    
+    The limit is set afresh on every call, so a run with longer ground truth raises
+    the limit of an earlier one. A limit configured for the model (max_output_tokens
+    in its config, not the SDK's default) still applies when it is lower.
+    
+    Returns:
+        The limit set, which a truncated response reaches
+    """
+    limit = min(configured, max_tokens) if configured else max_tokens
+    setattr(model, output_token_attribute(model), limit)
+    return limit
+
+def run_streaming(agent: Agent, prompt: str, images: Sequence[Image],
+                  max_chars: Optional[int] = None) -> Tuple[RunResponse, Optional[float], Optional[float], bool]:
+    """Run an agent with a streamed response, timing the first token and the generation speed.
+    
+    Output tokens are taken from the run metrics when the provider reports them,
+    otherwise each streamed content chunk counts as one token. With max_chars, the
+    generation is aborted as soon as the output grows longer, and the partial output
+    is returned as the response.
+    
+    Returns:
+        Tuple of (complete or partial response, time to first token in seconds or None
+        if nothing was streamed, output tokens per second after the first token or None,
+        whether the generation was aborted)
+    """
+    start = time.perf_counter()
+    first_token = None
+    chunks = []
+    length = 0
+    truncated = False
+    stream = agent.run(prompt, images=images, stream=True)
+    try:
+        for event in stream:
+            if isinstance(event, RunResponseContentEvent) and event.content:
+                if first_token is None:
+                    first_token = time.perf_counter()
+                chunks.append(str(event.content))
+                length += len(chunks[-1])
+                if max_chars is not None and length > max_chars:
+                    truncated = True
+                    break
+    finally:
+        # Closing the generator drops the connection, so the provider stops generating
+        stream.close()
+    end = time.perf_counter()
+    
+    if truncated:
+        response = RunResponse(content="".join(chunks), model=getattr(agent.model, "id", None))
+    else:
+        response = agent.run_response if agent.run_response is not None else RunResponse()
+        if not response.content and chunks:
+            response.content = "".join(chunks)
+    if first_token is None:
+        return response, None, None, truncated
+    
+    output_tokens = (0 if truncated else sum((response.metrics or {}).get("output_tokens") or [])) or len(chunks)
+    generation_time = end - first_token
+    tokens_per_sec = output_tokens / generation_time if generation_time > 0 else None
+    return response, first_token - start, tokens_per_sec, truncated
@@ -0,0 +1,205 @@
+import base64
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from models.agent import PROMPT, SYSTEM_MESSAGE
+from models.model_utils import get_model_provider
+from utils.atomic import atomic_write_json
+from utils.preprocess import load_image
+
+BATCH_STATE_DIR = Path(".cache/batches")
+POLL_INTERVAL = 30  # Seconds between status checks
+
+# Providers whose batch endpoint speaks the OpenAI batch protocol, with their default base URL
+OPENAI_COMPATIBLE_BATCH_URLS = {
+    "OpenAI": "https://api.openai.com/v1",
+    "Groq": "https://api.groq.com/openai/v1",
+}
+
+
+@dataclass
+class BatchJob:
+    """A single (image, model) request of a batch."""
+    custom_id: str
+    model_id: str
+    image_path: str
+    payload_bytes: int = 0
+    preprocessing: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    """Outcome of a batch job: the transcription or the error returned for it."""
+    content: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchStatus:
+    """Status of a submitted batch."""
+    state: str
+    done: bool
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+class BatchTransport:
+    """Interface to a provider's asynchronous batch endpoint.
+
+    Implementations submit a list of chat requests (keyed by custom_id), report the
+    batch status and return the results once it is done.
+    """
+
+    def submit(self, requests: List[Dict]) -> str:
+        """Submit requests ({'custom_id', 'body'}) and return the batch ID."""
+        raise NotImplementedError
+
+    def status(self, batch_id: str) -> BatchStatus:
+        """Get the status of a batch."""
+        raise NotImplementedError
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        """Get the results of a finished batch, keyed by custom_id."""
+        raise NotImplementedError
+
+
+class OpenAIBatchTransport(BatchTransport):
+    """Transport for the OpenAI batch protocol (upload a JSONL file, create a batch, download its output)."""
+
+    TERMINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+    def __init__(self, api_key: str, base_url: str = OPENAI_COMPATIBLE_BATCH_URLS["OpenAI"],
+                 completion_window: str = "24h", timeout: float = 60):
+        self.base_url = base_url.rstrip("/")
+        self.completion_window = completion_window
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def submit(self, requests: List[Dict]) -> str:
+        lines = "\n".join(json.dumps({"custom_id": request["custom_id"], "method": "POST",
+                                      "url": "/v1/chat/completions", "body": request["body"]})
+                          for request in requests)
+        file_id = self._request("POST", "/files", data={"purpose": "batch"},
+                                files={"file": ("batch.jsonl", lines.encode("utf-8"), "application/jsonl")}).json()["id"]
+        batch = self._request("POST", "/batches", json={
+            "input_file_id": file_id,
+            "endpoint": "/v1/chat/completions",
+            "completion_window": self.completion_window
+        }).json()
+        return batch["id"]
+
+    def status(self, batch_id: str) -> BatchStatus:
+        batch = self._request("GET", f"/batches/{batch_id}").json()
+        return BatchStatus(state=batch["status"], done=batch["status"] in self.TERMINAL_STATES,
+                           counts=batch.get("request_counts") or {})
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        batch = self._request("GET", f"/batches/{batch_id}").json()
+        results = {}
+        # Successful requests are in the output file, failed ones in the error file
+        for file_key in ("output_file_id", "error_file_id"):
+            if not batch.get(file_key):
+                continue
+            content = self._request("GET", f"/files/{batch[file_key]}/content").text
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                if response.get("status_code") == 200:
+                    message = response["body"]["choices"][0]["message"]
+                    results[entry["custom_id"]] = BatchResult(content=message.get("content") or "")
+                else:
+                    error = entry.get("error") or response.get("body", {}).get("error") or response
+                    results[entry["custom_id"]] = BatchResult(error=json.dumps(error))
+        return results
+
+
+def get_batch_transport(model) -> Optional[BatchTransport]:
+    """Get the batch transport of a model's provider, None if it has no supported batch endpoint.
+
+    The base URL can be overridden per provider with <PROVIDER>_BATCH_BASE_URL
+    (e.g., OPENAI_BATCH_BASE_URL=http://localhost:8000/v1 for a local stand-in).
+    """
+    provider = get_model_provider(model.id)
+    if provider not in OPENAI_COMPATIBLE_BATCH_URLS:
+        return None
+    base_url = (os.getenv(f"{provider.upper()}_BATCH_BASE_URL") or getattr(model, "base_url", None)
+                or OPENAI_COMPATIBLE_BATCH_URLS[provider])
+    return OpenAIBatchTransport(api_key=model.api_key, base_url=str(base_url))
+
+
+def build_request(job: BatchJob, model) -> Dict:
+    """Build the chat request of a job, with the image preprocessed for the model's provider."""
+    data, mime_type, profile = load_image(job.image_path, get_model_provider(model.id))
+    job.payload_bytes, job.preprocessing = len(data), profile
+    return {
+        "custom_id": job.custom_id,
+        "body": {
+            "model": model.id,
+            "messages": [
+                {"role": "system", "content": SYSTEM_MESSAGE},
+                {"role": "user", "content": [
+                    {"type": "text", "text": PROMPT},
+                    {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}"}}
+                ]}
+            ]
+        }
+    }
+
+
+def save_batch_state(batch_id: str, provider: str, source: str, jobs: List[BatchJob], submitted_at: float) -> Path:
+    """Persist the jobs of a submitted batch, so its results can be ingested after a restart."""
+    path = BATCH_STATE_DIR / f"{batch_id}.json"
+    atomic_write_json(path, {
+        "batch_id": batch_id,
+        "provider": provider,
+        "source": source,
+        "submitted_at": submitted_at,
+        "jobs": [job.__dict__ for job in jobs]
+    }, indent=2)
+    return path
+
+
+def pending_batches(source: Optional[str] = None) -> List[Dict]:
+    """Batches submitted earlier whose results were not ingested yet."""
+    if not BATCH_STATE_DIR.exists():
+        return []
+    states = []
+    for path in sorted(BATCH_STATE_DIR.glob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if source is None or state["source"] == source:
+            state["jobs"] = [BatchJob(**job) for job in state["jobs"]]
+            states.append(state)
+    return states
+
+
+def forget_batch(batch_id: str) -> None:
+    """Drop the state of a batch whose results were ingested."""
+    path = BATCH_STATE_DIR / f"{batch_id}.json"
+    if path.exists():
+        path.unlink()
+
+
+def wait_for_batch(transport: BatchTransport, batch_id: str, poll_interval: float = POLL_INTERVAL,
+                   on_status=None) -> Tuple[BatchStatus, Dict[str, BatchResult]]:
+    """Poll a batch until it reaches a terminal state and return its results."""
+    while True:
+        status = transport.status(batch_id)
+        if on_status is not None:
+            on_status(status)
+        if status.done:
+            return status, transport.results(batch_id)
+        time.sleep(poll_interval)
@@ -0,0 +1,99 @@
+import asyncio
+import csv
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+CONCURRENCY_LOG_DIR = Path("logs/concurrency")
+
+# HTTP statuses telling us to send less: rate limited, overloaded or failing servers
+THROTTLE_STATUS_CODES = {408, 429, 500, 502, 503, 504, 529}
+
+
+class AdaptiveLimiter:
+    """Additive-increase/multiplicative-decrease limit of the in-flight requests of a model.
+
+    Each request completed at a stable latency raises the limit by increase / limit
+    (about +1 per round trip at full use). A throttling error or a latency above
+    latency_factor times the baseline (a moving average of the healthy latencies)
+    multiplies it by decrease, at most once per baseline latency, so a burst of
+    errors from the same round counts once. Spikes still move the baseline, with the
+    slower spike_smoothing, so after a lasting latency shift (e.g., longer requests)
+    the baseline catches up and the limit recovers.
+
+    Use it as an async context manager around each request and record its outcome
+    before leaving the block, waiting requests re-check the limit when a slot is freed.
+    """
+
+    def __init__(self, name: str, initial: float = 1, minimum: float = 1, maximum: float = 8,
+                 increase: float = 1.0, decrease: float = 0.5, latency_factor: float = 2.0, smoothing: float = 0.2,
+                 spike_smoothing: float = 0.05):
+        self.name = name
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.smoothing = smoothing
+        self.spike_smoothing = spike_smoothing
+        self.baseline: Optional[float] = None
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+        self._start = time.time()
+        # (seconds since start, limit, in flight, latency or None, event)
+        self.history: List[Tuple[float, float, int, Optional[float], str]] = [(0.0, self.limit, 0, None, "start")]
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def record_success(self, latency: float) -> None:
+        """Adjust the limit after a completed request."""
+        if self.baseline is not None and latency > self.latency_factor * self.baseline:
+            self._back_off(latency, "latency")
+            self.baseline += self.spike_smoothing * (latency - self.baseline)
+            return
+        self.baseline = latency if self.baseline is None else self.baseline + self.smoothing * (latency - self.baseline)
+        previous = int(self.limit)
+        self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+        if int(self.limit) != previous:
+            self._log(latency, "increase")
+
+    def record_failure(self, status_code: Optional[int] = None, latency: Optional[float] = None) -> None:
+        """Adjust the limit after a failed request, backing off on throttling errors."""
+        if status_code in THROTTLE_STATUS_CODES:
+            self._back_off(latency, f"status {status_code}")
+
+    def _back_off(self, latency: Optional[float], reason: str) -> None:
+        now = time.time()
+        if now - self._last_decrease < (self.baseline or 0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self._log(latency, f"decrease ({reason})")
+
+    def _log(self, latency: Optional[float], event: str) -> None:
+        self.history.append((time.time() - self._start, self.limit, self.in_flight, latency, event))
+
+
+def save_concurrency_log(limiters: List[AdaptiveLimiter], run_id: str, log_dir: Path = CONCURRENCY_LOG_DIR) -> Path:
+    """Write the limit changes of every model to a CSV file (one row per change)."""
+    path = Path(log_dir) / f"{run_id}.csv"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["model", "seconds", "limit", "in_flight", "latency", "event"])
+        for limiter in limiters:
+            for seconds, limit, in_flight, latency, event in limiter.history:
+                writer.writerow([limiter.name, f"{seconds:.2f}", f"{limit:.2f}", in_flight,
+                                 "" if latency is None else f"{latency:.2f}", event])
+    return path
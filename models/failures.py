@@ -0,0 +1,186 @@
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import requests
+from agno.exceptions import AgnoError
+
+from models.hedging import DeadlineExceeded
+from utils.atomic import atomic_write_json
+
+FAILED_JOBS_PATH = Path(".cache/failed_jobs.json")
+
+RETRYABLE = "retryable"
+FATAL = "fatal"
+
+# Statuses that may succeed when sent again: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429}
+# Statuses that fail every request to the provider (invalid key, no access)
+AUTH_STATUS_CODES = {401, 403}
+# Statuses that fail every request to the model (unknown or retired model)
+MODEL_STATUS_CODES = {404}
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status of a provider error, None if the error carries none."""
+    status = getattr(error, "status_code", None)
+    if status is None and isinstance(getattr(error, "response", None), (httpx.Response, requests.Response)):
+        status = error.response.status_code
+    return status if isinstance(status, int) else None
+
+
+def is_provider_error(error: BaseException) -> bool:
+    """Whether an error comes from the provider or the connection to it (rather than from our own code)."""
+    return isinstance(error, (AgnoError, httpx.HTTPError, requests.RequestException, TimeoutError, ConnectionError))
+
+
+def classify_error(error: BaseException) -> str:
+    """Classify an error as RETRYABLE (rate limits, server and network errors) or FATAL.
+
+    Fatal errors (invalid key, unknown model, rejected request, bugs) fail the same way
+    when retried, so they are not. Neither is a request past its model's deadline: the
+    same image would likely get stuck again, it is left for a later retry.
+    """
+    if not is_provider_error(error) or isinstance(error, DeadlineExceeded):
+        return FATAL
+    status = error_status(error)
+    if status is None or status >= 500 or status in RETRYABLE_STATUS_CODES:
+        # Network errors have no status
+        return RETRYABLE
+    return FATAL
+
+
+def is_auth_error(error: BaseException) -> bool:
+    """Whether an error rejects our credentials, so every request to the provider will fail."""
+    return is_provider_error(error) and error_status(error) in AUTH_STATUS_CODES
+
+
+def is_model_error(error: BaseException) -> bool:
+    """Whether an error rejects the model itself, so every request to it will fail (but not to other models)."""
+    return is_provider_error(error) and error_status(error) in MODEL_STATUS_CODES
+
+
+class CircuitBreaker:
+    """Stops dispatching to a provider that keeps failing, then probes it periodically.
+
+    The breaker opens after failure_threshold consecutive failures, or at the first
+    authentication error; other errors of single requests (a rejected image, a model
+    the provider doesn't know) don't concern the other models of the provider. While
+    open, requests are refused; after reset_timeout seconds a single probe request is
+    let through (half-open), closing the breaker on success and reopening it on failure.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the probe when half-open)."""
+        if self.state == self.OPEN and time.time() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            return True
+        return self.state == self.CLOSED
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def release_probe(self) -> None:
+        """Let another probe through if the current one ended without a verdict (e.g., a bug on our side)."""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+
+    def record_failure(self, error: Optional[BaseException] = None) -> bool:
+        """Count a provider failure.
+
+        Returns:
+            True if the breaker just opened
+        """
+        self.failures += 1
+        self.last_error = str(error) if error is not None else None
+        auth_failed = error is not None and is_auth_error(error)
+        if self.state == self.HALF_OPEN or auth_failed or self.failures >= self.failure_threshold:
+            was_open = self.state == self.OPEN
+            self.state = self.OPEN
+            self.opened_at = time.time()
+            return not was_open
+        return False
+
+
+class FailedJobs:
+    """Persistent record of the (model, image) jobs that failed, so they can be retried later.
+
+    Entries are keyed by model and image; a later success removes the entry. Changes
+    are kept in memory until flush, so an outage failing many jobs doesn't rewrite
+    the file for each of them.
+    """
+
+    def __init__(self, path: Path = FAILED_JOBS_PATH):
+        self.path = Path(path)
+        self.jobs: Dict[str, Dict] = {}
+        self._dirty = False
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.jobs = json.load(f)
+
+    @staticmethod
+    def _key(model_id: str, image_path: str) -> str:
+        return f"{model_id}|{image_path}"
+
+    def record(self, model_id: str, image_path: str, error: str, kind: str, run_id: Optional[str] = None) -> None:
+        key = self._key(model_id, image_path)
+        previous = self.jobs.get(key, {})
+        self.jobs[key] = {
+            "model_id": model_id,
+            "image_path": image_path,
+            "error": error,
+            "kind": kind,
+            "run_id": run_id,
+            "failures": previous.get("failures", 0) + 1,
+            "failed_at": time.time()
+        }
+        self._dirty = True
+
+    def clear(self, model_id: str, image_path: str) -> None:
+        if self.jobs.pop(self._key(model_id, image_path), None) is not None:
+            self._dirty = True
+
+    def pending(self, source: Optional[str] = None) -> List[Dict]:
+        """Failed jobs, optionally only those of images under a source folder, sorted by image."""
+        prefix = source.rstrip("/") + "/" if source else ""
+        return sorted((job for job in self.jobs.values() if job["image_path"].startswith(prefix)),
+                      key=lambda job: (job["image_path"], job["model_id"]))
+
+    def flush(self) -> None:
+        """Write the changes since the last flush."""
+        if self._dirty:
+            atomic_write_json(self.path, self.jobs, indent=2)
+            self._dirty = False
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List the jobs that failed and are waiting for a retry")
+    parser.add_argument('--source', help='Only list jobs of images under this folder')
+    parser.add_argument('--clear', action='store_true', help='Forget the listed jobs')
+    args = parser.parse_args()
+
+    failed = FailedJobs()
+    jobs = failed.pending(args.source)
+    for job in jobs:
+        print(f"{job['model_id']}  {job['image_path']}  [{job['kind']}, {job['failures']}x] {job['error'][:120]}")
+    print(f"{len(jobs)} failed jobs")
+    if args.clear:
+        for job in jobs:
+            failed.clear(job["model_id"], job["image_path"])
+        failed.flush()
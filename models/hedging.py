@@ -0,0 +1,142 @@
+import asyncio
+import time
+from typing import Callable, List, Optional
+
+from evaluation.stats import TDigest
+
+
+class DeadlineExceeded(TimeoutError):
+    """No response within the deadline of a model; not retried, the same image would likely get stuck again."""
+
+
+class RequestPolicy:
+    """Deadline and hedging of the requests of a model.
+
+    A request still running after the model's observed hedge_quantile latency gets a
+    duplicate, the first response wins. Hedging starts once min_samples latencies were
+    observed and at most max_rate of the requests are hedged.
+
+    Abandoned requests (the losers of hedges, expired deadlines) keep their thread
+    until they complete, so hedges run on their own hedge_executor when given, and no
+    hedge is sent while max_in_flight hedges and abandoned requests of the model are
+    still running: a slow provider then can't fill the threads with duplicates.
+    """
+
+    def __init__(self, name: str, deadline: Optional[float] = None, hedge: bool = False, max_rate: float = 0.05,
+                 hedge_quantile: float = 0.95, min_samples: int = 20, max_in_flight: int = 2,
+                 hedge_executor=None):
+        self.name = name
+        self.deadline = deadline
+        self.hedge = hedge
+        self.max_rate = max_rate
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.max_in_flight = max_in_flight
+        self.hedge_executor = hedge_executor
+        self.latencies = TDigest()
+        self.samples = 0
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        # Hedges and abandoned requests still running
+        self.hedging = 0
+        self.abandoned = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a request gets a duplicate, None if it shouldn't."""
+        if not self.hedge or self.samples < self.min_samples:
+            return None
+        return self.latencies.quantile(self.hedge_quantile)
+
+    def claim_hedge(self) -> bool:
+        """Take a hedge from the budget, False once max_rate of the requests were hedged or too many still run."""
+        if self.hedges + 1 > self.max_rate * self.requests or self.hedging + self.abandoned >= self.max_in_flight:
+            return False
+        self.hedges += 1
+        return True
+
+    def record(self, latency: float) -> None:
+        self.latencies.add(latency)
+        self.samples += 1
+
+
+class AgentPool:
+    """Idle agents of a model: agents hold the state of their current run, so each running request needs its own."""
+
+    def __init__(self, factory: Callable):
+        self.factory = factory
+        self._idle: List = []
+
+    def acquire(self):
+        return self._idle.pop() if self._idle else self.factory()
+
+    def release(self, agent) -> None:
+        self._idle.append(agent)
+
+
+async def run_with_policy(call: Callable, agents: AgentPool, executor, policy: Optional[RequestPolicy] = None):
+    """Run call(agent) in the executor under a model's deadline and hedging policy.
+
+    A duplicate is started (on the policy's hedge_executor) when the request outlives
+    the hedge delay; the first successful response is returned and the other one is
+    abandoned. Threads can't be interrupted, so an abandoned request runs to completion
+    (bounded by the HTTP read timeout) before its agent goes back to the pool.
+
+    Raises:
+        DeadlineExceeded: No response within the deadline
+    """
+    loop = asyncio.get_running_loop()
+
+    def start(pool=executor):
+        agent = agents.acquire()
+        future = loop.run_in_executor(pool, call, agent)
+        future.add_done_callback(lambda _: agents.release(agent))
+        return future
+
+    def abandon(future):
+        policy.abandoned += 1
+
+        def finished(f):
+            policy.abandoned -= 1
+            # Retrieve the outcome so errors of abandoned requests aren't reported as unhandled
+            f.cancelled() or f.exception()
+        future.add_done_callback(finished)
+
+    def hedge_finished(_):
+        policy.hedging -= 1
+
+    started = time.time()
+    attempts = [start()]
+    if policy is not None:
+        policy.requests += 1
+    deadline = policy.deadline if policy is not None else None
+    delay = policy.hedge_delay() if policy is not None else None
+
+    if delay is not None and (deadline is None or delay < deadline):
+        done, _ = await asyncio.wait(attempts, timeout=delay)
+        if not done and policy.claim_hedge():
+            policy.hedging += 1
+            attempts.append(start(policy.hedge_executor or executor))
+            attempts[-1].add_done_callback(hedge_finished)
+
+    pending = set(attempts)
+    error = None
+    while pending:
+        timeout = None if deadline is None else max(0.0, started + deadline - time.time())
+        done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            error = DeadlineExceeded(f"No response from {policy.name} within its {deadline:.0f}s deadline")
+            break
+        for future in done:
+            if future.exception() is None:
+                if policy is not None:
+                    policy.record(time.time() - started)
+                    policy.hedge_wins += future is not attempts[0]
+                for abandoned in pending:
+                    abandon(abandoned)
+                return future.result()
+            error = future.exception()
+
+    for abandoned in pending:
+        abandon(abandoned)
+    raise error
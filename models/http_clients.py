@@ -0,0 +1,126 @@
+import importlib.util
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import httpx
+from agno.models.anthropic import Claude
+from agno.models.mistral import MistralChat
+
+from config.schemas import HttpPoolSettings
+
+
+@lru_cache(maxsize=None)
+def _load_http_config():
+    from config.loader import ConfigLoader
+    return ConfigLoader().load_http_config()
+
+
+def create_http_client(settings: HttpPoolSettings, verify=True) -> httpx.Client:
+    """Create a keep-alive HTTP client with the pool size and timeouts of the settings."""
+    return httpx.Client(
+        http2=settings.http2 and importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_connections=settings.max_connections,
+                            max_keepalive_connections=settings.max_keepalive_connections,
+                            keepalive_expiry=settings.keepalive_expiry),
+        timeout=httpx.Timeout(settings.read_timeout, connect=settings.connect_timeout),
+        verify=verify
+    )
+
+
+_clients: Dict[Tuple[str, str], httpx.Client] = {}
+_clients_lock = threading.Lock()
+
+
+def get_http_client(provider: str, base_url: str = "") -> httpx.Client:
+    """Client shared by every model of a provider and base URL (created once per process)."""
+    key = (provider, base_url)
+    with _clients_lock:
+        if key not in _clients or _clients[key].is_closed:
+            _clients[key] = create_http_client(_load_http_config().settings_for(provider))
+        return _clients[key]
+
+
+def attach_http_client(model, provider: str) -> bool:
+    """Make a model send its requests through the shared client of its provider.
+
+    OpenAI-compatible models otherwise build a new SDK client, and so a new
+    connection and TLS handshake, for every request.
+
+    Returns:
+        False if the model's SDK doesn't accept an HTTP client (it keeps its own)
+    """
+    client = get_http_client(provider, str(getattr(model, "base_url", None) or ""))
+    if hasattr(model, "http_client"):  # OpenAI-compatible models and Groq
+        model.http_client = client
+    elif isinstance(model, MistralChat):
+        model.client_params = {**(model.client_params or {}), "client": client}
+    elif isinstance(model, Claude):
+        model.client_params = {**(model.client_params or {}), "http_client": client}
+    else:
+        return False
+    return True
+
+
+def close_http_clients() -> None:
+    """Close the connections of every shared client."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def count_connections(url: str, requests: int, client: Optional[httpx.Client] = None, verify=True) -> Dict[str, float]:
+    """Send GET requests through a client, counting the connections and TLS handshakes they opened.
+
+    Without a client, every request uses its own client, as SDK clients built per request do.
+    """
+    counts = {"connections": 0, "handshakes": 0}
+
+    def trace(event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            counts["connections"] += 1
+        elif event == "connection.start_tls.complete":
+            counts["handshakes"] += 1
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        request_client = client or create_http_client(HttpPoolSettings(), verify=verify)
+        try:
+            request_client.get(url, extensions={"trace": trace}).raise_for_status()
+        finally:
+            if client is None:
+                request_client.close()
+    counts["seconds_per_request"] = (time.perf_counter() - start) / requests
+    return counts
+
+
+def benchmark(url: str, requests: int = 20, verify=True) -> Dict[str, Dict[str, float]]:
+    """Compare a client per request with a shared keep-alive client against a server.
+
+    Returns:
+        Connections, TLS handshakes and seconds per request of each mode
+    """
+    shared = create_http_client(HttpPoolSettings(), verify=verify)
+    try:
+        return {
+            "per_request": count_connections(url, requests, verify=verify),
+            "shared": count_connections(url, requests, client=shared)
+        }
+    finally:
+        shared.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure the connections and handshakes saved by shared HTTP clients")
+    parser.add_argument('--benchmark', metavar='URL', required=True, help='HTTPS URL answering GET requests')
+    parser.add_argument('--requests', type=int, default=20, help='Requests per mode (default: 20)')
+    parser.add_argument('--insecure', action='store_true', help='Accept self-signed certificates (local stubs)')
+    args = parser.parse_args()
+
+    for mode, counts in benchmark(args.benchmark, args.requests, verify=not args.insecure).items():
+        print(f"{mode}: {counts['connections']} connections, {counts['handshakes']} TLS handshakes, "
+              f"{counts['seconds_per_request'] * 1000:.1f} ms per request")
@@ -2,6 +2,7 @@ from config.loader import ConfigLoader
 from scripts.update_manifest import regenerate_full_manifest
 from scripts.generate_model_links import generate_model_links
 from utils.webserver.dashboard_ws import start_dashboard, open_dashboard, is_dashboard_running
+from utils.catalog import list_images
 
 import yaml
 import customtkinter as ctk
@@ -166,8 +167,7 @@ class ModelManager:
     def validate_dataset_folder(self, folder_path):
         """Validate dataset folder."""
         try:
-            path = Path(folder_path)
-            png_files = list(path.glob("*.png"))
+            png_files = list_images(folder_path)
             
             if hasattr(self, 'dataset_status_label'):
                 if png_files:
@@ -1,5 +1,5 @@
 import os
-from typing import List, Any
+from typing import List, Any, Optional
 from rich.console import Console
 
 from agno.models.openai import OpenAIChat
@@ -15,7 +15,8 @@ from agno.models.deepseek import DeepSeek
 from dotenv import load_dotenv
 
 from config.loader import load_config
-from config.schemas import AppConfig
+from config.schemas import AppConfig, ModelConfig
+from models.http_clients import attach_http_client
 
 load_dotenv()
 console = Console()
@@ -23,6 +24,21 @@ console = Console()
 # Global mapping from model IDs to standardized names
 _model_id_to_standard_name = {}
 
+# Global mapping from model IDs to their configured provider
+_model_id_to_provider = {}
+
+# Global mapping from model IDs to their configuration
+_model_id_to_config = {}
+
+def output_token_attribute(model) -> str:
+    """Name of the output token limit parameter of a model."""
+    # OpenAI reasoning models reject max_tokens, Gemini names it differently
+    if type(model) is OpenAIChat:
+        return "max_completion_tokens"
+    if hasattr(model, "max_output_tokens"):
+        return "max_output_tokens"
+    return "max_tokens"
+
 def get_enabled_models() -> List[Any]:
     """Get a list of initialized model instances based on validated configuration."""
     try:
@@ -61,10 +77,16 @@ def get_enabled_models() -> List[Any]:
         try:
             model_class = model_classes[provider]
             model_instance = model_class(id=model_id, api_key=api_key)
+            if model_cfg.max_output_tokens:
+                setattr(model_instance, output_token_attribute(model_instance), model_cfg.max_output_tokens)
+            # Reuse keep-alive connections across requests and models of the provider
+            attach_http_client(model_instance, provider)
             enabled_models.append(model_instance)
             
             # Store the mapping from model ID to standardized name
             _model_id_to_standard_name[model_id] = model_cfg.display_name
+            _model_id_to_provider[model_id] = provider
+            _model_id_to_config[model_id] = model_cfg
             
             console.print(f"Initialized {provider}/{model_id}", style="dim")
         except KeyError:
@@ -81,5 +103,13 @@ def get_model_display_name(model_id: str) -> str:
     """Get the standardized display name for a model ID."""
     return _model_id_to_standard_name.get(model_id, model_id)
 
+def get_model_provider(model_id: str) -> str:
+    """Get the configured provider of a model ID (e.g., 'OpenAI')."""
+    return _model_id_to_provider.get(model_id, "")
+
+def get_model_config(model_id: str) -> Optional[ModelConfig]:
+    """Get the configuration of an enabled model ID."""
+    return _model_id_to_config.get(model_id)
+
 # List of enabled models to evaluate
 to_eval = get_enabled_models()
\ No newline at end of file
@@ -0,0 +1,126 @@
+import heapq
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from utils.warehouse import WAREHOUSE_PATH, load_results
+
+# Expected request time of models without any history
+DEFAULT_LATENCY = (5.0, 0.0)
+MIN_SAMPLES = 10
+
+
+class LatencyModel:
+    """Expected request time of each model as base + per_char * output characters.
+
+    Coefficients are fit by least squares on the past single-line results of each
+    model (response length against time); models with fewer than min_samples results
+    use the fit of all models together.
+    """
+
+    def __init__(self, coefficients: Optional[Dict[str, Tuple[float, float]]] = None,
+                 default: Tuple[float, float] = DEFAULT_LATENCY):
+        self.coefficients = coefficients or {}
+        self.default = default
+
+    @staticmethod
+    def _fit(lengths, times) -> Tuple[float, float]:
+        lengths = pd.Series(lengths, dtype=float)
+        times = pd.Series(times, dtype=float)
+        if lengths.var() > 0:
+            per_char = max(0.0, lengths.cov(times) / lengths.var())
+        else:
+            per_char = 0.0
+        return max(0.0, times.mean() - per_char * lengths.mean()), per_char
+
+    @classmethod
+    def fit(cls, history: pd.DataFrame, min_samples: int = MIN_SAMPLES) -> "LatencyModel":
+        """Fit the coefficients of every model of a results frame (model, time, response_length, packed_lines)."""
+        # Packed lines only carry a share of their request time
+        history = history[history["packed_lines"].isna() | (history["packed_lines"] <= 1)].dropna(subset=["time"])
+        coefficients = {}
+        for model, rows in history.groupby("model"):
+            if len(rows) >= min_samples:
+                coefficients[model] = cls._fit(rows["response_length"], rows["time"])
+        default = cls._fit(history["response_length"], history["time"]) if len(history) >= min_samples else DEFAULT_LATENCY
+        return cls(coefficients, default)
+
+    @classmethod
+    def from_warehouse(cls, models: Iterable[str], warehouse_path: str = str(WAREHOUSE_PATH)) -> "LatencyModel":
+        """Fit the models of a run on their results in the warehouse (empty if it wasn't synced yet)."""
+        columns = ["model", "time", "response_length", "packed_lines"]
+        try:
+            frames = [load_results(columns=columns, model=model, warehouse_path=warehouse_path) for model in models]
+        except FileNotFoundError:
+            return cls()
+        frames = [frame for frame in frames if len(frame)]
+        return cls.fit(pd.concat(frames)) if frames else cls()
+
+    def predict(self, model: str, chars: int) -> float:
+        """Expected seconds for a model to transcribe chars characters."""
+        base, per_char = self.coefficients.get(model, self.default)
+        return base + per_char * chars
+
+
+def makespan(durations: Sequence[float], slots: int) -> float:
+    """Time for slots parallel workers to finish jobs taken in order, each by the first free worker."""
+    finish = [0.0] * max(1, slots)
+    for duration in durations:
+        heapq.heapreplace(finish, finish[0] + duration)
+    return max(finish)
+
+
+class ProgressTracker:
+    """Expected remaining work of a run, for a live ETA.
+
+    Jobs are registered with their expected duration and finished with their actual
+    one; the ratio of actual to expected time of each model's finished jobs corrects
+    the expectations of its remaining jobs.
+    """
+
+    def __init__(self):
+        self.expected: Dict[Tuple[str, tuple], float] = {}
+        self.total = 0
+        self.done = 0
+        # Lines of the jobs that failed, per model
+        self.failed: Dict[str, int] = {}
+        self._expected_done: Dict[str, float] = {}
+        self._actual_done: Dict[str, float] = {}
+
+    def add(self, model: str, job: tuple, expected: float) -> None:
+        self.expected[(model, job)] = expected
+        self.total += 1
+
+    def finish(self, model: str, job: tuple, actual: Optional[float] = None) -> None:
+        """Mark a job done; without an actual time (failed jobs) it doesn't count towards the correction."""
+        expected = self.expected.pop((model, job), None)
+        if expected is None:
+            return
+        self.done += 1
+        if actual is None:
+            self.failed[model] = self.failed.get(model, 0) + len(job)
+        else:
+            self._expected_done[model] = self._expected_done.get(model, 0.0) + expected
+            self._actual_done[model] = self._actual_done.get(model, 0.0) + actual
+
+    def eta(self, slots: Dict[str, float]) -> float:
+        """Expected seconds until every model finished, given each model's current concurrency."""
+        remaining: Dict[str, List[float]] = {}
+        for (model, _), expected in self.expected.items():
+            remaining.setdefault(model, []).append(expected)
+        eta = 0.0
+        for model, durations in remaining.items():
+            ratio = (self._actual_done[model] / self._expected_done[model]
+                     if self._expected_done.get(model) else 1.0)
+            eta = max(eta, makespan([duration * ratio for duration in durations], int(slots.get(model, 1))))
+        return eta
+
+
+def format_duration(seconds: float) -> str:
+    """Short human readable duration (e.g., '1h 05m', '3m 20s', '45s')."""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
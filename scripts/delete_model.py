@@ -1,129 +1,184 @@
 import json
 import os
-import glob
 import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Tuple
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from scripts.update_manifest import regenerate_full_manifest
-from evaluation.graph import create_graph
+from scripts.update_manifest import update_manifest, remove_from_manifest
+from evaluation.graph import create_graphs, chart_path, CHART_FORMATS
+from utils.atomic import atomic_write_json
+from utils.model_index import ModelIndex, is_aggregated_file
 
 
-def delete_model_from_file(file_path: str, model_name: str) -> bool:
+def delete_models_from_file(file_path: str, model_names: Iterable[str], dry_run: bool = False) -> Tuple[str, List[str], List[str]]:
     """
-    Delete a model from a single JSON file.
+    Delete models from a single JSON file, writing it back atomically.
+
+    Returns:
+        Tuple of (file path, removed model names, remaining model names)
     """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if model_name in data:
-            del data[model_name]
-            
-            # Write back the updated data
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            
-            print(f"Removed {model_name} from {file_path}")
-            return True
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    removed = [model_name for model_name in model_names if model_name in data]
+    for model_name in removed:
+        del data[model_name]
+
+    if removed and not dry_run:
+        # Keep the indentation style of each kind of file
+        if file_path.endswith('.stats.json'):
+            atomic_write_json(file_path, data, separators=(',', ':'))
         else:
-            return False
-            
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Error processing {file_path}: {e}")
-        return False
+            atomic_write_json(file_path, data, indent=4, ensure_ascii=False)
 
+    return file_path, removed, list(data)
 
-def find_all_json_files(base_path: str = "docs/data/json") -> List[str]:
-    """
-    Find all JSON files in the evaluation directory structure.
-    """
-    json_files = []
-    
-    # Find all JSON files recursively, excluding manifest.json
-    for json_file in glob.glob(f"{base_path}/**/*.json", recursive=True):
-        if not json_file.endswith("manifest.json"):
-            json_files.append(json_file)
-    
-    return json_files
 
-def delete_model_from_all_evaluations(model_name: str, base_path: str = "docs/data/json") -> Dict[str, Any]:
+def _source_of(file_path: str, base_path: str) -> str:
+    """Get the subcategory source (e.g., 'GT4HistOCR/corpus/EarlyModernLatin/1471-Orthographia-Tortellius') of a result file."""
+    relative = os.path.relpath(file_path, base_path)
+    if is_aggregated_file(file_path) or file_path.endswith('.stats.json'):
+        return relative.rsplit('.stats.json', 1)[0].rsplit('.json', 1)[0]
+    return os.path.dirname(relative)
+
+
+def delete_models_from_all_evaluations(model_names: List[str], base_path: str = "docs/data/json",
+                                       dry_run: bool = False, workers: int = None) -> Dict[str, Any]:
     """
-    Delete a model from all evaluation JSON files.
+    Delete models from all evaluation JSON files in one pass.
+
+    Only files that the model index reports as containing one of the models are
+    rewritten, in parallel and atomically. Afterwards only the affected charts and
+    manifest entries are refreshed.
     """
-    print(f"Starting deletion of model: {model_name}")
+    print(f"Starting deletion of model(s): {', '.join(model_names)}")
     print("=" * 50)
-    
-    # Find all JSON files
-    json_files = find_all_json_files(base_path)
-    
+
+    index = ModelIndex.load(base_path).refresh(workers)
+    targets = index.files_with(model_names)
+
     stats = {
-        "model_name": model_name,
-        "files_processed": 0,
+        "model_names": model_names,
+        "files_indexed": len(index.files),
         "files_modified": 0,
-        "files_with_errors": 0,
+        "files_with_errors": len(index.invalid_files),
         "modified_files": [],
-        "aggregated_files": []
+        "aggregated_files": [],
+        "removed_files": []
     }
-    
-    # Process each JSON file
-    for json_file in json_files:
-        stats["files_processed"] += 1
-        
-        try:
-            if delete_model_from_file(json_file, model_name):
-                stats["files_modified"] += 1
-                stats["modified_files"].append(json_file)
-                
-                # Check if this is an aggregated file (not in a subdirectory with individual files)
-                if not os.path.basename(json_file).startswith(('0', '1', '2')):
-                    stats["aggregated_files"].append(json_file)
-                    
-        except Exception as e:
-            print(f"Error processing {json_file}: {e}")
-            stats["files_with_errors"] += 1
-    
+    for invalid_file in index.invalid_files:
+        print(f"Error processing {invalid_file}: invalid JSON")
+
+    # Rewrite affected files in parallel
+    results = []
+    if targets:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(delete_models_from_file, file_path, model_names, dry_run): file_path
+                for file_path in targets
+            }
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"Error processing {futures[future]}: {e}")
+                    stats["files_with_errors"] += 1
+
+    affected_sources = set()
+    for file_path, removed, remaining in results:
+        stats["files_modified"] += 1
+        stats["modified_files"].append(file_path)
+        print(f"{'Would remove' if dry_run else 'Removed'} {', '.join(removed)} from {file_path}")
+
+        if is_aggregated_file(file_path):
+            stats["aggregated_files"].append(file_path)
+        if not file_path.endswith('model_links.json'):
+            affected_sources.add(_source_of(file_path, base_path))
+
+        if dry_run:
+            continue
+
+        # Drop result files that no longer hold any model
+        if not remaining:
+            os.remove(file_path)
+            stats["removed_files"].append(file_path)
+            for fmt in CHART_FORMATS:
+                if os.path.exists(chart_path(file_path, fmt)):
+                    os.remove(chart_path(file_path, fmt))
+        index.update_file(file_path, remaining)
+
     print("\n" + "=" * 50)
-    print(f"Deletion Summary:")
-    print(f"   Model: {model_name}")
-    print(f"   Files processed: {stats['files_processed']}")
+    print(f"Deletion Summary{' (DRY RUN)' if dry_run else ''}:")
+    print(f"   Model(s): {', '.join(model_names)}")
+    print(f"   Files indexed: {stats['files_indexed']}")
     print(f"   Files modified: {stats['files_modified']}")
+    print(f"   Files removed: {len(stats['removed_files'])}")
     print(f"   Files with errors: {stats['files_with_errors']}")
     print(f"   Aggregated files affected: {len(stats['aggregated_files'])}")
-    
-    if stats["files_modified"] > 0:
-        print(f"\nUpdating manifest and regenerating graphs...")
-        
-        # Update manifest
-        try:
-            regenerate_full_manifest()
-            print("Manifest updated successfully")
-        except Exception as e:
-            print(f"Error updating manifest: {e}")
-        
+
+    if dry_run or stats["files_modified"] == 0:
+        index.save()
+        return stats
+
+    print(f"\nUpdating affected charts and manifest entries...")
+
+    # Redraw only the charts of aggregated files that still exist and already had one
+    try:
+        redrawn = 0
+        for fmt in CHART_FORMATS:
+            charts = [file_path for file_path in stats["aggregated_files"]
+                      if os.path.exists(file_path) and os.path.exists(chart_path(file_path, fmt))]
+            redrawn += len(create_graphs(charts, fmt=fmt, workers=workers))
+        print(f"Redrew {redrawn} chart(s)")
+    except Exception as e:
+        print(f"Error redrawing charts: {e}")
+
+    # Refresh manifest entries of affected subcategories only
+    try:
+        for source in sorted(affected_sources):
+            if len(Path(source).parts) != 4:  # Rollups and other files are not listed per subcategory
+                continue
+            if os.path.exists(os.path.join(base_path, f"{source}.json")):
+                update_manifest(source)
+            else:
+                remove_from_manifest(source)
+        print("Manifest updated successfully")
+    except Exception as e:
+        print(f"Error updating manifest: {e}")
+
+    index.save()
     return stats
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python delete_model.py <model_name>")
-        print("Example: python delete_model.py 'mistral-small-2506'")
-        # print("Example: uv run delete_model.py 'mistral-small-2506'")
-        sys.exit(1)
-    
-    model_name = sys.argv[1]
-    result = delete_model_from_all_evaluations(model_name)
-    
-    if result["files_modified"] == 0:
-        print(f"\nModel '{model_name}' was not found in any evaluation files.")
-    else:
-        print(f"\nSuccessfully deleted '{model_name}' from {result['files_modified']} files.")
+def delete_model_from_all_evaluations(model_name: str, base_path: str = "docs/data/json") -> Dict[str, Any]:
+    """
+    Delete a model from all evaluation JSON files.
+    """
+    return delete_models_from_all_evaluations([model_name], base_path)
 
 
 def delete_model(model_name: str) -> Dict[str, Any]:
     """
     Convenience function to delete a model and update everything.
     """
-    return delete_model_from_all_evaluations(model_name)
\ No newline at end of file
+    return delete_model_from_all_evaluations(model_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete one or more models from all evaluation files")
+    parser.add_argument('model_names', nargs='+', help="Model name(s) as stored in the results (e.g., 'mistral-small')")
+    parser.add_argument('--dry-run', action='store_true', help='Show what would be changed without making actual changes')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count)')
+    # Example: uv run scripts/delete_model.py 'mistral-small' 'spotlight'
+    args = parser.parse_args()
+
+    result = delete_models_from_all_evaluations(args.model_names, dry_run=args.dry_run, workers=args.workers)
+
+    if result["files_modified"] == 0:
+        print(f"\nModel(s) '{', '.join(args.model_names)}' not found in any evaluation files.")
+    elif not args.dry_run:
+        print(f"\nSuccessfully deleted '{', '.join(args.model_names)}' from {result['files_modified']} files.")
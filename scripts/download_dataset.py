@@ -1,59 +1,404 @@
+import argparse
+import hashlib
+import io
+import json
 import os
+import shutil
 import tarfile
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import List, Optional, Tuple
+
 import requests
 from tqdm import tqdm
 
-def download_gt4hist() -> bool:
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.archive import ARCHIVE_PATH, INDEX_PATH, ArchiveIndex
+from utils.atomic import atomic_write_json
+
+DATASET_URL = "https://zenodo.org/records/1344132/files/GT4HistOCR.tar?download=1"
+# Zenodo record metadata, with the MD5 of the archive the download is checked against
+DATASET_RECORD_URL = "https://zenodo.org/api/records/1344132"
+DATASET_FILE = "GT4HistOCR.tar"
+
+SEGMENTS = 4  # Parallel range requests
+READ_CHUNK_SIZE = 64 * 1024  # Bytes read from the socket at a time
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024  # Bytes buffered before each write to disk
+TIMEOUT = (10, 60)  # Connect/read timeouts in seconds
+STATE_SAVE_INTERVAL = 5  # Seconds between saves of the download progress
+
+
+class _SegmentTracker:
+    """Track the downloaded bytes of each segment and the contiguous prefix available on disk.
+
+    Segments are [start, end) byte ranges of the file with the number of bytes already
+    written. The state is persisted next to the partial file so an interrupted download
+    resumes from where each segment stopped.
+    """
+
+    def __init__(self, state_path: str, total_size: Optional[int], segments: List[List[int]],
+                 bar: Optional[tqdm] = None):
+        self.state_path = state_path
+        self.total_size = total_size
+        self.segments = segments  # [start, end, done]
+        self.bar = bar
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self._condition = threading.Condition()
+
+    @classmethod
+    def load(cls, state_path: str, total_size: int, etag: Optional[str]) -> Optional["_SegmentTracker"]:
+        """Load the progress of a previous download of the same file, if any."""
+        try:
+            with open(state_path, "r") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if state.get("total_size") != total_size or state.get("etag") != etag:
+            return None
+        return cls(state_path, total_size, state["segments"])
+
+    @classmethod
+    def split(cls, state_path: str, total_size: Optional[int], segments: int) -> "_SegmentTracker":
+        """Split a new download into (roughly) equal segments."""
+        if not total_size:
+            return cls(state_path, total_size, [[0, -1, 0]])
+        size = -(-total_size // segments)
+        return cls(state_path, total_size,
+                   [[start, min(start + size, total_size), 0] for start in range(0, total_size, size)])
+
+    def save(self, etag: Optional[str] = None) -> None:
+        """Persist the progress of every segment."""
+        if not self.total_size:
+            return  # Downloads of unknown size cannot be resumed
+        with self._condition:
+            state = {"total_size": self.total_size, "etag": etag, "segments": [list(s) for s in self.segments]}
+        atomic_write_json(self.state_path, state)
+
+    @property
+    def downloaded(self) -> int:
+        return sum(done for _, _, done in self.segments)
+
+    def watermark(self) -> int:
+        """Number of bytes available on disk from the start of the file without gaps."""
+        position = 0
+        for start, end, done in self.segments:
+            position = start + done
+            if end < 0 or start + done < end:
+                break
+        return position
+
+    def advance(self, index: int, nbytes: int) -> None:
+        """Record bytes of a segment that were written to disk."""
+        with self._condition:
+            self.segments[index][2] += nbytes
+            self._condition.notify_all()
+        if self.bar is not None:
+            self.bar.update(nbytes)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Signal that no more bytes will arrive."""
+        with self._condition:
+            self.finished = True
+            self.error = error
+            self._condition.notify_all()
+
+    def wait_for(self, position: int) -> int:
+        """Block until the byte at `position` is on disk (or the download ended) and return the watermark."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.finished or self.watermark() > position)
+            if self.error is not None:
+                raise IOError(f"Download interrupted: {self.error}")
+            return self.watermark()
+
+
+class _ContiguousReader(io.RawIOBase):
+    """Sequential reader over a file that is still being downloaded.
+
+    Reads block until the requested bytes are on disk, so the archive can be extracted
+    while it downloads. Everything read is hashed along the way to verify the checksum
+    without a second pass over the file.
+    """
+
+    def __init__(self, path: str, tracker: _SegmentTracker):
+        # Unbuffered, so bytes read ahead of the download are never cached
+        self._file = open(path, "rb", buffering=0)
+        self._tracker = tracker
+        self._position = 0
+        self.md5 = hashlib.md5()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        available = self._tracker.wait_for(self._position)
+        if available <= self._position:
+            return 0
+        count = self._file.readinto(memoryview(buffer)[:available - self._position])
+        self.md5.update(memoryview(buffer)[:count])
+        self._position += count
+        return count
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def _probe(session: requests.Session, url: str) -> Tuple[Optional[int], bool, Optional[str]]:
+    """Get the size of a remote file, whether it supports range requests and its ETag."""
+    response = session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=TIMEOUT)
+    response.raise_for_status()
+    response.close()
+    etag = response.headers.get("ETag")
+    if response.status_code == 206 and "/" in response.headers.get("Content-Range", ""):
+        total = response.headers["Content-Range"].rsplit("/", 1)[1]
+        return (int(total) if total.isdigit() else None), True, etag
+    length = response.headers.get("Content-Length")
+    return (int(length) if length else None), False, etag
+
+
+def _download_segment(session: requests.Session, url: str, path: str, tracker: _SegmentTracker,
+                      index: int, ranged: bool) -> None:
+    """Download the remaining bytes of one segment, writing them in large blocks."""
+    start, end, done = tracker.segments[index]
+    if end >= 0 and start + done >= end:
+        return
+
+    headers = {"Range": f"bytes={start + done}-{end - 1}"} if ranged else {}
+    with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+        response.raise_for_status()
+        if ranged and response.status_code != 206:
+            raise IOError("Server ignored the range request")
+
+        with open(path, "r+b") as f:
+            f.seek(start + done)
+            buffer = bytearray()
+
+            def flush():
+                f.write(buffer)
+                f.flush()
+                tracker.advance(index, len(buffer))
+                buffer.clear()
+
+            try:
+                for data in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+                    if tracker.finished:
+                        raise IOError("Download cancelled")
+                    buffer += data
+                    if len(buffer) >= WRITE_BUFFER_SIZE:
+                        flush()
+            finally:
+                # Keep what was received before a failure so the next attempt resumes after it
+                if buffer:
+                    flush()
+
+    if end >= 0 and start + tracker.segments[index][2] < end:
+        raise IOError(f"Connection closed before the end of segment {index}")
+
+
+def _consume(reader: _ContiguousReader, extract_to: Optional[str]) -> None:
+    """Read the download to the end, extracting tar members as their bytes arrive."""
+    stream = io.BufferedReader(reader, READ_CHUNK_SIZE)
+    if extract_to is not None:
+        with tarfile.open(fileobj=stream, mode="r|") as tar:
+            tar.extractall(extract_to, filter="data")
+    # Hash the padding after the end-of-archive marker too
+    while stream.read(READ_CHUNK_SIZE):
+        pass
+
+
+def download_file(url: str, path: str, extract_to: Optional[str] = None, segments: int = SEGMENTS,
+                  expected_md5: Optional[str] = None, progress: bool = True) -> str:
+    """
+    Download a file with parallel range requests, resuming a previous partial download.
+
+    The file is downloaded to `<path>.part`, with the progress of each segment stored in
+    `<path>.part.json`, and renamed to `path` once complete and verified. If `extract_to`
+    is given, the file is read as a tar archive and its members are extracted while the
+    download is still running.
+
+    Args:
+        url: URL of the file
+        path: Destination path of the downloaded file
+        extract_to: Directory to stream-extract the tar archive into
+        segments: Number of parallel range requests (when the server supports them)
+        expected_md5: MD5 hex digest to verify the download against
+        progress: Show a progress bar
+
+    Returns:
+        MD5 hex digest of the downloaded file
+    """
+    part_path = f"{path}.part"
+    state_path = f"{part_path}.json"
+
+    with requests.Session() as session:
+        total_size, ranged, etag = _probe(session, url)
+        ranged = ranged and total_size is not None
+
+        tracker = None
+        if ranged and total_size and os.path.exists(part_path):
+            tracker = _SegmentTracker.load(state_path, total_size, etag)
+        if tracker is None:
+            tracker = _SegmentTracker.split(state_path, total_size, segments if ranged else 1)
+            with open(part_path, "wb") as f:
+                if total_size:
+                    f.truncate(total_size)
+            tracker.save(etag)
+
+        bar = tqdm(desc=os.path.basename(path), total=total_size, initial=tracker.downloaded,
+                   unit='iB', unit_scale=True, unit_divisor=1024, disable=not progress)
+        tracker.bar = bar
+
+        reader = _ContiguousReader(part_path, tracker)
+        consumer_error: List[BaseException] = []
+
+        def consume():
+            try:
+                _consume(reader, extract_to)
+            except BaseException as e:
+                consumer_error.append(e)
+                tracker.finish(e)  # Stop the download as well
+
+        consumer = threading.Thread(target=consume, daemon=True)
+        consumer.start()
+
+        error = None
+        executor = ThreadPoolExecutor(max_workers=len(tracker.segments))
+        try:
+            pending = {executor.submit(_download_segment, session, url, part_path, tracker, index, ranged)
+                       for index in range(len(tracker.segments))}
+            while pending:
+                done, pending = wait(pending, timeout=STATE_SAVE_INTERVAL, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                        tracker.finish(error)
+                # Persist progress regularly so even a killed process can resume
+                tracker.save(etag)
+        finally:
+            if not consumer_error:
+                tracker.finish(error)
+            executor.shutdown(wait=True)
+            consumer.join()
+            reader.close()
+            bar.close()
+            tracker.save(etag)
+
+    if consumer_error and error is None:
+        error = consumer_error[0]
+    if error is not None:
+        raise error
+
+    digest = reader.md5.hexdigest()
+    if expected_md5 and digest != expected_md5.lower():
+        # The partial file is corrupt, so start from scratch next time
+        os.remove(part_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        raise IOError(f"Checksum mismatch: expected {expected_md5}, got {digest}")
+
+    os.replace(part_path, path)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return digest
+
+
+def fetch_dataset_md5(record_url: str = DATASET_RECORD_URL, filename: str = DATASET_FILE) -> str:
+    """Get the MD5 of a file of a Zenodo record, as published in the record metadata."""
+    response = requests.get(record_url, timeout=TIMEOUT)
+    response.raise_for_status()
+    for entry in response.json().get("files", []):
+        algorithm, _, digest = (entry.get("checksum") or "").partition(":")
+        if entry.get("key") == filename and algorithm == "md5" and digest:
+            return digest
+    raise IOError(f"No MD5 checksum of {filename} in {record_url}")
+
+
+def download_gt4hist(categories: Optional[List[str]] = None, keep_archive: bool = False, url: str = DATASET_URL,
+                     expected_md5: Optional[str] = None, segments: int = SEGMENTS) -> bool:
     """
     Check if GT4HistOCR folder exists, if not, download and extract it.
     The dataset will be downloaded to the project root directory.
+
+    The archive is extracted while it downloads, into a temporary folder that is moved
+    into place once the download completes and its checksum is verified. An interrupted
+    download is resumed the next time this runs. Unless expected_md5 is given, the
+    checksum is taken from the Zenodo record and the download fails without it.
+
+    Args:
+        categories: Only extract these corpus categories (e.g., ['EarlyModernLatin']). The archive
+            is kept, so the remaining categories can be read from it without extraction.
+        keep_archive: Keep the archive after a full extraction
+        expected_md5: MD5 hex digest of the archive at url
     """
-    dataset_url = "https://zenodo.org/records/1344132/files/GT4HistOCR.tar?download=1"
-    target_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "GT4HistOCR")
-    tar_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "GT4HistOCR.tar")
-    
-    # Check if GT4HistOCR directory already exists
-    if os.path.exists(target_dir):
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    target_dir = os.path.join(root_dir, "GT4HistOCR")
+    tar_path = os.path.join(root_dir, str(ARCHIVE_PATH))
+    extract_dir = os.path.join(root_dir, ".GT4HistOCR.extracting")
+
+    # Check if GT4HistOCR directory already exists (a kept archive may still hold categories to extract)
+    if os.path.exists(target_dir) and not os.path.exists(tar_path):
         print("GT4HistOCR dataset is already downloaded.")
         return True
-    
-    print("Downloading GT4HistOCR dataset...")
-    
+
     try:
-        # Stream the download to show progress
-        response = requests.get(dataset_url, stream=True)
-        response.raise_for_status()
-        
-        # Get the total file size from headers
-        total_size = int(response.headers.get('content-length', 0))
-        
-        # Download the file with progress bar
-        with open(tar_path, 'wb') as f, tqdm(
-            desc=tar_path,
-            total=total_size,
-            unit='iB',
-            unit_scale=True,
-            unit_divisor=1024,
-        ) as bar:
-            for data in response.iter_content(chunk_size=1024):
-                size = f.write(data)
-                bar.update(size)
-        
-        print("Extracting dataset...")
-        # Extract and clean upthe tar file
-        with tarfile.open(tar_path, 'r') as tar:
-            tar.extractall(os.path.dirname(target_dir))
-        os.remove(tar_path)
-        
-        print("GT4HistOCR dataset has been downloaded and extracted successfully!")
+        if not os.path.exists(tar_path) and expected_md5 is None:
+            expected_md5 = fetch_dataset_md5()
+        if os.path.exists(tar_path):
+            print("Using the GT4HistOCR archive already downloaded.")
+        elif categories is not None:
+            print(f"{'Resuming' if os.path.exists(f'{tar_path}.part') else 'Downloading'} GT4HistOCR dataset...")
+            download_file(url, tar_path, segments=segments, expected_md5=expected_md5)
+        else:
+            print(f"{'Resuming' if os.path.exists(f'{tar_path}.part') else 'Downloading'} GT4HistOCR dataset...")
+            # Members are extracted as their bytes arrive; restart extraction from a clean folder
+            shutil.rmtree(extract_dir, ignore_errors=True)
+            download_file(url, tar_path, extract_to=extract_dir, segments=segments, expected_md5=expected_md5)
+
+            os.replace(os.path.join(extract_dir, "GT4HistOCR"), target_dir)
+            shutil.rmtree(extract_dir, ignore_errors=True)
+            if not keep_archive:
+                os.remove(tar_path)
+
+            print("GT4HistOCR dataset has been downloaded and extracted successfully!")
+            return True
+
+        # Extract from the downloaded archive through its member index
+        index = ArchiveIndex.load(tar_path, os.path.join(root_dir, str(INDEX_PATH)))
+        full = categories is None
+        if full and os.path.isdir(target_dir):
+            # Earlier selective extraction: only the missing categories are left
+            categories = index.categories()
+        if categories is not None:
+            unknown = sorted(set(categories) - set(index.categories()))
+            if unknown:
+                print(f"Unknown categories: {', '.join(unknown)}. Available: {', '.join(index.categories())}")
+                return False
+            categories = [category for category in categories
+                          if not os.path.isdir(os.path.join(target_dir, "corpus", category))]
+
+        print(f"Extracting {'all categories' if categories is None else ', '.join(categories) or 'nothing new'}...")
+        extracted = index.extract(categories, root_dir)
+        if full and not keep_archive:
+            os.remove(tar_path)
+
+        print(f"Extracted {extracted} files from the GT4HistOCR archive.")
         return True
-        
+
     except Exception as e:
         print(f"Error downloading or extracting the dataset: {e}")
-        # Clean up partially downloaded file if it exists
-        if os.path.exists(tar_path):
-            os.remove(tar_path)
+        # Keep the partial download so it can be resumed, but not a half-extracted tree
+        shutil.rmtree(extract_dir, ignore_errors=True)
         return False
 
 if __name__ == "__main__":
-    download_gt4hist()
+    parser = argparse.ArgumentParser(description="Download and extract the GT4HistOCR dataset")
+    parser.add_argument('--categories', nargs='+', default=None,
+                        help="Only extract these corpus categories (e.g., 'EarlyModernLatin' 'dta19'); the archive is kept")
+    parser.add_argument('--keep-archive', action='store_true',
+                        help='Keep the archive after a full extraction, to read members from it directly')
+    args = parser.parse_args()
+
+    download_gt4hist(categories=args.categories, keep_archive=args.keep_archive)
@@ -4,15 +4,15 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from config.loader import load_config
+from config.loader import ConfigLoader
 
 def generate_model_links():
     """Generate model links mapping and save to JSON file."""
-    config = load_config(verbose=False)
+    models_config = ConfigLoader().load_models_config()
     
     model_links = {}
     
-    for model in config.models_config.models:
+    for model in models_config.models:
         display_name = model.display_name
         if model.link:
             model_links[display_name] = model.link
@@ -3,24 +3,46 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from models.model_utils import to_eval, get_model_display_name
-from models.agent import create_agent, create_image_obj
-from evaluation.metrics import get_diff, get_metrics
-from evaluation.graph import create_graph
+from models.model_utils import to_eval, get_model_config, get_model_display_name, get_model_provider
+from models.agent import (create_agent, create_image_obj, run_streaming, cap_output_tokens, output_token_limit,
+                          PROMPT, RETRIES, RETRY_DELAY)
+from models.concurrency import AdaptiveLimiter, save_concurrency_log
+from models.hedging import AgentPool, RequestPolicy, run_with_policy
+from models.scheduling import LatencyModel, ProgressTracker, format_duration
+from utils.progress import ProgressTable
+from models.failures import (CircuitBreaker, FailedJobs, FATAL, RETRYABLE, classify_error, error_status,
+                             is_model_error, is_provider_error)
+from models.batch import (BatchJob, POLL_INTERVAL, build_request, forget_batch, get_batch_transport,
+                          pending_batches, save_batch_state, wait_for_batch)
+from evaluation.metrics import score_transcription
+from evaluation.pipeline import ScoringPipeline
+from evaluation.graph import create_graphs
+from evaluation.stats import MetricStats, new_model_stats, add_result
+from evaluation.sampling import SequentialSampler, load_stored_results, stratified_sample, stratum_keys
 from utils.custom_trim import trim_response
 from utils.save import to_json, aggregate_folder_results
 from scripts.update_manifest import update_manifest
+from utils.warehouse import sync_warehouse
+from utils.archive import read_dataset_buffer
+from utils.catalog import get_catalog, group_duplicates, list_images, list_subcategories, gt_path_for, result_path
+from utils.preprocess import load_image
+from utils.multiline import build_prompt, split_response, tile_images
 from config.loader import load_config
 
 from agno.agent import RunResponse
-from agno.utils.pprint import pprint_run_response
 from agno.exceptions import ModelProviderError
 from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
 from dotenv import load_dotenv
 from pathlib import Path
+from typing import Iterator, Optional
+from rich.box import ROUNDED
 from rich.console import Console
+from rich.table import Table
 from rich.text import Text
 import asyncio
+import contextlib
 import time
 import random
 import yaml
@@ -29,108 +51,707 @@ import os
 
 load_dotenv()   
 console = Console()
+# Console of the per-result output, a log file in progress mode
+result_console = console
+
+# Identifier stored with every result produced by this process
+RUN_ID = datetime.now().strftime("%Y%m%dT%H%M%S")
+RESULT_LOG_DIR = Path("logs/results")
+
+
+@contextlib.contextmanager
+def log_results(log_dir: Path = RESULT_LOG_DIR) -> Iterator[Path]:
+    """Send the per-result output to a log file of the run instead of the terminal, until the block ends."""
+    global result_console
+    path = Path(log_dir) / f"{RUN_ID}.log"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        result_console = Console(file=f, width=120)
+        try:
+            yield path
+        finally:
+            result_console = console
 
-async def run_model(agent, model, executor, image_path: str):
-    """Run a model on an image, performing OCR and evaluating the results."""
-    image_obj = create_image_obj(model, image_path)
-    loop = asyncio.get_event_loop()
-    
-    start = time.time()
-    # Run agent.run in a separate thread to avoid blocking
-    response: RunResponse = await loop.run_in_executor(
-        executor,
-        lambda: agent.run(
-            "What text do you see in this image? Please provide an accurate transcription. Return only the transcription, nothing else.",
-            images=[image_obj],
-            stream=False
-        )
-    )
-    end = time.time()
-    exec_time = end - start
-    
-    gt_path = Path(image_path).with_suffix("").with_suffix(".gt.txt")
-    with open(gt_path, "r") as f:
-        gt = f.read().rstrip('\n') # Fixed issue with /n impacting accuracy metrics...
 
+def prepare_response(model, response):
+    """Clean up a response before it is scored."""
     # Fix for silly specific model behaviour
     if model.id == "thudm/glm-4.1v-9b-thinking":
         response = trim_response(response)
+    return response
+
+
+def response_table(response) -> Table:
+    """Box with the content of a response, as printed by agno's pprint_run_response."""
+    table = Table(box=ROUNDED, border_style="blue", show_header=False)
+    table.add_row(response.get_content_as_string(indent=4))
+    return table
+
+
+def report_result(model, response, exec_time: Optional[float], image_path: str, gt: str, diff, accuracy: float, wer: float,
+                  cer: float, payload_bytes: Optional[int] = None, preprocessing: Optional[str] = None,
+                  packed_lines: Optional[int] = None, batch_id: Optional[str] = None, ttft: Optional[float] = None,
+                  tokens_per_sec: Optional[float] = None, truncated: bool = False, duplicate_of: Optional[str] = None,
+                  batch_time: Optional[float] = None):
+    """Print and save the scores of a transcription.
     
-    # Metrics calculation
-    diff, accuracy = get_diff(gt, response.content)
-    wer, cer = get_metrics(gt, response.content)
+    With duplicate_of, the transcription is that of a byte-identical image, reused
+    instead of sending the image again. Batch results have no exec_time, only their
+    share of the batch time (batch_time).
     
+    Returns:
+        Tuple of (model display name, metrics of the result)
+    """
     # Print results for each image
     display_name = get_model_display_name(model.id)
-    console.print(Text(f"\n(🤖) {display_name}", style="bold blue"))
-    pprint_run_response(response)
-    console.print(diff)
-    console.print(Text(f"WER: {wer:.2%}", style="bold cyan")) # Word error rate (Jiwer)
-    console.print(Text(f"CER: {cer:.2%}", style="bold cyan")) # Character error rate (Jiwer)
-    console.print(Text(f"Accuracy: {accuracy:.2%}", style="bold blue")) # Accuracy (diff match patch)
-    console.print(Text(f"Execution Time: {exec_time:.2f} seconds", style="bold yellow"))
-    console.print(Text("_" * 80, style="dim"))
-    
-    to_json(model, gt, response, wer, cer, accuracy, exec_time, image_path)
-    
-    return (get_model_display_name(model.id), wer, cer, accuracy, exec_time)
-    
-
-async def run_all(image_paths: list[str], source: str):
-    """Run all models on a list of images and calculate average metrics."""
-    # Create all agents once at startup
-    agents = {get_model_display_name(model.id): create_agent(model) for model in to_eval}
-    
-    # Initialize metrics tracking
-    metrics = {
-        get_model_display_name(model.id): {
-            'wer': [],
-            'cer': [],
-            'accuracy': [],
-            'exec_time': [],
-            'total_images': 0
-        } for model in to_eval
-    }
-    
-    # Run models on each image
-    for image_path in image_paths:
-        console.print(Text(f"\nProcessing image: {image_path}", style="dim"))
-        executor = ThreadPoolExecutor()
-        tasks = [run_model(agents[get_model_display_name(model.id)], model, executor, image_path) for model in to_eval]
-        for task in asyncio.as_completed(tasks):
-            model_id, wer, cer, accuracy, exec_time = await task
-            # Update metrics
-            metrics[model_id]['wer'].append(wer)
-            metrics[model_id]['cer'].append(cer)
-            metrics[model_id]['accuracy'].append(accuracy)
-            metrics[model_id]['exec_time'].append(exec_time)
-            metrics[model_id]['total_images'] += 1
-        executor.shutdown(wait=True)
+    result_console.print(Text(f"\n(🤖) {display_name}", style="bold blue"))
+    if duplicate_of:
+        result_console.print(Text(f"{image_path} (same image as {duplicate_of})", style="dim"))
+    elif packed_lines:
+        result_console.print(Text(f"{image_path} (line of a {packed_lines}-line request)", style="dim"))
+    else:
+        result_console.print(Text(image_path, style="dim"))
+    if truncated:
+        result_console.print(Text("✂️  Generation stopped: output exceeded the ground truth based limit", style="yellow"))
+    result_console.print(response_table(response))
+    result_console.print(diff)
+    result_console.print(Text(f"WER: {wer:.2%}", style="bold cyan")) # Word error rate (Jiwer)
+    result_console.print(Text(f"CER: {cer:.2%}", style="bold cyan")) # Character error rate (Jiwer)
+    result_console.print(Text(f"Accuracy: {accuracy:.2%}", style="bold blue")) # Accuracy (diff match patch)
+    if exec_time is not None:
+        result_console.print(Text(f"Execution Time: {exec_time:.2f} seconds", style="bold yellow"))
+    if batch_time is not None:
+        result_console.print(Text(f"Share of Batch Time: {batch_time:.2f} seconds", style="yellow"))
+    if ttft is not None:
+        speed = f", {tokens_per_sec:.1f} tokens/sec" if tokens_per_sec is not None else ""
+        result_console.print(Text(f"Time to First Token: {ttft:.2f} seconds{speed}", style="yellow"))
+    result_console.print(Text("_" * 80, style="dim"))
     
-    # Calculate and display average metrics
+    to_json(model, gt, response, wer, cer, accuracy, exec_time, image_path, run_id=RUN_ID,
+            preprocessing=preprocessing, payload_bytes=payload_bytes, packed_lines=packed_lines,
+            batch_id=batch_id, ttft=ttft, tokens_per_sec=tokens_per_sec, truncated=truncated,
+            duplicate_of=duplicate_of, batch_time=batch_time)
+    
+    return display_name, {'wer': wer, 'cer': cer, 'accuracy': accuracy, 'time': exec_time,
+                          'ttft': ttft, 'tokens_per_sec': tokens_per_sec}
+
+
+def score_response(model, response, exec_time: Optional[float], image_path: str, **fields):
+    """Evaluate a transcription of an image against its ground truth, print and save the results.
+    
+    Args:
+        fields: Details of the result stored with it (see report_result)
+    
+    Returns:
+        Tuple of (model display name, metrics of the result)
+    """
+    response = prepare_response(model, response)
+    scores = score_transcription(str(gt_path_for(image_path)), response.content)
+    return report_result(model, response, exec_time, image_path, *scores, **fields)
+
+
+async def submit_response(pipeline: Optional[ScoringPipeline], model, response, exec_time: float, image_path: str,
+                          **fields):
+    """Evaluate a transcription like score_response, through the scoring pipeline when there is one."""
+    if pipeline is None:
+        return score_response(model, response, exec_time, image_path, **fields)
+    response = prepare_response(model, response)
+    return await pipeline.process(score_transcription, (str(gt_path_for(image_path)), response.content),
+                                  partial(report_result, model, response, exec_time, image_path, **fields))
+
+
+def gt_length(image_path: str) -> int:
+    """Number of characters of the ground truth of an image, from the catalog when it is cataloged."""
+    entry = get_catalog().entry(image_path)
+    if entry is not None and entry["gt_length"] is not None:
+        return entry["gt_length"]
+    return len(str(read_dataset_buffer(gt_path_for(image_path)), 'utf-8').rstrip('\n'))
+
+
+async def run_agent(agents: AgentPool, executor, prompt: str, images: list, stream: bool = False,
+                    max_chars: Optional[int] = None, max_tokens: Optional[int] = None,
+                    policy: Optional[RequestPolicy] = None):
+    """Run an agent of the pool in a separate thread to avoid blocking.
+    
+    Args:
+        max_chars: Abort a streamed generation once its output is longer
+        max_tokens: Output token limit of the model, a response reaching it was cut off
+        policy: Deadline and hedging of the model's requests
+    
+    Returns:
+        Tuple of (response, total time, time to first token, tokens per second, truncated),
+        the streaming timings being None unless the response is streamed
+    """
+    def call(agent):
+        if stream:
+            return run_streaming(agent, prompt, images, max_chars)
+        response: RunResponse = agent.run(prompt, images=images, stream=False)
+        return response, None, None, False
+    
+    start = time.time()
+    response, ttft, tokens_per_sec, truncated = await run_with_policy(call, agents, executor, policy)
+    if not truncated and max_tokens is not None:
+        truncated = sum((response.metrics or {}).get("output_tokens") or []) >= max_tokens
+    return response, time.time() - start, ttft, tokens_per_sec, truncated
+
+
+async def run_model(agents: AgentPool, model, executor, image_path: str, stream: bool = False,
+                    max_output_ratio: Optional[float] = None, max_tokens: Optional[int] = None,
+                    policy: Optional[RequestPolicy] = None, duplicates: Optional[dict] = None,
+                    pipeline: Optional[ScoringPipeline] = None):
+    """Run a model on an image, performing OCR and evaluating the results.
+    
+    With max_output_ratio, a streamed generation is aborted once it exceeds that
+    multiple of the ground truth length and the result is recorded as truncated.
+    The transcription is also scored for the byte-identical images listed in duplicates
+    (image path -> every path with the same content). Images are prepared in the
+    executor and results scored in the pipeline, keeping the event loop free.
+    """
+    def prepare():
+        # Preprocessed once per image and profile, then served from the cache
+        payload = load_image(image_path, get_model_provider(model.id))
+        return payload, create_image_obj(model, image_path, payload)
+    payload, image_obj = await asyncio.get_running_loop().run_in_executor(executor, prepare)
+    max_chars = int(max_output_ratio * gt_length(image_path)) if max_output_ratio else None
+    
+    response, exec_time, ttft, tokens_per_sec, truncated = await run_agent(
+        agents, executor, PROMPT, [image_obj], stream, max_chars, max_tokens, policy)
+    
+    return await asyncio.gather(*(
+        submit_response(pipeline, model, response, exec_time, path,
+                        payload_bytes=len(payload[0]), preprocessing=payload[2],
+                        ttft=ttft, tokens_per_sec=tokens_per_sec, truncated=truncated,
+                        duplicate_of=image_path if path != image_path else None)
+        for path in (duplicates or {}).get(image_path, [image_path])
+    ))
+
+
+async def run_model_packed(agents: AgentPool, model, executor, image_paths: list[str], packing: str = "images",
+                           stream: bool = False, max_output_ratio: Optional[float] = None,
+                           max_tokens: Optional[int] = None, policy: Optional[RequestPolicy] = None,
+                           duplicates: Optional[dict] = None, pipeline: Optional[ScoringPipeline] = None):
+    """Run a model on several line images in a single request and evaluate each line separately.
+    
+    The lines are either sent as separate images of one message ('images') or tiled into
+    one numbered composite image ('tile'). The model returns a numbered transcription
+    that is split back into one result per line; each line is credited with an equal
+    share of the request time; streaming timings are those of the whole request. Each
+    line's transcription is also scored for its duplicates, as in run_model.
+    """
+    def prepare():
+        payloads = [load_image(image_path, get_model_provider(model.id)) for image_path in image_paths]
+        if packing == "tile":
+            composite = tile_images([payload[0] for payload in payloads])
+            return payloads, [create_image_obj(model, image_paths[0], (composite, "image/png", payloads[0][2]))]
+        return payloads, [create_image_obj(model, image_path, payload) for image_path, payload in zip(image_paths, payloads)]
+    payloads, images = await asyncio.get_running_loop().run_in_executor(executor, prepare)
+    # Each line is prefixed with its number ('12: ')
+    max_chars = (int(max_output_ratio * sum(gt_length(image_path) + 4 for image_path in image_paths))
+                 if max_output_ratio else None)
+    
+    response, exec_time, ttft, tokens_per_sec, truncated = await run_agent(
+        agents, executor, build_prompt(len(image_paths), packing), images, stream, max_chars, max_tokens, policy)
+    
+    transcriptions = split_response(response.content, len(image_paths))
+    return await asyncio.gather(*(
+        submit_response(pipeline, model, RunResponse(content=transcription, model=response.model),
+                        exec_time / len(image_paths), path, payload_bytes=len(payload[0]), preprocessing=payload[2],
+                        packed_lines=len(image_paths), ttft=ttft, tokens_per_sec=tokens_per_sec, truncated=truncated,
+                        duplicate_of=image_path if path != image_path else None)
+        for image_path, payload, transcription in zip(image_paths, payloads, transcriptions)
+        for path in (duplicates or {}).get(image_path, [image_path])
+    ))
+    
+
+def print_average_metrics(metrics: dict, source: str, throughput_note=None):
+    """Print the average metrics of each model."""
     console.print(Text("\n" + "="*80, style="bold blue"))
     console.print(Text("AVERAGE METRICS PER MODEL", style="bold blue"))
     console.print(Text("="*80, style="bold blue"))
     
     # Print average metrics for each model
     for model_id, model_metrics in metrics.items():
-        if model_metrics['total_images'] > 0:
-            avg_wer = sum(model_metrics['wer']) / len(model_metrics['wer'])
-            avg_cer = sum(model_metrics['cer']) / len(model_metrics['cer'])
-            avg_accuracy = sum(model_metrics['accuracy']) / len(model_metrics['accuracy'])
-            avg_exec_time = sum(model_metrics['exec_time']) / len(model_metrics['exec_time'])
-            tot_images = model_metrics['total_images']
+        tot_images = model_metrics['wer'].count
+        if tot_images > 0:
+            cer_interval = model_metrics['cer'].interval()
+            time_stats = model_metrics['time']
             
             console.print(Text(f"\n(🤖) {model_id}", style="bold blue"))
             console.print(Text(f"Source: {source}", style="dim"))
             console.print(Text(f"Images processed: {tot_images}", style="dim"))
-            console.print(Text(f"Average WER: {avg_wer:.2%}", style="bold cyan"))
-            console.print(Text(f"Average CER: {avg_cer:.2%}", style="bold cyan"))
-            console.print(Text(f"Average Accuracy: {avg_accuracy:.2%}", style="bold blue"))
-            console.print(Text(f"Average Execution Time: {avg_exec_time:.2f} seconds", style="bold yellow"))
+            console.print(Text(f"Average WER: {model_metrics['wer'].mean:.2%}", style="bold cyan"))
+            console.print(Text(f"Average CER: {model_metrics['cer'].mean:.2%}", style="bold cyan"))
+            if cer_interval:
+                console.print(Text(f"CER 95% CI: {cer_interval[0]:.2%} - {cer_interval[1]:.2%}", style="cyan"))
+            console.print(Text(f"Average Accuracy: {model_metrics['accuracy'].mean:.2%}", style="bold blue"))
+            if time_stats.count:
+                # Batch results have no request latency
+                console.print(Text(f"Average Execution Time: {time_stats.mean:.2f} seconds", style="bold yellow"))
+                console.print(Text(f"Latency p50/p90/p99: {time_stats.quantile(0.5):.2f} / {time_stats.quantile(0.9):.2f} / {time_stats.quantile(0.99):.2f} seconds", style="yellow"))
+            if model_metrics['ttft'].count:
+                ttft_stats = model_metrics['ttft']
+                console.print(Text(f"Time to First Token p50/p90: {ttft_stats.quantile(0.5):.2f} / {ttft_stats.quantile(0.9):.2f} seconds", style="yellow"))
+            if model_metrics['tokens_per_sec'].count:
+                console.print(Text(f"Average Generation Speed: {model_metrics['tokens_per_sec'].mean:.1f} tokens/sec", style="yellow"))
+            if throughput_note:
+                console.print(Text(throughput_note(tot_images), style="yellow"))
             console.print(Text("_"*80, style="dim"))
 
 
+async def run_model_jobs(model, groups: list[list[str]], limiter: AdaptiveLimiter, breaker: CircuitBreaker,
+                         failed_jobs: FailedJobs, executor, model_metrics: dict, packing: str = "images",
+                         stream: bool = False, max_output_ratio: Optional[float] = None, max_tokens: Optional[int] = None,
+                         policy: Optional[RequestPolicy] = None, progress: Optional[ProgressTracker] = None,
+                         duplicates: Optional[dict] = None, pipeline: Optional[ScoringPipeline] = None):
+    """Run a model on every group of images, keeping as many requests in flight as its limiter allows.
+    
+    Groups are dispatched in the order given, results are fanned out to the duplicates
+    of their images (image path -> every path with the same content). Retryable errors are retried with exponential backoff, fatal ones are not. Jobs that
+    still fail, or that the provider's circuit breaker refuses, are recorded in failed_jobs
+    for a later retry instead of stopping the run. Once the provider rejects the model
+    itself (e.g., unknown model), its remaining jobs are given up without a request.
+    """
+    display_name = get_model_display_name(model.id)
+    agents = AgentPool(lambda: create_agent(model))
+    model_error = None
+    
+    def with_duplicates(group: list[str]) -> list[str]:
+        return [path for image_path in group for path in (duplicates or {}).get(image_path, [image_path])]
+    
+    def give_up(group: list[str], error: str, kind: str):
+        if progress is not None:
+            progress.finish(display_name, tuple(group))
+        for image_path in with_duplicates(group):
+            failed_jobs.record(model.id, image_path, error, kind, RUN_ID)
+        result_console.print(Text(f"⚠️  {display_name} failed on {', '.join(group)} ({kind}): {error}", style="yellow"))
+    
+    async def run_group(group: list[str]):
+        for attempt in range(RETRIES + 1):
+            if await run_attempt(group, attempt):
+                return
+            await asyncio.sleep(RETRY_DELAY * 2 ** attempt)
+    
+    async def run_attempt(group: list[str], attempt: int) -> bool:
+        """Send a group once, returns whether it is done (succeeded or given up)."""
+        nonlocal model_error
+        error = None
+        probe = False
+        try:
+            async with limiter:
+                # Checked once the job has a slot, the breaker may have opened or the model been rejected meanwhile
+                if model_error is not None:
+                    give_up(group, f"model rejected: {model_error}", FATAL)
+                    return True
+                if not breaker.allow():
+                    give_up(group, f"circuit open after: {breaker.last_error}", RETRYABLE)
+                    return True
+                probe = breaker.state == CircuitBreaker.HALF_OPEN
+                try:
+                    if len(group) > 1:
+                        results = await run_model_packed(agents, model, executor, group, packing, stream,
+                                                         max_output_ratio, max_tokens, policy, duplicates, pipeline)
+                    else:
+                        results = await run_model(agents, model, executor, group[0], stream,
+                                                  max_output_ratio, max_tokens, policy, duplicates, pipeline)
+                except Exception as e:
+                    error, kind = e, classify_error(e)
+                    limiter.record_failure(error_status(e))
+                if error is None:
+                    # Packed lines each carry a share of the request time, duplicates repeat it
+                    latency = sum(result['time'] for path, (_, result) in zip(with_duplicates(group), results)
+                                  if path in group)
+                    limiter.record_success(latency)
+            
+            if error is None:
+                if progress is not None:
+                    progress.finish(display_name, tuple(group), latency)
+                breaker.record_success()
+                for image_path in with_duplicates(group):
+                    failed_jobs.clear(model.id, image_path)
+                for _, result in results:
+                    add_result(model_metrics, result)
+                return True
+            
+            if is_model_error(error):
+                # Concerns this model only, not the other models of the provider
+                if model_error is None:
+                    model_error = str(error)
+                    console.print(Text(f"🚫 {display_name} rejected by the provider: {error}", style="bold red"))
+            elif is_provider_error(error) and breaker.record_failure(error):
+                console.print(Text(f"🔌 Circuit open for {breaker.name} after: {error}, probing again in {breaker.reset_timeout:.0f}s",
+                                   style="bold red"))
+            if kind == FATAL or attempt == RETRIES:
+                give_up(group, str(error), kind)
+                return True
+            return False
+        finally:
+            if probe:
+                # A probe that failed on our side tells nothing about the provider
+                breaker.release_probe()
+    
+    await asyncio.gather(*(run_group(group) for group in groups))
+
+
+async def run_all(image_paths: list[str], source: str, lines_per_request: int = 1, packing: str = "images",
+                  models: Optional[list] = None, stream: bool = False, max_output_ratio: Optional[float] = None,
+                  max_concurrency: int = 8, model_images: Optional[dict] = None, max_hedge_rate: float = 0.05,
+                  longest_first: bool = True, eta_interval: float = 30, summary: bool = True, quiet: bool = False,
+                  limiters: Optional[dict] = None, breakers: Optional[dict] = None,
+                  pipeline: Optional[ScoringPipeline] = None):
+    """Run all models on a list of images and calculate average metrics.
+    
+    Models run side by side, each with an adaptive number of requests in flight
+    (up to max_concurrency) that grows while its latency is stable and backs off on
+    throttling errors or latency spikes. The limits over time are logged to
+    logs/concurrency/<run id>.csv.
+    
+    With lines_per_request > 1, consecutive images are packed into multi-line requests.
+    With stream, responses are streamed to record time to first token and tokens/sec.
+    With max_output_ratio, output is limited relative to the ground truth length.
+    With model_images (model ID -> image paths), models only run on their own images.
+    Byte-identical images (same content hash in the catalog) are sent once per model.
+    Requests follow the deadline and hedging settings of their model, with at most
+    max_hedge_rate of a model's requests hedged.
+    
+    Each provider has a circuit breaker shared by its models; failed jobs are recorded
+    in .cache/failed_jobs.json.
+    
+    Runs that follow each other (e.g., rounds of adaptive sampling) can pass the
+    limiters (per model ID), breakers (per provider) and scoring pipeline of the
+    previous ones, so the concurrency learned and the open breakers carry over and no
+    pool of scoring processes is started per run.
+    
+    With longest_first, each model's jobs are dispatched longest expected first, their
+    duration predicted from the model's past latency in the warehouse and the ground
+    truth length, so that long jobs don't end up alone at the tail of the run. An ETA
+    is printed every eta_interval seconds.
+    
+    With quiet, a table of the progress of each model (completed, failed, in flight,
+    throughput, running CER) and the ETA replace the ETA lines; the per-result output
+    goes where log_results sent it.
+    
+    Returns:
+        Metric summaries of the run per model display name (also printed with summary)
+    """
+    models = to_eval if models is None else models
+    
+    # Byte-identical images are sent once per model, their results are fanned out to every copy
+    if model_images:
+        duplicates = {model.id: group_duplicates(model_images[model.id]) for model in models}
+    else:
+        shared = group_duplicates(image_paths)
+        duplicates = {model.id: shared for model in models}
+    skipped = sum(len(model_images[model.id] if model_images else image_paths) - len(duplicates[model.id]) for model in models)
+    if skipped:
+        console.print(Text(f"Reusing transcriptions for {skipped} jobs on duplicate images", style="dim cyan"))
+    
+    # Run models on each image (or group of images packed into one request)
+    def group_images(paths: list[str]) -> list[list[str]]:
+        return [paths[i:i + lines_per_request] for i in range(0, len(paths), lines_per_request)]
+    model_groups = {model.id: group_images(list(duplicates[model.id])) for model in models}
+    groups = [group for model_id in model_groups for group in model_groups[model_id]]
+    
+    # Model parameters are shared by all requests, so the token limit covers the longest request of the run;
+    # the limit sent to each model is the one a truncated response of it reaches
+    token_limits = {}
+    for model in models:
+        model_cfg = get_model_config(model.id)
+        token_limits[model.id] = model_cfg.max_output_tokens if model_cfg else None
+    if max_output_ratio and groups:
+        longest = max(sum(gt_length(image_path) + (4 if len(group) > 1 else 0) for image_path in group) for group in groups)
+        max_tokens = output_token_limit(longest, max_output_ratio)
+        for model in models:
+            token_limits[model.id] = cap_output_tokens(model, max_tokens, token_limits[model.id])
+    
+    # Initialize single-pass metric summaries
+    metrics = {get_model_display_name(model.id): new_model_stats() for model in models}
+    if limiters is None:
+        limiters = new_limiters(models, max_concurrency)
+    if breakers is None:
+        breakers = new_breakers(models)
+    # Only the limiters of the models of this run are reported
+    limiters = {model.id: limiters[model.id] for model in models}
+    failed_jobs = FailedJobs()
+    policies = {}
+    for model in models:
+        model_cfg = get_model_config(model.id)
+        policies[model.id] = RequestPolicy(get_model_display_name(model.id), deadline=model_cfg and model_cfg.deadline,
+                                           hedge=bool(model_cfg and model_cfg.hedge), max_rate=max_hedge_rate)
+    # Hedges get threads of their own, as many as the policies let run at once
+    hedge_executor = ThreadPoolExecutor(max_workers=max(1, sum(policy.max_in_flight for policy in policies.values()
+                                                              if policy.hedge)),
+                                        thread_name_prefix="hedge")
+    for policy in policies.values():
+        policy.hedge_executor = hedge_executor
+    
+    # Expected duration of every job, from the model's past latency and the ground truth length
+    latency_model = LatencyModel.from_warehouse(list(metrics))
+    lengths = {image_path: gt_length(image_path) for group in groups for image_path in group}
+    progress = ProgressTracker()
+    for model in models:
+        display_name = get_model_display_name(model.id)
+        expected = {tuple(group): latency_model.predict(display_name, sum(lengths[image_path] + (4 if len(group) > 1 else 0)
+                                                                          for image_path in group))
+                    for group in model_groups[model.id]}
+        if longest_first:
+            model_groups[model.id] = sorted(model_groups[model.id], key=lambda group: expected[tuple(group)], reverse=True)
+        for group in model_groups[model.id]:
+            progress.add(display_name, tuple(group), expected[tuple(group)])
+    
+    def eta_status() -> str:
+        eta = progress.eta({limiter.name: limiter.limit for limiter in limiters.values()})
+        return f"⏱️  {progress.done}/{progress.total} jobs done, ETA {format_duration(eta)}"
+    
+    async def report_eta():
+        while True:
+            await asyncio.sleep(eta_interval)
+            console.print(Text(eta_status(), style="bold magenta"))
+    
+    console.print(Text(f"\nProcessing {len(image_paths)} images with {len(models)} models", style="dim"))
+    run_start = time.time()
+    if quiet:
+        limiter_of = {limiter.name: limiter for limiter in limiters.values()}
+        table = ProgressTable(metrics, progress.failed, lambda name: limiter_of[name].in_flight, eta_status)
+        display = asyncio.create_task(table.show(console, snapshot_interval=eta_interval))
+    else:
+        display = asyncio.create_task(report_eta())
+    # One thread per request the limiters can allow at once, plus as many for abandoned requests
+    executor = ThreadPoolExecutor(max_workers=max(1, 2 * max_concurrency * len(models)))
+    try:
+        # Scoring, printing and saving results happen outside the event loop
+        async with contextlib.nullcontext(pipeline) if pipeline else ScoringPipeline() as pipeline:
+            await asyncio.gather(*(
+                run_model_jobs(model, model_groups[model.id], limiters[model.id], breakers[get_model_provider(model.id)],
+                               failed_jobs, executor, metrics[get_model_display_name(model.id)],
+                               packing, stream, max_output_ratio, token_limits[model.id], policies[model.id], progress,
+                               duplicates[model.id], pipeline)
+                for model in models
+            ))
+    finally:
+        display.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await display
+        executor.shutdown(wait=True)
+        hedge_executor.shutdown(wait=True)
+        failed_jobs.flush()
+        log_path = save_concurrency_log(list(limiters.values()), RUN_ID)
+    elapsed = time.time() - run_start
+    
+    for limiter in limiters.values():
+        peak = max(limit for _, limit, _, _, _ in limiter.history)
+        console.print(Text(f"{limiter.name}: concurrency {int(limiter.limit)} at the end, peak {int(peak)}", style="dim"))
+    for policy in policies.values():
+        if policy.hedges:
+            console.print(Text(f"{policy.name}: hedged {policy.hedges} of {policy.requests} requests, "
+                               f"the duplicate won {policy.hedge_wins} times", style="dim"))
+    console.print(Text(f"Concurrency log: {log_path}", style="dim"))
+    failed = [job for job in failed_jobs.pending() if job["run_id"] == RUN_ID]
+    if failed:
+        console.print(Text(f"⚠️  {len(failed)} jobs failed, retry them with retry_failed: true "
+                           f"(list them with python -m models.failures)", style="yellow"))
+    
+    # Calculate and display average metrics
+    throughput_note = None
+    if lines_per_request > 1:
+        throughput_note = lambda lines: f"Lines per request: {lines_per_request} ({packing}), throughput: {lines / elapsed:.2f} lines/sec"
+    if summary:
+        print_average_metrics(metrics, source, throughput_note)
+    return metrics
+
+
+def new_limiters(models: list, max_concurrency: int = 8) -> dict:
+    """Adaptive concurrency limiter of every model, by model ID."""
+    return {model.id: AdaptiveLimiter(get_model_display_name(model.id), maximum=max_concurrency) for model in models}
+
+
+def new_breakers(models: list) -> dict:
+    """Circuit breaker of every provider of the models, by provider."""
+    return {provider: CircuitBreaker(provider or "unknown") for provider in {get_model_provider(model.id) for model in models}}
+
+
+async def run_adaptive(image_paths: list[str], source: str, budget: int, target_width: float, min_images: int = 20,
+                       models: Optional[list] = None, **run_options):
+    """Evaluate each model on as many images of a source as its CER needs.
+    
+    Stored results of the source are reused; a model then gets rounds of new images
+    until the confidence interval of its mean CER is at most target_width wide, or
+    budget new images were evaluated. Models with a stable CER thus stop early.
+    
+    The rounds share their limiters, breakers and scoring pipeline, so the concurrency
+    of a model doesn't start over at every round.
+    
+    Args:
+        image_paths: Images of the source to draw from
+        budget: Maximum number of new images evaluated per model
+        target_width: Width of the 95% confidence interval of the mean CER to reach (e.g., 0.02)
+        min_images: Results needed before a model may stop
+        run_options: Options passed to run_all for every round
+    """
+    models = to_eval if models is None else models
+    names = {get_model_display_name(model.id): model.id for model in models}
+    sampler = SequentialSampler(image_paths, load_stored_results(image_paths, names), target_width, budget, min_images)
+    for display_name, model_id in names.items():
+        console.print(Text(f"{display_name}: reusing {sampler.reused[model_id]} stored results", style="dim cyan"))
+    
+    limiters = new_limiters(models, run_options.get("max_concurrency", 8))
+    breakers = new_breakers(models)
+    round_number = 0
+    async with ScoringPipeline() as pipeline:
+        while model_images := sampler.next_round():
+            round_number += 1
+            round_models = [model for model in models if model_images.get(model.id)]
+            console.print(Text(f"\nRound {round_number}: " + ", ".join(
+                f"{get_model_display_name(model.id)} +{len(model_images[model.id])}" for model in round_models), style="bold cyan"))
+            round_paths = sorted({image_path for model in round_models for image_path in model_images[model.id]})
+            metrics = await run_all(round_paths, source, models=round_models, model_images=model_images, summary=False,
+                                    limiters=limiters, breakers=breakers, pipeline=pipeline, **run_options)
+            for model in round_models:
+                sampler.update(model.id, metrics[get_model_display_name(model.id)])
+    
+    for display_name, model_id in names.items():
+        width = sampler.width(model_id)
+        console.print(Text(f"{display_name}: {sampler.status(model_id)} after {sampler.spent[model_id]} new images, "
+                           f"CER 95% CI width {'n/a' if width is None else f'{width:.2%}'}", style="dim"))
+    print_average_metrics({display_name: sampler.stats[model_id] for display_name, model_id in names.items()}, source)
+
+
+async def run_stratified(source: str, total: int, models: Optional[list] = None, seed: Optional[int] = None,
+                         **run_options) -> list[str]:
+    """Evaluate a stratified sample of every subcategory under a folder (e.g., the whole corpus) in one run.
+    
+    The sample is spread over category, period and line length strata in proportion
+    to their sizes, preferring images that already have stored results; each model
+    is only run on the sampled images it has no result for.
+    
+    Returns:
+        Subcategory folders of the sampled images
+    """
+    models = to_eval if models is None else models
+    catalog = get_catalog()
+    folders = list_subcategories(source)
+    catalog.refresh(folders)
+    entries = [entry for folder in folders for entry in catalog.images(folder=folder)]
+    
+    names = {get_model_display_name(model.id): model.id for model in models}
+    stored = load_stored_results([entry["path"] for entry in entries], names)
+    evaluated = {}
+    for results in stored.values():
+        for image_path in results:
+            evaluated[image_path] = evaluated.get(image_path, 0) + 1
+    sample = stratified_sample(entries, total, evaluated, seed)
+    strata = stratum_keys(entries)
+    console.print(Text(f"\nSampled {len(sample)} of {len(entries)} images from {len({strata[path] for path in sample})} strata "
+                       f"(category, period, line length) across {len({os.path.dirname(path) for path in sample})} subcategories",
+                       style="dim cyan"))
+    
+    # Stored results count as they are, only missing evaluations are run
+    metrics = {display_name: new_model_stats() for display_name in names}
+    model_images = {}
+    for display_name, model_id in names.items():
+        for image_path in sample:
+            if image_path in stored[model_id]:
+                add_result(metrics[display_name], stored[model_id][image_path])
+        model_images[model_id] = [image_path for image_path in sample if image_path not in stored[model_id]]
+        console.print(Text(f"{display_name}: reusing {len(sample) - len(model_images[model_id])} stored results, "
+                           f"{len(model_images[model_id])} to evaluate", style="dim cyan"))
+    
+    run_models = [model for model in models if model_images[model.id]]
+    if run_models:
+        new_metrics = await run_all(sorted({path for model in run_models for path in model_images[model.id]}), source,
+                                    models=run_models, model_images=model_images, summary=False, **run_options)
+        for display_name, model_stats in new_metrics.items():
+            for metric, metric_stats in model_stats.items():
+                metrics[display_name].setdefault(metric, MetricStats()).merge(metric_stats)
+    print_average_metrics(metrics, f"{source} (stratified sample)")
+    return sorted({os.path.dirname(path) for path in sample})
+
+
+def run_batches(image_paths: list[str], source: str, poll_interval: float = POLL_INTERVAL) -> list:
+    """Evaluate images through the providers' asynchronous batch endpoints.
+    
+    All jobs of a model (one per distinct image) are submitted as one batch, polled
+    until it finishes and ingested through the normal metrics and save path.
+    Byte-identical images are submitted once and their results fanned out. Batches
+    left over by an interrupted run of the same source are ingested first. Jobs that
+    failed or were not run before the batch ended are recorded in the failed jobs,
+    for a later retry.
+    
+    Batch results carry a share of the batch time (batch_time) instead of a request
+    latency, so they stay out of the latency statistics.
+    
+    Returns:
+        Models without a supported batch endpoint, to be run synchronously
+    """
+    models_by_id = {model.id: model for model in to_eval}
+    batched = [model.id for model in to_eval if get_batch_transport(model) is not None]
+    metrics = {get_model_display_name(model_id): new_model_stats() for model_id in batched}
+    failed_jobs = FailedJobs()
+    
+    # (transport, batch_id, jobs, submitted_at)
+    batches = []
+    for state in pending_batches(source):
+        model = models_by_id.get(state["jobs"][0].model_id)
+        if model is None or get_batch_transport(model) is None:
+            console.print(Text(f"⚠️  Skipping pending batch {state['batch_id']}: its models are not enabled", style="yellow"))
+            continue
+        console.print(Text(f"Resuming batch {state['batch_id']} ({len(state['jobs'])} jobs)", style="dim cyan"))
+        batches.append((get_batch_transport(model), state["batch_id"], state["jobs"], state["submitted_at"]))
+    
+    # One batch per model, submitted with the model's own transport, with one job per distinct image
+    duplicates = group_duplicates(image_paths)
+    for model_id in batched:
+        model = models_by_id[model_id]
+        jobs = [BatchJob(custom_id=f"job-{i}", model_id=model_id, image_path=image_path)
+                for i, image_path in enumerate(duplicates)]
+        if not jobs:
+            continue
+        transport = get_batch_transport(model)
+        requests = [build_request(job, model) for job in jobs]
+        batch_id = transport.submit(requests)
+        submitted_at = time.time()
+        save_batch_state(batch_id, get_model_provider(model_id), source, jobs, submitted_at)
+        console.print(Text(f"Submitted batch {batch_id} for {get_model_display_name(model_id)} ({len(jobs)} jobs)",
+                           style="dim cyan"))
+        batches.append((transport, batch_id, jobs, submitted_at))
+    
+    for transport, batch_id, jobs, submitted_at in batches:
+        status, results = wait_for_batch(
+            transport, batch_id, poll_interval,
+            on_status=lambda status: console.print(Text(f"Batch {batch_id}: {status.state} {status.counts or ''}", style="dim"))
+        )
+        # Batch latency is not comparable to interactive calls, credit each job with a share of the batch time
+        batch_time = (time.time() - submitted_at) / len(jobs)
+        failed = 0
+        for job in jobs:
+            model = models_by_id.get(job.model_id)
+            if model is None:
+                continue
+            paths = duplicates.get(job.image_path, [job.image_path])
+            result = results.get(job.custom_id)
+            if result is None or result.error is not None:
+                failed += 1
+                error, kind = ((f"not run before the batch ended ({status.state})", RETRYABLE) if result is None
+                               else (result.error, FATAL))
+                for path in paths:
+                    failed_jobs.record(job.model_id, path, error, kind, RUN_ID)
+                continue
+            for path in paths:
+                model_id, scores = score_response(
+                    model, RunResponse(content=result.content), None, path, batch_time=batch_time,
+                    payload_bytes=job.payload_bytes, preprocessing=job.preprocessing, batch_id=batch_id,
+                    duplicate_of=job.image_path if path != job.image_path else None)
+                failed_jobs.clear(job.model_id, path)
+                add_result(metrics.setdefault(model_id, new_model_stats()), scores)
+        if failed:
+            console.print(Text(f"⚠️  Batch {batch_id} ({status.state}): {failed} of {len(jobs)} jobs failed, "
+                               f"retry them with retry_failed: true", style="yellow"))
+        failed_jobs.flush()
+        forget_batch(batch_id)
+    
+    print_average_metrics(metrics, source)
+    return [model for model in to_eval if model.id not in batched]
+
+
 def select_images_with_priority(source: str, all_images: list[str], images_to_process: int, prioritize_scanned: bool) -> list[str]:
     """Select images with optional prioritization for already scanned images missing model evaluations."""
     if not prioritize_scanned:
@@ -141,20 +762,15 @@ def select_images_with_priority(source: str, all_images: list[str], images_to_pr
     model_names = [get_model_display_name(model.id) for model in to_eval]
     
     # Find images that have JSON files but are missing evaluations for some models
-    output_folder = Path("docs/data/json") / source
     priority_images = []
     regular_images = []
+    scanned_images = 0
     
     for img in all_images:
-        # Extract filename preserving double extension (e.g., "00001.bin" from "00001.bin.png")
-        img_path = Path(img)
-        if img_path.name.endswith('.png'):
-            img_name = img_path.name[:-4]  # Remove '.png' extension
-        else:
-            img_name = img_path.stem
-        json_file = output_folder / f"{img_name}.json"
+        json_file = result_path(Path(source) / img)
         
         if json_file.exists():
+            scanned_images += 1
             try:
                 # Load existing JSON to check which models are missing
                 with open(json_file, 'r') as f:
@@ -193,8 +809,7 @@ def select_images_with_priority(source: str, all_images: list[str], images_to_pr
         console.print(Text(f"Selected {regular_to_add} additional images", style="dim cyan"))
     
     # Summary
-    total_with_json = len(priority_images) + len([img for img in regular_images if (output_folder / f"{Path(img).name[:-4] if img.endswith('.png') else Path(img).stem}.json").exists()])
-    console.print(Text(f"Priority analysis: {len(priority_images)} images missing evaluations, {total_with_json} total with JSON files", style="dim"))
+    console.print(Text(f"Priority analysis: {len(priority_images)} images missing evaluations, {scanned_images} total with JSON files", style="dim"))
     
     if len(selected_images) < images_to_process:
         console.print(Text(f"Note: Only {len(selected_images)} images available (requested {images_to_process})", style="dim yellow"))
@@ -203,6 +818,12 @@ def select_images_with_priority(source: str, all_images: list[str], images_to_pr
 
 
 def main():
+    # Files opened for the run (the per-result log) are closed however it ends
+    with contextlib.ExitStack() as resources:
+        run_benchmark(resources)
+
+
+def run_benchmark(resources: contextlib.ExitStack):
     # Check if we have any models to evaluate
     if not to_eval:
         console.print(Text("❌ No models configured for evaluation. Please check your models configuration.", style="bold red"))
@@ -214,47 +835,132 @@ def main():
         source = input_cfg.path
         images_to_process = input_cfg.images_to_process
         prioritize_scanned = getattr(input_cfg, 'prioritize_scanned', False)
+        lines_per_request = input_cfg.lines_per_request
+        packing = input_cfg.packing
+        batch_mode = input_cfg.batch
+        stream = input_cfg.stream
+        max_output_ratio = input_cfg.max_output_ratio
+        max_concurrency = input_cfg.max_concurrency
+        retry_failed = input_cfg.retry_failed
+        max_hedge_rate = input_cfg.max_hedge_rate
+        longest_first = input_cfg.longest_first
+        adaptive = input_cfg.adaptive
+        target_cer_ci = input_cfg.target_cer_ci
+        min_images = input_cfg.min_images
+        stratified = input_cfg.stratified
+        output = input_cfg.output
     except Exception as e:
         console.print(f"❌ Configuration error: {e}", style="bold red")
         return
     
-    all_images = [f for f in os.listdir(source) if f.endswith('.png')]
+    # Headless runs (no terminal) show progress only, unless verbose output is asked for
+    quiet = output == "progress" or (output == "auto" and not console.is_terminal)
+    if quiet:
+        log_path = resources.enter_context(log_results())
+        console.print(Text(f"Per-result output is written to {log_path}", style="dim"))
     
-    if not all_images:
-        console.print(Text(f"❌ No images found in {source}", style="bold red"))
-        return
-    
-    if len(all_images) < images_to_process:
-        console.print(Text(f"Warning: Only {len(all_images)} images available, processing all of them", style="yellow"))
-        images_to_process = len(all_images)
-    
-    # Select images with optional prioritization
-    selected_images = select_images_with_priority(source, all_images, images_to_process, prioritize_scanned)
-    image_paths = [os.path.join(source, img) for img in selected_images]
-    output_folder = "docs/data/json/" + source
-    
-    if prioritize_scanned:
-        console.print(Text(f"\nPrioritization enabled: selecting images missing model evaluations first", style="dim cyan"))
+    # Subcategory folders whose results change
+    folders = [source]
+    models = to_eval
+    model_images = None
     
-    console.print(Text(f"\nEvaluating {len(to_eval)} models across {len(image_paths)} images...", style="dim"))
+    if retry_failed:
+        # Only the jobs that failed earlier, for the models still enabled
+        enabled = {model.id for model in to_eval}
+        model_images = {}
+        for job in FailedJobs().pending(source):
+            if job["model_id"] in enabled:
+                model_images.setdefault(job["model_id"], []).append(job["image_path"])
+        if not model_images:
+            console.print(Text(f"No failed jobs to retry in {source}", style="bold green"))
+            return
+        models = [model for model in to_eval if model.id in model_images]
+        image_paths = sorted({image_path for paths in model_images.values() for image_path in paths})
+        folders = sorted({os.path.dirname(image_path) for image_path in image_paths})
+        batch_mode = False
+        console.print(Text(f"\nRetrying {sum(map(len, model_images.values()))} failed jobs across {len(image_paths)} images...", style="dim"))
+    elif stratified:
+        console.print(Text(f"\nEvaluating {len(to_eval)} models on a stratified sample of {images_to_process} images "
+                           f"under {source}...", style="dim"))
+    else:
+        all_images = list_images(source)
+        
+        if not all_images:
+            console.print(Text(f"❌ No images found in {source}", style="bold red"))
+            return
+        
+        if adaptive:
+            # Every image of the source may be drawn, images_to_process is the budget of new images per model
+            image_paths = [os.path.join(source, img) for img in all_images]
+            batch_mode = False
+            console.print(Text(f"\nSampling {len(to_eval)} models until their CER 95% CI is below {target_cer_ci:.2%} "
+                               f"(at most {images_to_process} new images each)...", style="dim"))
+        else:
+            if len(all_images) < images_to_process:
+                console.print(Text(f"Warning: Only {len(all_images)} images available, processing all of them", style="yellow"))
+                images_to_process = len(all_images)
+            
+            # Select images with optional prioritization
+            selected_images = select_images_with_priority(source, all_images, images_to_process, prioritize_scanned)
+            image_paths = [os.path.join(source, img) for img in selected_images]
+            
+            if prioritize_scanned:
+                console.print(Text(f"\nPrioritization enabled: selecting images missing model evaluations first", style="dim cyan"))
+            
+            console.print(Text(f"\nEvaluating {len(to_eval)} models across {len(image_paths)} images...", style="dim"))
     
     try:
         # Run the whole benchmark process
-        asyncio.run(run_all(image_paths, source))
+        if stratified and not retry_failed:
+            folders = asyncio.run(run_stratified(source, images_to_process, models=models,
+                                                 lines_per_request=lines_per_request, packing=packing, stream=stream,
+                                                 max_output_ratio=max_output_ratio, max_concurrency=max_concurrency,
+                                                 max_hedge_rate=max_hedge_rate, longest_first=longest_first, quiet=quiet))
+        elif adaptive and not retry_failed:
+            asyncio.run(run_adaptive(image_paths, source, images_to_process, target_cer_ci, min_images, models=models,
+                                     lines_per_request=lines_per_request, packing=packing, stream=stream,
+                                     max_output_ratio=max_output_ratio, max_concurrency=max_concurrency,
+                                     max_hedge_rate=max_hedge_rate, longest_first=longest_first, quiet=quiet))
+        elif batch_mode:
+            # Models without a batch endpoint still run synchronously
+            remaining_models = run_batches(image_paths, source)
+            if remaining_models:
+                asyncio.run(run_all(image_paths, source, lines_per_request, packing, models=remaining_models, stream=stream,
+                                    max_output_ratio=max_output_ratio, max_concurrency=max_concurrency,
+                                    max_hedge_rate=max_hedge_rate, longest_first=longest_first, quiet=quiet))
+        else:
+            asyncio.run(run_all(image_paths, source, lines_per_request, packing, models=models, stream=stream,
+                                max_output_ratio=max_output_ratio, max_concurrency=max_concurrency,
+                                model_images=model_images, max_hedge_rate=max_hedge_rate,
+                                longest_first=longest_first, quiet=quiet))
         
-        # Creating json report
-        aggregate_folder_results(output_folder)
+        # Creating json reports (folders where every job failed have no results yet)
+        aggregated_folders = []
+        for folder in folders:
+            try:
+                aggregate_folder_results("docs/data/json/" + folder)
+            except (FileNotFoundError, ValueError) as e:
+                console.print(Text(f"⚠️  No results to aggregate for {folder}: {e}", style="yellow"))
+                continue
+            aggregated_folders.append(folder)
         
         # Creating barcharts
-        create_graph(output_folder + ".json")
+        create_graphs("docs/data/json/" + folder + ".json" for folder in aggregated_folders)
         
         # Update dashboard manifest
         try:
             console.print(Text("Updating dashboard manifest...", style="dim"))
-            update_manifest(source)
+            for folder in aggregated_folders:
+                update_manifest(folder)
         except Exception as e:
             console.print(Text(f"⚠️  Could not update dashboard manifest: {e}", style="yellow"))
         
+        # Sync columnar results dataset for analytics
+        try:
+            sync_warehouse()
+        except Exception as e:
+            console.print(Text(f"⚠️  Could not sync results warehouse: {e}", style="yellow"))
+        
         console.print(Text("\nBenchmark completed. Results saved to docs/data/json/\n", style="bold green"))
     except ModelProviderError as e:
         console.print(f"❌ Provider error: {e}", style="bold red")
@@ -1,4 +1,5 @@
-from evaluation.graph import create_graph
+from evaluation.graph import create_graphs, CHART_FORMATS
+from utils.atomic import atomic_write_json
 
 import json
 import os
@@ -31,6 +32,29 @@ def scan_individual_files(subcategory_path):
     return sorted(individual_files)
 
 
+def scan_rollups(base_path="docs/data/json/GT4HistOCR/corpus"):
+    """
+    Scan for the category and corpus rollup files.
+    
+    Args:
+        base_path: Corpus results folder
+    
+    Returns:
+        Dictionary with the corpus rollup path and the rollup path of each category, relative to docs/data/json/
+    """
+    rollups = {"corpus": None, "categories": {}}
+    
+    if os.path.exists(f"{base_path}.json"):
+        rollups["corpus"] = "GT4HistOCR/corpus.json"
+    
+    if os.path.exists(base_path):
+        for category in sorted(os.listdir(base_path)):
+            if os.path.isdir(os.path.join(base_path, category)) and os.path.exists(os.path.join(base_path, f"{category}.json")):
+                rollups["categories"][category] = f"GT4HistOCR/corpus/{category}.json"
+    
+    return rollups
+
+
 def update_manifest(input_path):
     """
     Update the manifest.json file based on the input_path.
@@ -86,19 +110,52 @@ def update_manifest(input_path):
     if json_filepath not in manifest["files"]:
         manifest["files"].append(json_filepath)
     
+    manifest["rollups"] = scan_rollups()
     manifest["generated"] = datetime.now().isoformat()
     
-    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
-    with open(manifest_path, 'w', encoding='utf-8') as f:
-        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    atomic_write_json(manifest_path, manifest, indent=2, ensure_ascii=False)
     
     # print(f"Manifest updated successfully!")
 
 
-def regenerate_full_manifest():
+def remove_from_manifest(input_path):
+    """
+    Remove a subcategory whose results were deleted from the manifest.json file.
+    
+    Args:
+        input_path: Path like 'GT4HistOCR/corpus/EarlyModernLatin/1471-Orthographia-Tortellius'
+    """
+    manifest_path = "docs/data/json/manifest.json"
+    if not os.path.exists(manifest_path):
+        return
+    
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    
+    final_part = os.path.basename(input_path)
+    second_last_part = os.path.basename(os.path.dirname(input_path))
+    json_filepath = f"GT4HistOCR/corpus/{second_last_part}/{final_part}.json"
+    
+    category = manifest.get("structure", {}).get(second_last_part, {})
+    category.pop(final_part, None)
+    if not category:
+        manifest.get("structure", {}).pop(second_last_part, None)
+    if json_filepath in manifest.get("files", []):
+        manifest["files"].remove(json_filepath)
+    
+    manifest["rollups"] = scan_rollups()
+    manifest["generated"] = datetime.now().isoformat()
+    atomic_write_json(manifest_path, manifest, indent=2, ensure_ascii=False)
+
+
+def regenerate_full_manifest(render_graphs: bool = True, chart_format: str = "png"):
     """
     Regenerate the complete manifest by scanning all existing data.
     This is useful for updating the manifest structure after changes.
+    
+    Args:
+        render_graphs: Whether to redraw the chart of every aggregated file
+        chart_format: Chart output format ('png' or 'svg')
     """
     manifest_path = "docs/data/json/manifest.json"
     base_path = "docs/data/json/GT4HistOCR/corpus"
@@ -113,6 +170,7 @@ def regenerate_full_manifest():
         "structure": {},
         "files": []
     }
+    aggregated_paths = []
     
     # Scan all categories and subcategories
     for category in os.listdir(base_path):
@@ -132,7 +190,7 @@ def regenerate_full_manifest():
             if os.path.exists(aggregated_path):
                 # This is a subcategory with results
                 json_filepath = f"GT4HistOCR/corpus/{category}/{aggregated_file}"
-                create_graph("docs/data/json/" + json_filepath)
+                aggregated_paths.append("docs/data/json/" + json_filepath)
                 
                 # Scan for individual files
                 individual_files = scan_individual_files(item_path) if os.path.isdir(item_path) else []
@@ -148,10 +206,14 @@ def regenerate_full_manifest():
                 if json_filepath not in manifest["files"]:
                     manifest["files"].append(json_filepath)
     
+    manifest["rollups"] = scan_rollups(base_path)
+    
+    # Render all charts in one batch
+    if render_graphs:
+        create_graphs(aggregated_paths, fmt=chart_format)
+    
     # Save the regenerated manifest
-    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
-    with open(manifest_path, 'w', encoding='utf-8') as f:
-        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    atomic_write_json(manifest_path, manifest, indent=2, ensure_ascii=False)
     
     print(f"Full manifest regenerated with {len(manifest['files'])} aggregated files")
     total_individual = sum(
@@ -163,5 +225,12 @@ def regenerate_full_manifest():
 
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Regenerate the dashboard manifest and the charts of all aggregated files")
+    parser.add_argument('--chart-format', choices=CHART_FORMATS, default='png', help='Chart output format (default: png)')
+    parser.add_argument('--no-graphs', action='store_true', help='Only rebuild the manifest, without redrawing charts')
+    args = parser.parse_args()
+    
     # Regenerate the full manifest with direct run
-    regenerate_full_manifest()
+    regenerate_full_manifest(render_graphs=not args.no_graphs, chart_format=args.chart_format)
@@ -1,116 +1,170 @@
 import json
 import os
 import argparse
-import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Tuple
 
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
-from config.loader import load_config
+from config.loader import ConfigLoader
+from utils.atomic import atomic_write_json
+from utils.model_index import ModelIndex, is_aggregated_file
 
 def get_model_name_mapping() -> Dict[str, str]:
     """Get mapping from raw model IDs to standardized names."""
-    config = load_config(verbose=False)
+    # Only the models configuration is needed, so a missing dataset doesn't block renaming
+    models_config = ConfigLoader().load_models_config()
     mapping = {}
-    
-    for model in config.models_config.models:
+
+    for model in models_config.models:
         if model.standard_name:
             mapping[model.id] = model.standard_name
         else:
             mapping[model.id] = model.id
-    
+
     return mapping
 
-def find_all_json_files(base_path: Path) -> list[Path]:
-    """Find all JSON files in the directory tree, excluding manifest.json."""
-    json_files = []
-    
-    for root, dirs, files in os.walk(base_path):
-        for file in files:
-            if file.endswith('.json') and file != 'manifest.json':
-                json_files.append(Path(root) / file)
-    
-    return json_files
-
-
-
-def update_json_file(file_path: Path, name_mapping: Dict[str, str], dry_run: bool = False) -> int:
-    """Update a single JSON file to use standardized model names. Returns number of changes made."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if not isinstance(data, dict):
-            return 0
-        
-        changes = 0
-        new_data = {}
-        
-        for key, value in data.items():
-            if key in name_mapping and name_mapping[key] != key:
-                new_data[name_mapping[key]] = value
-                changes += 1
-            else:
-                new_data[key] = value
-        
-        if changes > 0 and not dry_run:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(new_data, f, indent=4, ensure_ascii=False)
-        
-        return changes
-        
-    except Exception:
-        return 0
+def is_individual_file(file_path: str) -> bool:
+    """Check if a JSON file holds the per-image results of a subcategory."""
+    return (
+        not file_path.endswith(('.stats.json', 'model_links.json'))
+        and not is_aggregated_file(file_path)
+        and os.path.exists(f"{os.path.dirname(file_path)}.json")
+    )
+
+def update_json_file(file_path: str, name_mapping: Dict[str, str], dry_run: bool = False) -> Tuple[str, List[Tuple[str, str]], List[str]]:
+    """Update a single JSON file to use standardized model names.
+
+    Returns:
+        Tuple of (file path, renamed (old, new) pairs, raw keys dropped because the standardized name already existed)
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if not isinstance(data, dict):
+        return file_path, [], []
+
+    renames = []
+    dropped = []
+    new_data = {}
+
+    for key, value in data.items():
+        new_key = name_mapping.get(key, key)
+        if new_key == key:
+            new_data.setdefault(key, value)
+            continue
+        if new_key in data or new_key in new_data:
+            # Keep the result already stored under the standardized name
+            dropped.append(key)
+            continue
+        new_data[new_key] = value
+        renames.append((key, new_key))
+
+    if (renames or dropped) and not dry_run:
+        atomic_write_json(file_path, new_data, indent=4, ensure_ascii=False)
+
+    return file_path, renames, dropped
+
+def refresh_subcategories(sources: List[str], base_path: str = "docs/data/json") -> None:
+    """Re-aggregate subcategories, then redraw their charts and refresh their manifest entries."""
+    from utils.save import aggregate_folder_results
+    from evaluation.graph import create_graphs
+    from scripts.update_manifest import update_manifest
+
+    aggregated_files = []
+    for source in sources:
+        folder = os.path.join(base_path, source)
+        if not os.path.isdir(folder):
+            continue
+        aggregate_folder_results(folder)
+        aggregated_files.append(f"{folder}.json")
+        update_manifest(source)
+
+    create_graphs([path for path in aggregated_files if os.path.exists(f"{path}.png")])
 
 def main():
     parser = argparse.ArgumentParser(description="Update model names in JSON files according to model_config.yaml")
     parser.add_argument('--dry-run', action='store_true', help='Show what would be changed without making actual changes')
-    parser.add_argument('--path', type=str, default='docs/json', help='Base path to search for JSON files (default: docs/json)')
-    
+    parser.add_argument('--path', type=str, default='docs/data/json', help='Base path to search for JSON files (default: docs/data/json)')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count)')
+
     args = parser.parse_args()
-    
-    # Load model name mapping
-    name_mapping = get_model_name_mapping()
-    
-    # Find all JSON files
+
+    # Load model name mapping, keeping only the IDs that actually change
+    name_mapping = {raw: standard for raw, standard in get_model_name_mapping().items() if raw != standard}
+
     base_path = Path(args.path)
     if not base_path.exists():
         print(f"Error: Directory not found: {base_path}")
         return 1
-    
-    json_files = find_all_json_files(base_path)
-    
-    total_files = len(json_files)
+
+    # Only touch files the index reports as referencing a raw model ID
+    index = ModelIndex.load(str(base_path)).refresh(args.workers)
+    targets = index.files_with(name_mapping)
+    individual_targets = [path for path in targets if is_individual_file(path)]
+
+    # Aggregated files, rollups and summaries are rebuilt from the individual files instead of renamed
+    affected_sources = {
+        os.path.relpath(path[:-len('.json')] if is_aggregated_file(path) else os.path.dirname(path), base_path)
+        for path in targets
+        if is_individual_file(path) or (is_aggregated_file(path) and len(Path(os.path.relpath(path, base_path)).parts) == 4)
+    }
+
     modified_files = 0
     total_changes = 0
-    
-    for file_path in json_files:
-        changes = update_json_file(file_path, name_mapping, dry_run=args.dry_run)
-        if changes > 0:
+    errors = 0
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(update_json_file, path, name_mapping, args.dry_run): path for path in individual_targets}
+        for future in as_completed(futures):
+            try:
+                file_path, renames, dropped = future.result()
+            except Exception as e:
+                print(f"Error processing {futures[future]}: {e}")
+                errors += 1
+                continue
+
+            if not (renames or dropped):
+                continue
             modified_files += 1
-            total_changes += changes
-    
+            total_changes += len(renames) + len(dropped)
+
+            # Diff report
+            print(f"{file_path}")
+            for old_key, new_key in renames:
+                print(f"  - {old_key}\n  + {new_key}")
+            for old_key in dropped:
+                print(f"  - {old_key} (dropped, '{name_mapping[old_key]}' already present)")
+
+    if not args.dry_run and affected_sources:
+        refresh_subcategories(sorted(affected_sources), str(base_path))
+
     # Update model links if changes were made and not dry run
     if not args.dry_run and total_changes > 0:
         try:
-            import subprocess
-            subprocess.run([sys.executable, str(Path(__file__).parent / "generate_model_links.py")], check=True)
+            from scripts.generate_model_links import generate_model_links
+            generate_model_links()
         except Exception as e:
             print(f"Warning: Could not update model links: {e}")
-    
+
+    if not args.dry_run:
+        index.refresh(args.workers).save()
+
     # Summary
     mode = "DRY RUN" if args.dry_run else "UPDATE"
     print(f"\n{mode} Summary:")
-    print(f"  Files processed: {total_files}")
+    print(f"  Files indexed: {len(index.files)}")
     print(f"  Files modified: {modified_files}")
     print(f"  Total changes: {total_changes}")
-    
+    print(f"  Subcategories refreshed: {0 if args.dry_run else len(affected_sources)}")
+    print(f"  Errors: {errors}")
+
     if args.dry_run and total_changes > 0:
         print(f"\nRun without --dry-run to apply {total_changes} changes")
-    
-    return 0
+
+    return 1 if errors else 0
 
 if __name__ == "__main__":
-    exit(main())
\ No newline at end of file
+    exit(main())
@@ -0,0 +1,64 @@
+from agno.agent import RunResponse
+from agno.models.anthropic import Claude
+from agno.models.google import Gemini
+from agno.models.openai import OpenAIChat
+from agno.run.response import RunResponseContentEvent
+
+from models.agent import cap_output_tokens, run_streaming
+
+
+class _LoopingAgent:
+    """Stand-in agent whose streamed response repeats itself until the stream is closed."""
+
+    model = None
+    run_response = None
+
+    def __init__(self):
+        self.closed = False
+
+    def run(self, prompt, images, stream):
+        try:
+            while True:
+                yield RunResponseContentEvent(content="ſtet ")
+        finally:
+            self.closed = True
+
+
+def test_streaming_aborts_runaway_generation():
+    """A generation longer than the limit is aborted and its partial output returned as truncated."""
+    agent = _LoopingAgent()
+    response, ttft, tokens_per_sec, truncated = run_streaming(agent, "prompt", [], max_chars=42)
+
+    assert truncated and agent.closed
+    assert isinstance(response, RunResponse)
+    assert 42 < len(response.content) <= 42 + len("ſtet ")
+    assert ttft is not None
+
+
+def test_output_token_cap_uses_provider_parameter():
+    """The output limit is set on each provider's own parameter."""
+    openai, gemini = OpenAIChat(id="gpt-4o", api_key="test"), Gemini(id="gemini-2.0-flash", api_key="test")
+    cap_output_tokens(openai, 100)
+    cap_output_tokens(gemini, 100)
+
+    assert openai.max_completion_tokens == 100 and openai.max_tokens is None
+    assert gemini.max_output_tokens == 100
+
+
+def test_output_token_cap_follows_each_call():
+    """Every call sets the limit it computed, also above an earlier one, and a lower configured limit wins."""
+    model = Gemini(id="gemini-2.0-flash", api_key="test")
+    cap_output_tokens(model, 100)
+    cap_output_tokens(model, 200)
+    assert model.max_output_tokens == 200
+    cap_output_tokens(model, 50)
+    assert model.max_output_tokens == 50
+
+    # The SDK's own default is no configured limit
+    claude = Claude(id="claude-sonnet-4-20250514", api_key="test")
+    assert cap_output_tokens(claude, 100) == 100 and claude.max_tokens == 100
+
+    configured = OpenAIChat(id="gpt-4o", api_key="test")
+    assert cap_output_tokens(configured, 100, configured=150) == 100
+    assert cap_output_tokens(configured, 300, configured=150) == 150
+    assert configured.max_completion_tokens == 150
@@ -0,0 +1,61 @@
+import io
+import os
+import random
+import tarfile
+import tempfile
+from pathlib import Path
+
+from utils import archive
+from utils.archive import ArchiveIndex
+
+
+def _write_archive(path: str) -> dict:
+    """Write a small dataset archive with two categories and return its members."""
+    members = {}
+    for category in ("EarlyModernLatin", "dta19"):
+        for i in range(3):
+            for suffix in (".png", ".gt.txt"):
+                members[f"GT4HistOCR/corpus/{category}/Sub/{i:05d}.bin{suffix}"] = random.randbytes(random.randint(1, 5000))
+    with tarfile.open(path, "w") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return members
+
+
+def test_index_reads_members_and_extracts_selected_categories():
+    """Test that members are read by offset and only the requested categories are extracted."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tar_path = os.path.join(temp_dir, "GT4HistOCR.tar")
+        members = _write_archive(tar_path)
+
+        index = ArchiveIndex.load(tar_path, os.path.join(temp_dir, "archive_index.json"))
+        assert index.categories() == ["EarlyModernLatin", "dta19"]
+        for name, data in members.items():
+            assert index.read(name) == data
+        assert index.listdir("GT4HistOCR/corpus/dta19/Sub")[:2] == ["00000.bin.gt.txt", "00000.bin.png"]
+        index.close()
+
+        assert index.extract(["dta19"], temp_dir) == 6
+        assert not os.path.exists(os.path.join(temp_dir, "GT4HistOCR/corpus/EarlyModernLatin"))
+        for name, data in members.items():
+            if "/dta19/" in name:
+                assert Path(temp_dir, name).read_bytes() == data
+
+
+def test_dataset_files_fall_back_to_archive(monkeypatch):
+    """Test that dataset reads and listings use the archive when the folder wasn't extracted."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        members = _write_archive(os.path.join(temp_dir, "GT4HistOCR.tar"))
+        monkeypatch.chdir(temp_dir)
+        monkeypatch.setattr(archive, "_default_index", None)
+
+        folder = "GT4HistOCR/corpus/EarlyModernLatin/Sub"
+        assert archive.dataset_folder_exists(folder)
+        assert len(archive.list_dataset_folder(folder)) == 6
+        name = f"{folder}/00001.bin.png"
+        assert archive.read_dataset_file(name) == members[name]
+        assert archive.read_dataset_file(os.path.abspath(name)) == members[name]
+        archive.get_archive_index().close()
+    monkeypatch.setattr(archive, "_default_index", None)
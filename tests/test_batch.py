@@ -0,0 +1,105 @@
+import json
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from models import batch as batch_module
+from models.batch import BatchJob, OpenAIBatchTransport, pending_batches, save_batch_state, wait_for_batch
+
+
+def _serve_batches():
+    """Start a local stand-in for the OpenAI batch endpoints that echoes each request's custom_id."""
+    files, batches = {}, {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, payload, content_type="application/json"):
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            if self.path == "/v1/files":
+                message = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body)
+                upload = next(part for part in message.iter_parts() if part.get_filename())
+                file_id = f"file-{len(files)}"
+                files[file_id] = upload.get_payload(decode=True)
+                self._reply({"id": file_id})
+            elif self.path == "/v1/batches":
+                batch_id = f"batch-{len(batches)}"
+                batches[batch_id] = {"input_file_id": json.loads(body)["input_file_id"], "polls": 0}
+                self._reply({"id": batch_id, "status": "validating"})
+
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            if parts[1] == "batches":
+                batch = batches[parts[2]]
+                batch["polls"] += 1
+                if batch["polls"] < 2:
+                    self._reply({"id": parts[2], "status": "in_progress"})
+                    return
+                output, errors = [], []
+                for line in files[batch["input_file_id"]].decode().splitlines():
+                    request = json.loads(line)
+                    if request["body"]["model"] == "broken-model":
+                        errors.append({"custom_id": request["custom_id"],
+                                       "response": {"status_code": 400, "body": {"error": {"message": "bad model"}}}})
+                    else:
+                        output.append({"custom_id": request["custom_id"], "response": {
+                            "status_code": 200,
+                            "body": {"choices": [{"message": {"content": f"text of {request['custom_id']}"}}]}}})
+                files["file-out"] = "\n".join(json.dumps(entry) for entry in output).encode()
+                files["file-err"] = "\n".join(json.dumps(entry) for entry in errors).encode()
+                self._reply({"id": parts[2], "status": "completed", "output_file_id": "file-out",
+                             "error_file_id": "file-err" if errors else None,
+                             "request_counts": {"total": len(output) + len(errors), "failed": len(errors)}})
+            elif parts[1] == "files":
+                self._reply(files[parts[2]], "application/jsonl")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_batch_transport_round_trip():
+    """A submitted batch is polled until completed and its results and errors are keyed by custom_id."""
+    server = _serve_batches()
+    try:
+        transport = OpenAIBatchTransport(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1")
+        requests = [{"custom_id": f"job-{i}", "body": {"model": model, "messages": []}}
+                    for i, model in enumerate(["gpt-4o", "gpt-4o", "broken-model"])]
+        batch_id = transport.submit(requests)
+
+        statuses = []
+        status, results = wait_for_batch(transport, batch_id, poll_interval=0, on_status=statuses.append)
+    finally:
+        server.shutdown()
+
+    assert [s.state for s in statuses] == ["in_progress", "completed"]
+    assert status.counts == {"total": 3, "failed": 1}
+    assert results["job-0"].content == "text of job-0"
+    assert results["job-1"].content == "text of job-1"
+    assert results["job-2"].content is None and "bad model" in results["job-2"].error
+
+
+def test_pending_batches_survive_restart(tmp_path, monkeypatch):
+    """Submitted batches are persisted with their jobs and filtered by source."""
+    monkeypatch.setattr(batch_module, "BATCH_STATE_DIR", tmp_path)
+    jobs = [BatchJob(custom_id="job-0", model_id="gpt-4o", image_path="a/b/00001.bin.png", payload_bytes=10)]
+    save_batch_state("batch-1", "OpenAI", "a/b", jobs, submitted_at=1.0)
+    save_batch_state("batch-2", "OpenAI", "a/c", jobs, submitted_at=2.0)
+
+    pending = pending_batches("a/b")
+    assert [state["batch_id"] for state in pending] == ["batch-1"]
+    assert pending[0]["jobs"] == jobs
+
+    batch_module.forget_batch("batch-1")
+    assert pending_batches("a/b") == []
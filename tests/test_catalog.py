@@ -0,0 +1,71 @@
+import os
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+
+from utils import archive, catalog as catalog_module
+from utils.catalog import CorpusCatalog, group_duplicates, result_path
+
+
+def _png(width: int, height: int) -> bytes:
+    """Minimal PNG header with the given dimensions."""
+    ihdr = struct.pack(">II", width, height) + b"\x08\x00\x00\x00\x00"
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+
+
+def test_catalog_describes_images_and_refreshes_incrementally(monkeypatch):
+    """Test that images are described once and only new ones are described on refresh."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        monkeypatch.chdir(temp_dir)
+        monkeypatch.setattr(archive, "_default_index", None)
+        folder = Path("GT4HistOCR/corpus/EarlyModernLatin/1471-Orthographia-Tortellius")
+        folder.mkdir(parents=True)
+        for i in range(3):
+            (folder / f"{i:05d}.bin.png").write_bytes(_png(100 + i, 20))
+            (folder / f"{i:05d}.gt.txt").write_text("lorem ipsum\n")
+
+        catalog = CorpusCatalog(Path(temp_dir) / "catalog.sqlite")
+        assert catalog.refresh() == 3
+        assert catalog.refresh() == 0
+
+        entry = catalog.entry(str(folder / "00002.bin.png"))
+        assert (entry["category"], entry["subcategory"]) == ("EarlyModernLatin", "1471-Orthographia-Tortellius")
+        assert (entry["width"], entry["height"], entry["gt_length"]) == (102, 20, 11)
+        assert entry["gt_path"] == (folder / "00002.gt.txt").as_posix()
+        assert entry["hash"] != catalog.entry(str(folder / "00001.bin.png"))["hash"]
+
+        (folder / "00003.bin.png").write_bytes(_png(50, 20))
+        os.remove(folder / "00000.bin.png")
+        os.utime(folder, ns=(0, os.stat(folder).st_mtime_ns + 1))
+        assert catalog.refresh() == 1
+        assert [Path(e["path"]).name for e in catalog.images(category="EarlyModernLatin")] == \
+            ["00001.bin.png", "00002.bin.png", "00003.bin.png"]
+        assert catalog.entry(str(folder / "00003.bin.png"))["gt_length"] is None
+        catalog.close()
+
+    assert result_path("GT4HistOCR/corpus/dta19/Sub/00283.nrm.png") == \
+        Path("docs/data/json/GT4HistOCR/corpus/dta19/Sub/00283.nrm.json")
+
+
+def test_duplicate_images_are_grouped(monkeypatch):
+    """Byte-identical images share a group headed by their first path, uncataloged images stay alone."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        monkeypatch.chdir(temp_dir)
+        monkeypatch.setattr(archive, "_default_index", None)
+        folder = Path("GT4HistOCR/corpus/dta19/Sub")
+        folder.mkdir(parents=True)
+        for i, width in enumerate([100, 200, 100, 100]):
+            (folder / f"{i:05d}.bin.png").write_bytes(_png(width, 20))
+            (folder / f"{i:05d}.gt.txt").write_text(f"line {i}\n")
+        catalog = CorpusCatalog(Path(temp_dir) / "catalog.sqlite")
+        catalog.refresh([str(folder)])
+        monkeypatch.setattr(catalog_module, "_default_catalog", catalog)
+
+        paths = [f"{folder.as_posix()}/{i:05d}.bin.png" for i in range(4)] + ["elsewhere/00000.bin.png"]
+        assert group_duplicates(paths) == {
+            paths[0]: [paths[0], paths[2], paths[3]],
+            paths[1]: [paths[1]],
+            paths[4]: [paths[4]],
+        }
+        catalog.close()
@@ -0,0 +1,63 @@
+import asyncio
+
+from models.concurrency import AdaptiveLimiter, save_concurrency_log
+
+
+def test_limit_grows_and_backs_off():
+    """The limit grows while latency is stable and halves on a 429 or a latency spike."""
+    limiter = AdaptiveLimiter("model-a", maximum=8)
+    for _ in range(40):
+        limiter.record_success(1.0)
+    assert limiter.limit == 8
+
+    limiter.record_failure(429)
+    assert limiter.limit == 4
+    # Further errors of the same round don't back off again
+    limiter.record_failure(503)
+    assert limiter.limit == 4
+
+    limiter._last_decrease = 0
+    limiter.record_success(5.0)
+    assert limiter.limit == 2
+    # Fatal errors are not a capacity signal
+    limiter._last_decrease = 0
+    limiter.record_failure(401)
+    assert limiter.limit == 2
+
+
+def test_in_flight_requests_stay_under_limit(tmp_path):
+    """Requests wait for a slot, and the limit changes are logged."""
+    limiter = AdaptiveLimiter("model-a", initial=2, maximum=3)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        async with limiter:
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+            limiter.record_success(0.01)
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(20)))
+
+    asyncio.run(run())
+    assert peak == 3 and limiter.in_flight == 0
+
+    log = save_concurrency_log([limiter], "test", tmp_path).read_text().splitlines()
+    assert log[0] == "model,seconds,limit,in_flight,latency,event"
+    assert any(line.endswith("increase") for line in log)
+
+
+def test_limit_recovers_after_latency_shift():
+    """After a lasting step up in latency the baseline catches up and the limit grows again."""
+    limiter = AdaptiveLimiter("model-a", maximum=8)
+    for _ in range(40):
+        limiter.record_success(1.0)
+    for _ in range(10):
+        limiter._last_decrease = 0
+        limiter.record_success(5.0)
+    assert limiter.limit == 1
+
+    for _ in range(60):
+        limiter.record_success(5.0)
+    assert limiter.limit == 8
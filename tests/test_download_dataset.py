@@ -0,0 +1,135 @@
+import hashlib
+import io
+import os
+import random
+import tarfile
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from scripts import download_dataset
+from scripts.download_dataset import download_file
+
+
+def _synthetic_tar() -> bytes:
+    """Build a small tar archive laid out like the dataset."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for i in range(20):
+            for suffix, size in ((".png", 50_000), (".gt.txt", 40)):
+                data = random.randbytes(size)
+                info = tarfile.TarInfo(f"GT4HistOCR/corpus/Category/Sub/{i:05d}.bin{suffix}")
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _serve(payload: bytes, fail_after: list):
+    """Start a local HTTP server with range support that can drop a connection mid-transfer."""
+    ranges = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            start, end = 0, len(payload) - 1
+            header = self.headers.get("Range")
+            if header:
+                first, last = header.split("=")[1].split("-")
+                start, end = int(first), int(last or len(payload) - 1)
+                ranges.append(start)
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+
+            body = payload[start:end + 1]
+            if fail_after and end - start > 0:
+                body = body[:fail_after.pop()]
+                self.close_connection = True
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, ranges
+
+
+def test_parallel_download_extracts_while_streaming(monkeypatch):
+    """Test that a segmented download is verified and extracted to the same tree as the archive."""
+    monkeypatch.setattr(download_dataset, "WRITE_BUFFER_SIZE", 64 * 1024)
+    payload = _synthetic_tar()
+    server, _ = _serve(payload, [])
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "GT4HistOCR.tar")
+        extract_dir = os.path.join(temp_dir, "extracted")
+        url = f"http://127.0.0.1:{server.server_port}/GT4HistOCR.tar"
+        digest = download_file(url, path, extract_to=extract_dir, segments=4,
+                               expected_md5=hashlib.md5(payload).hexdigest(), progress=False)
+
+        assert digest == hashlib.md5(payload).hexdigest()
+        assert Path(path).read_bytes() == payload
+        assert not os.path.exists(f"{path}.part.json")
+        with tarfile.open(path) as tar:
+            for member in tar.getmembers():
+                assert Path(extract_dir, member.name).read_bytes() == tar.extractfile(member).read()
+    server.shutdown()
+
+
+def test_interrupted_download_resumes_from_partial_file(monkeypatch):
+    """Test that a dropped connection keeps the partial file and the next call only fetches the rest."""
+    monkeypatch.setattr(download_dataset, "WRITE_BUFFER_SIZE", 16 * 1024)
+    payload = _synthetic_tar()
+    server, ranges = _serve(payload, [100_000])
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "GT4HistOCR.tar")
+        url = f"http://127.0.0.1:{server.server_port}/GT4HistOCR.tar"
+
+        with pytest.raises(IOError):
+            download_file(url, path, segments=1, progress=False)
+        assert os.path.exists(f"{path}.part.json")
+
+        ranges.clear()
+        download_file(url, path, segments=1, expected_md5=hashlib.md5(payload).hexdigest(), progress=False)
+
+        assert Path(path).read_bytes() == payload
+        assert ranges[-1] > 0  # Resumed after the bytes already written
+    server.shutdown()
+
+
+def test_corrupt_download_fails_and_restarts(monkeypatch):
+    """Test that a download not matching the checksum fails and leaves no partial file to resume from."""
+    payload = _synthetic_tar()
+    server, _ = _serve(payload, [])
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "GT4HistOCR.tar")
+        url = f"http://127.0.0.1:{server.server_port}/GT4HistOCR.tar"
+
+        with pytest.raises(IOError, match="Checksum mismatch"):
+            download_file(url, path, segments=2, expected_md5=hashlib.md5(b"other").hexdigest(), progress=False)
+        assert not os.path.exists(path)
+        assert not os.path.exists(f"{path}.part") and not os.path.exists(f"{path}.part.json")
+    server.shutdown()
+
+
+def test_dataset_checksum_read_from_record_metadata():
+    """Test that the archive MD5 is taken from the Zenodo record metadata."""
+    record = (b'{"files": [{"key": "README.md", "checksum": "md5:0000"},'
+              b' {"key": "GT4HistOCR.tar", "checksum": "md5:5d41402abc4b2a76b9719d911017c592"}]}')
+    server, _ = _serve(record, [])
+
+    url = f"http://127.0.0.1:{server.server_port}/api/records/1344132"
+    try:
+        assert download_dataset.fetch_dataset_md5(url) == "5d41402abc4b2a76b9719d911017c592"
+        with pytest.raises(IOError):
+            download_dataset.fetch_dataset_md5(url, "missing.tar")
+    finally:
+        server.shutdown()
@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+from agno.exceptions import ModelProviderError, ModelRateLimitError
+
+import scripts.run_process as run_process
+from evaluation.stats import new_model_stats
+from models.concurrency import AdaptiveLimiter
+from models.failures import FATAL, RETRYABLE, CircuitBreaker, FailedJobs, classify_error, is_model_error
+
+
+def test_errors_classified_by_status():
+    """Rate limits, server and network errors are retryable; auth, bad requests and bugs are fatal."""
+    assert classify_error(ModelRateLimitError("slow down", status_code=429)) == RETRYABLE
+    assert classify_error(ModelProviderError("overloaded", status_code=529)) == RETRYABLE
+    assert classify_error(ConnectionError("reset")) == RETRYABLE
+    assert classify_error(ModelProviderError("invalid api key", status_code=401)) == FATAL
+    assert classify_error(ModelProviderError("model not found", status_code=404)) == FATAL
+    assert classify_error(KeyError("content")) == FATAL
+
+
+def test_breaker_opens_probes_and_closes():
+    """The breaker opens after consecutive failures, lets one probe through after the timeout and closes on success."""
+    breaker = CircuitBreaker("OpenAI", failure_threshold=3, reset_timeout=60)
+    assert not breaker.record_failure(ConnectionError("reset"))
+    assert not breaker.record_failure(ModelProviderError("bad image", status_code=400))
+    assert breaker.record_failure(ModelRateLimitError("slow down", status_code=429))
+    assert not breaker.allow()
+
+    breaker.opened_at -= 60
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # Only one probe
+    breaker.record_success()
+    assert breaker.allow()
+
+    # An authentication error opens it at once, errors of single requests or models don't
+    assert not breaker.record_failure(ModelProviderError("content filtered", status_code=400))
+    assert not breaker.record_failure(ModelProviderError("model not found", status_code=404))
+    assert breaker.record_failure(ModelProviderError("invalid api key", status_code=401))
+    assert not breaker.allow()
+    assert is_model_error(ModelProviderError("model not found", status_code=404))
+
+
+def test_breaker_probe_released_without_verdict():
+    """A probe that ends without a success or failure being recorded lets the next probe through."""
+    breaker = CircuitBreaker("OpenAI", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure(ConnectionError("reset"))
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.release_probe()
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_failed_jobs_persist_until_success(tmp_path):
+    """Failed jobs survive a restart and are cleared once they succeed."""
+    path = tmp_path / "failed_jobs.json"
+    failed = FailedJobs(path)
+    failed.record("gpt-4o", "corpus/Cat/Sub/00001.bin.png", "429", RETRYABLE, "run-1")
+    failed.record("gpt-4o", "corpus/Cat/Sub/00001.bin.png", "429", RETRYABLE, "run-2")
+    failed.record("gpt-4o", "corpus/Cat/Other/00001.bin.png", "401", FATAL, "run-2")
+    assert not path.exists()  # Written once, on flush
+    failed.flush()
+
+    reloaded = FailedJobs(path)
+    jobs = reloaded.pending("corpus/Cat/Sub")
+    assert [(job["image_path"], job["failures"], job["run_id"]) for job in jobs] == [("corpus/Cat/Sub/00001.bin.png", 2, "run-2")]
+
+    reloaded.clear("gpt-4o", "corpus/Cat/Sub/00001.bin.png")
+    reloaded.flush()
+    assert FailedJobs(path).pending("corpus/Cat/Sub") == []
+
+
+def test_queued_jobs_not_sent_once_breaker_opens(tmp_path, monkeypatch):
+    """Jobs waiting for a slot when the provider rejects our key are given up without a request."""
+    sent = []
+
+    async def run_model(agents, model, executor, image_path, *args):
+        sent.append(image_path)
+        await asyncio.sleep(0.01)
+        raise ModelProviderError("invalid api key", status_code=401)
+
+    monkeypatch.setattr(run_process, "run_model", run_model)
+    breaker = CircuitBreaker("OpenAI")
+    failed = FailedJobs(tmp_path / "failed_jobs.json")
+    groups = [[f"corpus/Cat/Sub/{n:05d}.bin.png"] for n in range(50)]
+    asyncio.run(run_process.run_model_jobs(SimpleNamespace(id="gpt-4o"), groups, AdaptiveLimiter("gpt-4o", maximum=1),
+                                           breaker, failed, None, new_model_stats()))
+
+    assert sent == [groups[0][0]] and breaker.state == CircuitBreaker.OPEN
+    assert len(failed.pending()) == 50
+    assert {job["kind"] for job in failed.pending()[1:]} == {RETRYABLE}
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+import pytest
+
+from models.failures import FATAL, classify_error
+from models.hedging import AgentPool, DeadlineExceeded, RequestPolicy, run_with_policy
+
+
+def _policy(**kwargs) -> RequestPolicy:
+    """Policy that has already observed 20 latencies of 50 ms."""
+    policy = RequestPolicy("model-a", min_samples=20, **kwargs)
+    for _ in range(20):
+        policy.record(0.05)
+    return policy
+
+
+def _run(call, policy, settle=0.0, calls=1):
+    """Run calls one after the other under a policy, keeping the event loop alive for settle seconds afterwards."""
+    agents = AgentPool(count().__next__)
+
+    async def run():
+        start = time.time()
+        for _ in range(calls):
+            result = await run_with_policy(call, agents, executor, policy)
+        elapsed = time.time() - start
+        await asyncio.sleep(settle)
+        return result, elapsed
+
+    with ThreadPoolExecutor(4, thread_name_prefix="request") as executor:
+        result, elapsed = asyncio.run(run())
+    return result, elapsed, agents
+
+
+def test_duplicate_wins_over_stuck_request():
+    """A request outliving the p95 latency gets a duplicate on another agent, and the first response wins."""
+    policy = _policy(hedge=True, max_rate=1.0)
+    result, elapsed, agents = _run(lambda agent: time.sleep(0.05 if agent else 0.5) or agent, policy, settle=0.6)
+
+    assert result == 1 and elapsed < 0.4
+    assert policy.hedges == 1 and policy.hedge_wins == 1
+    # Both agents are back in the pool once the abandoned request completed
+    assert sorted(agents._idle) == [0, 1]
+
+
+def test_hedges_capped_by_rate():
+    """Without hedge budget left the request just waits for its response."""
+    policy = _policy(hedge=True, max_rate=0.0)
+    result, elapsed, _ = _run(lambda agent: time.sleep(0.2) or agent, policy)
+
+    assert result == 0 and elapsed >= 0.2
+    assert policy.hedges == 0
+
+
+def test_deadline_abandons_request():
+    """A request without a response by its deadline raises an error that isn't retried."""
+    policy = RequestPolicy("model-a", deadline=0.1)
+    start = time.time()
+    with pytest.raises(DeadlineExceeded) as raised:
+        _run(lambda agent: time.sleep(0.5), policy)
+    assert time.time() - start < 0.7
+    assert classify_error(raised.value) == FATAL
+
+
+def test_hedges_run_apart_and_stop_while_abandoned_requests_run():
+    """Hedges use their own threads, and no hedge is sent while too many abandoned requests still run."""
+    threads = []
+
+    def call(agent):
+        threads.append(threading.current_thread().name)
+        # Requests get stuck, their hedges answer
+        time.sleep(0.02 if threads[-1].startswith("hedge") else 1.0)
+        return agent
+
+    with ThreadPoolExecutor(2, thread_name_prefix="hedge") as hedge_executor:
+        policy = _policy(hedge=True, max_rate=1.0, max_in_flight=2, hedge_executor=hedge_executor)
+        _run(call, policy, calls=3)
+
+    assert [name.split("_")[0] for name in threads] == ["request", "hedge", "request", "hedge", "request"]
+    # The stuck requests abandoned by the first two hedges used up the allowance
+    assert policy.hedges == 2
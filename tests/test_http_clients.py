@@ -0,0 +1,69 @@
+import shutil
+import ssl
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from agno.models.anthropic import Claude
+from agno.models.openai import OpenAIChat
+
+from models.http_clients import attach_http_client, benchmark, close_http_clients
+
+
+def _serve_https(cert_dir):
+    """Start a local HTTPS stub with keep-alive, using a self-signed certificate."""
+    cert, key = cert_dir / "cert.pem", cert_dir / "key.pem"
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+                    "-keyout", str(key), "-out", str(cert)], check=True, capture_output=True)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.mark.skipif(shutil.which("openssl") is None, reason="openssl is needed to create a certificate")
+def test_shared_client_handshakes_once(tmp_path):
+    """A shared client reuses one TLS connection where a client per request handshakes every time."""
+    server = _serve_https(tmp_path)
+    try:
+        results = benchmark(f"https://127.0.0.1:{server.server_port}/", requests=10, verify=False)
+    finally:
+        server.shutdown()
+
+    assert results["per_request"]["handshakes"] == 10
+    assert results["shared"]["handshakes"] == 1
+    assert results["shared"]["connections"] == 1
+
+
+def test_models_of_a_provider_share_a_client():
+    """Models of the same provider and base URL get the same client, other base URLs their own."""
+    try:
+        first, second = OpenAIChat(id="gpt-4o", api_key="test"), OpenAIChat(id="gpt-4.1", api_key="test")
+        local = OpenAIChat(id="gpt-4o", api_key="test", base_url="http://localhost:8000/v1")
+        claude = Claude(id="claude-sonnet-4-0", api_key="test")
+        for model in (first, second, local):
+            assert attach_http_client(model, "OpenAI")
+        assert attach_http_client(claude, "Anthropic")
+
+        assert first.http_client is second.http_client
+        assert local.http_client is not first.http_client
+        assert claude.get_client()._client is claude.client_params["http_client"]
+    finally:
+        close_http_clients()
@@ -0,0 +1,28 @@
+import io
+
+from PIL import Image
+
+from utils.multiline import TILE_GAP, TILE_GUTTER, split_response, tile_images
+
+
+def test_split_response_matches_numbered_lines():
+    """Test that numbered transcriptions are split back per line, whatever the numbering style."""
+    text = "1: Lorem ipsum\n\n3) dolor sit\n2. amet,\n[4] conſectetur\n4: adipiscing"
+    assert split_response(text, 4) == ["Lorem ipsum", "amet,", "dolor sit", "conſectetur adipiscing"]
+    assert split_response("1: only one", 3) == ["only one", "", ""]
+    assert split_response("first\nsecond", 2) == ["first", "second"]
+    assert split_response(None, 2) == ["", ""]
+
+
+def test_tile_images_stacks_lines():
+    """Test that tiled lines keep their size below each other, after the number gutter."""
+    lines = []
+    for width, height in ((300, 40), (250, 36)):
+        output = io.BytesIO()
+        Image.new("L", (width, height), 0).save(output, "PNG")
+        lines.append(output.getvalue())
+
+    with Image.open(io.BytesIO(tile_images(lines))) as composite:
+        assert composite.size == (TILE_GUTTER + 300, 40 + TILE_GAP + 36)
+        assert composite.getpixel((TILE_GUTTER + 10, 10)) == (0, 0, 0)
+        assert composite.getpixel((TILE_GUTTER + 280, 40 + TILE_GAP + 10)) == (255, 255, 255)
@@ -0,0 +1,68 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from utils import archive, pack
+from utils.archive import read_dataset_buffer
+from utils.catalog import CorpusCatalog
+from utils.pack import PackReader, pack_folder, pack_paths
+
+
+def test_packed_folder_serves_images_and_ground_truth(monkeypatch):
+    """Test that a packed folder is read through mmap once its loose files are gone."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        monkeypatch.chdir(temp_dir)
+        monkeypatch.setattr(archive, "_default_index", None)
+        monkeypatch.setattr(pack, "_readers", {})
+        folder = Path("GT4HistOCR/corpus/dta19/1882-Sub")
+        folder.mkdir(parents=True)
+        files = {}
+        for i in range(5):
+            files[f"{i:05d}.nrm.png"] = bytes([i]) * (100 + i)
+            files[f"{i:05d}.gt.txt"] = f"Zeile {i}\n".encode()
+        for name, data in files.items():
+            (folder / name).write_bytes(data)
+
+        data_path = pack_folder(str(folder))
+        assert data_path == pack_paths(str(folder))[0]
+        reader = PackReader(*pack_paths(str(folder)))
+        assert reader.gt("00003.nrm.png") == "Zeile 3\n"
+        reader.close()
+
+        shutil.rmtree("GT4HistOCR/corpus")
+        for name, data in files.items():
+            assert bytes(read_dataset_buffer(folder / name)) == data
+        assert isinstance(read_dataset_buffer(folder / "00001.nrm.png"), memoryview)
+
+        catalog = CorpusCatalog(Path(temp_dir) / "catalog.sqlite")
+        assert catalog.refresh() == 5
+        assert catalog.entry(str(folder / "00004.nrm.png"))["gt_length"] == len("Zeile 4")
+        catalog.close()
+        for reader in pack._readers.values():
+            reader.close()
+
+
+def test_pack_not_used_once_its_folder_changed(monkeypatch, capsys):
+    """Test that an edited ground truth is read from disk, not from the older pack, until the folder is repacked."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        monkeypatch.chdir(temp_dir)
+        monkeypatch.setattr(archive, "_default_index", None)
+        monkeypatch.setattr(pack, "_readers", {})
+        folder = Path("GT4HistOCR/corpus/dta19/1882-Sub")
+        folder.mkdir(parents=True)
+        (folder / "00000.nrm.png").write_bytes(b"\x89PNG")
+        (folder / "00000.gt.txt").write_bytes(b"Zeile\n")
+        pack_folder(str(folder))
+        assert pack.get_pack(folder) is not None
+        pack._readers.pop(folder.as_posix()).close()
+
+        (folder / "00000.gt.txt").write_bytes(b"Zeile 0\n")
+        assert pack.get_pack(folder) is None
+        assert "changed since it was packed" in capsys.readouterr().out
+        assert bytes(read_dataset_buffer(folder / "00000.gt.txt")) == b"Zeile 0\n"
+
+        pack._readers.clear()
+        pack_folder(str(folder))
+        reader = pack.get_pack(folder)
+        assert reader is not None and reader.gt("00000.nrm.png") == "Zeile 0\n"
+        reader.close()
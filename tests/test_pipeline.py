@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+
+from evaluation.pipeline import ScoringPipeline
+
+
+def test_results_are_scored_and_reported_off_the_event_loop():
+    """Scores come from worker processes, reports run one at a time in the writer thread."""
+    reports = []
+    active = []
+
+    def report(*scores):
+        active.append(1)
+        assert len(active) == 1
+        time.sleep(0.01)
+        reports.append((threading.current_thread().name, scores))
+        active.pop()
+        return sum(scores)
+
+    async def run():
+        async with ScoringPipeline(workers=2, max_pending=2) as pipeline:
+            loop_thread = threading.current_thread().name
+            results = await asyncio.gather(*(pipeline.process(divmod, (n, 3), report) for n in range(8)))
+        return loop_thread, results
+
+    loop_thread, results = asyncio.run(run())
+    assert results == [sum(divmod(n, 3)) for n in range(8)]
+    assert len(reports) == 8
+    assert all(name.startswith("writer") and name != loop_thread for name, _ in reports)
+
+
+def test_pending_results_are_bounded():
+    """Once max_pending results are in the pipeline, further submissions wait for a place."""
+    release = threading.Event()
+    reported = []
+
+    def report(*scores):
+        release.wait(5)
+        reported.append(scores)
+
+    async def run():
+        async with ScoringPipeline(workers=1, max_pending=2) as pipeline:
+            tasks = [asyncio.create_task(pipeline.process(divmod, (n, 2), report)) for n in range(5)]
+            await asyncio.sleep(0.5)
+            # The writer is stuck on the first result, the second waits for it and the others for a place
+            full = pipeline._slots.locked()
+            release.set()
+            await asyncio.gather(*tasks)
+            return full
+
+    assert asyncio.run(run())
+    assert reported == [divmod(n, 2) for n in range(5)]
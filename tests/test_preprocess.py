@@ -0,0 +1,46 @@
+import io
+import tempfile
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw
+
+from config.schemas import PreprocessingConfig, PreprocessingProfile
+from utils import preprocess
+from utils.preprocess import load_image
+
+
+def _line_image(path: Path) -> None:
+    """Write a noisy RGB line image like a scanned text line."""
+    img = Image.effect_noise((600, 80), 40).convert("RGB")
+    ImageDraw.Draw(img).text((10, 30), "Lorem ipsum dolor sit amet", fill=(0, 0, 0))
+    img.save(path)
+
+
+def test_profiles_shrink_payload_and_are_cached(monkeypatch):
+    """Test that profiles downscale and convert images, and reuse cached results."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        monkeypatch.setattr(preprocess, "CACHE_ROOT", Path(temp_dir) / "cache")
+        image_path = Path(temp_dir) / "00001.bin.png"
+        _line_image(image_path)
+        original = image_path.read_bytes()
+
+        data, mime_type, name = load_image(str(image_path))
+        assert (bytes(data), mime_type, name) == (original, "image/png", None)
+
+        profile = PreprocessingProfile(target_height=40, color="bilevel")
+        data, mime_type, name = load_image(str(image_path), profile=("small", profile))
+        assert name == "small" and len(data) < len(original)
+        with Image.open(io.BytesIO(data)) as img:
+            assert (img.size, img.mode) == ((300, 40), "1")
+
+        monkeypatch.setattr(preprocess, "preprocess_image", lambda *args: pytest.fail("cache miss"))
+        assert load_image(str(image_path), profile=("small", profile))[0] == data
+
+
+def test_undefined_profile_is_rejected():
+    """Test that providers can only reference defined profiles."""
+    with pytest.raises(ValueError):
+        PreprocessingConfig(profiles={}, providers={"OpenAI": "compact"})
+    config = PreprocessingConfig(profiles={"compact": PreprocessingProfile()}, default="compact")
+    assert config.profile_for("Google") == "compact"
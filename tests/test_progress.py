@@ -0,0 +1,40 @@
+import asyncio
+import io
+
+from rich.console import Console
+
+from evaluation.stats import add_result, new_model_stats
+from utils.progress import ProgressTable
+
+
+def _table():
+    metrics = {"model-a": new_model_stats(), "model-b": new_model_stats()}
+    for cer in (0.1, 0.3):
+        add_result(metrics["model-a"], {"wer": cer, "cer": cer, "accuracy": 1 - cer, "time": 1.0})
+    return ProgressTable(metrics, {"model-b": 3}, lambda name: {"model-a": 2, "model-b": 0}[name], lambda: "ETA 5s")
+
+
+def test_table_shows_progress_per_model():
+    """Each model has a row with its completed, failed and in-flight counts and running CER."""
+    console = Console(file=io.StringIO(), width=120)
+    console.print(_table().render())
+    lines = console.file.getvalue().splitlines()
+    row_a, row_b = ([cell.strip() for cell in line.split("│")[1:-1]] for line in lines if "model-" in line)
+    assert row_a[1:4] == ["2", "0", "2"] and row_a[-1] == "20.00%"
+    assert row_b[1:4] == ["0", "3", "0"] and row_b[-1] == "-"
+    assert any("ETA 5s" in line for line in lines)
+
+
+def test_headless_display_prints_snapshots():
+    """Without a terminal the table is printed periodically and once more when the run ends."""
+    console = Console(file=io.StringIO(), width=120)
+    assert not console.is_terminal
+
+    async def run():
+        display = asyncio.create_task(_table().show(console, snapshot_interval=0.05))
+        await asyncio.sleep(0.12)
+        display.cancel()
+        await asyncio.gather(display, return_exceptions=True)
+
+    asyncio.run(run())
+    assert console.file.getvalue().count("model-a") == 3
@@ -0,0 +1,89 @@
+import json
+
+from evaluation.sampling import (SequentialSampler, allocate, load_stored_results, period_of, stratified_sample,
+                                 stratum_keys)
+from evaluation.stats import add_result, new_model_stats
+
+
+def _result(cer):
+    return {"wer": cer, "cer": cer, "accuracy": 1 - cer, "time": 1.0}
+
+
+def test_stable_model_stops_before_noisy_one():
+    """A model with a constant CER converges at min_images, a noisy one spends its whole budget."""
+    images = [f"img{n}.png" for n in range(200)]
+    sampler = SequentialSampler(images, {"stable": {}, "noisy": {}}, target_width=0.02, budget=100,
+                                min_images=10, round_size=20, seed=0)
+    while selected := sampler.next_round():
+        for model, paths in selected.items():
+            stats = new_model_stats()
+            for n, _ in enumerate(paths):
+                add_result(stats, _result(0.05 if model == "stable" else (n % 2) * 0.8))
+            sampler.update(model, stats)
+    assert (sampler.status("stable"), sampler.spent["stable"]) == ("converged", 10)
+    assert (sampler.status("noisy"), sampler.spent["noisy"]) == ("budget spent", 100)
+    # Both models drew their images in the same order
+    assert sampler.remaining["noisy"][:5] == sampler.remaining["stable"][90:95]
+
+
+def test_stored_results_are_reused(tmp_path, monkeypatch):
+    """Stored results count towards the sample and their images are not drawn again."""
+    monkeypatch.chdir(tmp_path)
+    images = [f"Corpus/Cat/Sub/{n:05d}.bin.png" for n in range(30)]
+    folder = tmp_path / "docs/data/json/Corpus/Cat/Sub"
+    folder.mkdir(parents=True)
+    for n in range(25):
+        with open(folder / f"{n:05d}.bin.json", "w") as f:
+            json.dump({"model-a": {"wer": 5.0, "cer": 5.0, "accuracy": 95.0, "time": 1.0}}, f)
+
+    stored = load_stored_results(images, {"model-a": "a", "model-b": "b"})
+    assert len(stored["a"]) == 25 and stored["a"][images[0]]["cer"] == 0.05
+    assert stored["b"] == {}
+
+    sampler = SequentialSampler(images, stored, target_width=0.02, budget=50, min_images=10)
+    assert sampler.reused == {"a": 25, "b": 0}
+    assert sampler.status("a") == "converged"
+    selected = sampler.next_round()
+    assert list(selected) == ["b"] and len(selected["b"]) == 10
+
+
+def _entry(path, gt_length):
+    _, category, subcategory, _ = path.split("/")
+    return {"path": path, "category": category, "subcategory": subcategory, "gt_length": gt_length}
+
+
+def test_stratified_sample_covers_strata_and_reuses_results():
+    """The sample is spread over categories, periods and line lengths, preferring evaluated images."""
+    assert period_of("1471-Orthographia-Tortellius") == "15th c."
+    assert period_of("Kallimachos") == "undated"
+    entries = ([_entry(f"C/Latin/1471-A/{n}.png", 20 + n % 60) for n in range(300)]
+               + [_entry(f"C/German/1850-B/{n}.png", 20 + n % 60) for n in range(60)])
+    evaluated = {f"C/Latin/1471-A/{n}.png": 2 for n in range(0, 300, 3)}
+
+    sample = stratified_sample(entries, 60, evaluated, seed=0)
+    assert len(sample) == 60 and len(set(sample)) == 60
+    german = [path for path in sample if "/German/" in path]
+    # A sixth of the corpus, up to the rounding of each stratum
+    assert 9 <= len(german) <= 11
+    strata = stratum_keys(entries)
+    assert len({strata[path] for path in sample}) == 6
+    # Latin images already evaluated are drawn first
+    assert all(path in evaluated for path in sample if "/Latin/" in path)
+
+
+def test_allocation_is_proportional_and_bounded():
+    """Strata get their proportional share, at least one image each and never more than they have."""
+    assert allocate({"a": 90, "b": 9, "c": 1}, 20) == {"a": 18, "b": 1, "c": 1}
+    assert allocate({"a": 3, "b": 100}, 50) == {"a": 1, "b": 49}
+    assert allocate({"a": 5, "b": 5}, 100) == {"a": 5, "b": 5}
+
+
+def test_rounds_have_a_minimum_size():
+    """A model close to its target width still gets a round of min_round_size images, within its budget."""
+    images = [f"img{n}.png" for n in range(100)]
+    stored = {"model": {f"stored{n}.png": _result(0.05 + (n % 2) * 0.05) for n in range(30)}}
+    sampler = SequentialSampler(images, stored, target_width=0.017, budget=12, min_images=10, min_round_size=8, seed=0)
+    assert sampler.status("model") == "sampling"
+
+    assert len(sampler.next_round()["model"]) == 8
+    assert len(sampler.next_round()["model"]) == 4  # What is left of the budget
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from models.scheduling import LatencyModel, ProgressTracker, format_duration, makespan
+
+
+def test_latency_model_fits_history():
+    """Each model's latency grows with the output length, models without history use the pooled fit."""
+    history = pd.DataFrame({
+        "model": ["fast"] * 10 + ["slow"] * 10 + ["new"],
+        "time": [1 + 0.01 * n for n in range(0, 100, 10)] + [4 + 0.1 * n for n in range(0, 100, 10)] + [50.0],
+        "response_length": list(range(0, 100, 10)) * 2 + [10],
+        # Packed results are ignored
+        "packed_lines": [None] * 20 + [5],
+    })
+    latency = LatencyModel.fit(history)
+    assert abs(latency.predict("fast", 200) - 3) < 1e-6
+    assert abs(latency.predict("slow", 200) - 24) < 1e-6
+    assert latency.predict("fast", 10) < latency.predict("new", 10) < latency.predict("slow", 10)
+    assert LatencyModel().predict("any", 1000) == 5.0
+
+
+def test_longest_first_shortens_makespan():
+    """Dispatching the longest jobs first avoids a long job running alone at the end."""
+    durations = [1] * 8 + [8]
+    assert makespan(durations, 2) == 12
+    assert makespan(sorted(durations, reverse=True), 2) == 8
+
+
+def test_eta_follows_observed_latency():
+    """The ETA covers the remaining jobs, corrected by how much slower than expected finished jobs were."""
+    progress = ProgressTracker()
+    for n in range(4):
+        progress.add("model-a", (f"{n}.png",), 10.0)
+    assert progress.eta({"model-a": 2}) == 20
+
+    progress.finish("model-a", ("0.png",), 20.0)
+    progress.finish("model-a", ("1.png",))
+    assert (progress.done, progress.total) == (2, 4)
+    assert progress.eta({"model-a": 2}) == 20
+    assert progress.eta({"model-a": 1}) == 40
+    assert format_duration(3725) == "1h 02m"
+    assert format_duration(200) == "3m 20s"
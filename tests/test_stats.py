@@ -0,0 +1,151 @@
+import json
+import random
+import statistics
+import tempfile
+from pathlib import Path
+
+from evaluation.stats import MetricStats
+
+
+def test_merged_stats_match_single_pass():
+    """Test that merging shard summaries gives the same moments as one pass."""
+    values = [random.uniform(0, 100) for _ in range(1000)]
+
+    merged = MetricStats.from_values(values[:300])
+    merged.merge(MetricStats.from_dict(MetricStats.from_values(values[300:]).to_dict()))
+
+    assert merged.count == len(values)
+    assert abs(merged.mean - statistics.mean(values)) < 1e-9
+    assert abs(merged.variance - statistics.variance(values)) < 1e-6
+    assert abs(merged.quantile(0.5) - statistics.median(values)) < 2
+
+
+def test_rollups_weighted_by_images():
+    """Test that category and corpus rollups weight subcategories by image count."""
+    from utils.save import aggregate_folder_results
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus = Path(temp_dir) / "corpus"
+        results = {"SubA": [10.0] * 3, "SubB": [40.0]}
+        for subcategory, cers in results.items():
+            folder = corpus / "Category" / subcategory
+            folder.mkdir(parents=True)
+            for i, cer in enumerate(cers):
+                entry = {"wer": cer, "cer": cer, "accuracy": 100 - cer, "time": 1.0}
+                with open(folder / f"{i:05d}.bin.json", "w") as f:
+                    json.dump({"model-a": entry}, f)
+            aggregate_folder_results(str(folder))
+
+        with open(corpus / "Category.json") as f:
+            category = json.load(f)["model-a"]
+        with open(Path(temp_dir) / "corpus.json") as f:
+            corpus_rollup = json.load(f)["model-a"]
+
+    assert category["images"] == 4
+    assert category["subcategories"] == 2
+    assert abs(category["avg_cer"] - 17.5) < 1e-9
+    assert abs(category["var_cer"] - statistics.variance([10.0, 10.0, 10.0, 40.0])) < 1e-9
+    assert corpus_rollup["avg_cer"] == category["avg_cer"]
+
+
+def test_bootstrap_interval_merges_across_shards():
+    """Test that bootstrap replicates of two shards merge into a CI around the mean."""
+    values = [random.gauss(10, 2) for _ in range(2000)]
+
+    merged = MetricStats.from_values(values[:1000])
+    merged.merge(MetricStats.from_dict(MetricStats.from_values(values[1000:]).to_dict()))
+    low, high = merged.interval(0.95)
+
+    assert low < statistics.mean(values) < high
+    assert high - low < 0.5
+
+
+def test_streaming_metrics_aggregated_when_present():
+    """Test that time to first token and tokens/sec are aggregated over the streamed results only."""
+    from utils.save import aggregate_folder_results
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = Path(temp_dir) / "corpus" / "Category" / "Sub"
+        folder.mkdir(parents=True)
+        for i in range(4):
+            entry = {"wer": 10.0, "cer": 5.0, "accuracy": 95.0, "time": 2.0}
+            if i % 2:
+                entry.update(ttft=0.5 * i, tokens_per_sec=20.0)
+            with open(folder / f"{i:05d}.bin.json", "w") as f:
+                json.dump({"model-a": entry, "model-b": {"wer": 1.0, "cer": 1.0, "accuracy": 99.0, "time": 1.0}}, f)
+        results = aggregate_folder_results(str(folder))
+
+        with open(Path(temp_dir) / "corpus.json") as f:
+            corpus_rollup = json.load(f)
+
+    assert results["model-a"]["images"] == 4
+    assert results["model-a"]["streamed"] == 2
+    assert abs(results["model-a"]["avg_ttft"] - 1.0) < 1e-9
+    assert results["model-a"]["avg_tokens_per_sec"] == 20.0
+    assert "avg_ttft" not in results["model-b"]
+    assert corpus_rollup["model-a"]["streamed"] == 2
+    assert abs(corpus_rollup["model-a"]["avg_ttft"] - 1.0) < 1e-9
+    assert "avg_ttft" not in corpus_rollup["model-b"]
+
+
+def test_batch_results_left_out_of_latency():
+    """Test that batch results (no request time) count as images but not towards the latency statistics."""
+    from utils.save import aggregate_folder_results
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = Path(temp_dir) / "corpus" / "Category" / "Sub"
+        folder.mkdir(parents=True)
+        for i in range(4):
+            entry = {"wer": 10.0, "cer": 5.0, "accuracy": 95.0, "time": 2.0}
+            if i % 2:
+                entry.update(time=None, batch_time=0.1, batch_id="batch-1")
+            with open(folder / f"{i:05d}.bin.json", "w") as f:
+                json.dump({"model-a": entry}, f)
+        results = aggregate_folder_results(str(folder))
+
+    assert results["model-a"]["images"] == 4
+    assert results["model-a"]["avg_time"] == 2.0
+    assert results["model-a"]["p50_time"] == 2.0
+
+
+def test_batch_only_results_have_no_latency():
+    """Test that a model with only batch results gets no latency statistics, in its rollups too."""
+    from utils.save import aggregate_folder_results
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = Path(temp_dir) / "corpus" / "Category" / "Sub"
+        folder.mkdir(parents=True)
+        for i in range(3):
+            entry = {"wer": 10.0, "cer": 5.0, "accuracy": 95.0, "time": None, "batch_time": 0.1, "batch_id": "batch-1"}
+            with open(folder / f"{i:05d}.bin.json", "w") as f:
+                json.dump({"model-a": entry}, f)
+        results = aggregate_folder_results(str(folder))
+        with open(Path(temp_dir) / "corpus" / "Category.json") as f:
+            category = json.load(f)
+
+    for summary in (results["model-a"], category["model-a"]):
+        assert summary["images"] == 3 and summary["avg_cer"] == 5.0
+        assert summary["avg_time"] is None and summary["var_time"] is None
+        assert summary["p50_time"] is None and summary["ci95_time"] is None
+
+
+def test_reaggregation_is_reproducible():
+    """Test that aggregating the same results again gives the same confidence intervals."""
+    from utils.save import aggregate_folder_results
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = Path(temp_dir) / "corpus" / "Category" / "Sub"
+        folder.mkdir(parents=True)
+        for i in range(20):
+            entry = {"wer": 2.0 * i, "cer": float(i), "accuracy": 100.0 - i, "time": 1.0 + i / 10}
+            with open(folder / f"{i:05d}.bin.json", "w") as f:
+                json.dump({"model-a": entry}, f)
+        first = aggregate_folder_results(str(folder))
+        with open(Path(temp_dir) / "corpus" / "Category.json") as f:
+            first_rollup = json.load(f)
+        second = aggregate_folder_results(str(folder))
+        with open(Path(temp_dir) / "corpus" / "Category.json") as f:
+            second_rollup = json.load(f)
+
+    assert first["model-a"]["ci95_cer"] is not None
+    assert first == second and first_rollup == second_rollup
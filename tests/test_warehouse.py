@@ -0,0 +1,93 @@
+import json
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.warehouse import load_results, sync_warehouse
+
+
+def _write_results(folder: Path, image: int, results: dict) -> None:
+    folder.mkdir(parents=True, exist_ok=True)
+    with open(folder / f"{image:05d}.bin.json", "w") as f:
+        json.dump(results, f)
+
+
+def _result(cer: float, **fields) -> dict:
+    return {"gt": "ſtet", "response": "stet", "wer": cer * 2, "cer": cer, "accuracy": 100 - cer, "time": 1.5, **fields}
+
+
+def test_sync_and_query(tmp_path):
+    """Synced results are queried per category, subcategory and model, with model names containing '/'."""
+    json_base, warehouse = tmp_path / "corpus", tmp_path / "warehouse"
+    for image in range(3):
+        _write_results(json_base / "EarlyModernLatin" / "1471-Orthographia", image,
+                       {"gpt-4o": _result(image, run_id="run-1"), "meta/llama-4": _result(10 + image)})
+    _write_results(json_base / "Kallimachos" / "1488-Heiligenleben", 0, {"gpt-4o": _result(5, ttft=0.4)})
+
+    stats = sync_warehouse(str(json_base), str(warehouse))
+    assert stats == {"subcategories": 2, "updated": 2, "removed": 0, "rows_written": 7}
+
+    df = load_results(warehouse_path=str(warehouse))
+    assert len(df) == 7
+    assert set(df["model"]) == {"gpt-4o", "meta/llama-4"}
+
+    llama = load_results(columns=["image_id", "cer"], model="meta/llama-4", warehouse_path=str(warehouse))
+    assert sorted(llama["cer"]) == [10, 11, 12]
+    assert sorted(llama["image_id"]) == ["00000.bin", "00001.bin", "00002.bin"]
+
+    latin = load_results(category="EarlyModernLatin", subcategory="1471-Orthographia", model="gpt-4o",
+                         warehouse_path=str(warehouse))
+    assert list(latin["run_id"]) == ["run-1"] * 3
+    assert latin["response_length"].tolist() == [4, 4, 4]
+    streamed = load_results(category="Kallimachos", warehouse_path=str(warehouse))
+    assert streamed["ttft"].tolist() == [0.4]
+
+
+def test_resync_only_rewrites_changed_subcategories(tmp_path):
+    """A re-sync rewrites the subcategories whose results changed and drops removed ones."""
+    json_base, warehouse = tmp_path / "corpus", tmp_path / "warehouse"
+    latin = json_base / "EarlyModernLatin" / "1471-Orthographia"
+    german = json_base / "EarlyModernGerman" / "1564-Thurneisser"
+    _write_results(latin, 0, {"gpt-4o": _result(1)})
+    _write_results(german, 0, {"gpt-4o": _result(2)})
+    sync_warehouse(str(json_base), str(warehouse))
+
+    assert sync_warehouse(str(json_base), str(warehouse))["updated"] == 0
+
+    # A new model on an image and a new image of the same subcategory
+    _write_results(latin, 0, {"gpt-4o": _result(1), "claude": _result(3)})
+    _write_results(latin, 1, {"gpt-4o": _result(4)})
+    os.utime(latin / "00000.bin.json", ns=(0, 2 ** 62))
+    stats = sync_warehouse(str(json_base), str(warehouse))
+    assert (stats["updated"], stats["rows_written"]) == (1, 3)
+
+    df = load_results(columns=["category", "model", "cer"], warehouse_path=str(warehouse))
+    assert sorted(map(tuple, df.values.tolist())) == [("EarlyModernGerman", "gpt-4o", 2), ("EarlyModernLatin", "claude", 3),
+                                                      ("EarlyModernLatin", "gpt-4o", 1), ("EarlyModernLatin", "gpt-4o", 4)]
+
+    for json_file in german.iterdir():
+        json_file.unlink()
+    german.rmdir()
+    assert sync_warehouse(str(json_base), str(warehouse))["removed"] == 1
+    assert set(load_results(columns=["category"], warehouse_path=str(warehouse))["category"]) == {"EarlyModernLatin"}
+
+
+def test_files_without_newer_columns_read_as_null(tmp_path):
+    """Data files written before a column was added are read with that column as null."""
+    json_base, warehouse = tmp_path / "corpus", tmp_path / "warehouse"
+    _write_results(json_base / "EarlyModernLatin" / "1471-Orthographia", 0, {"gpt-4o": _result(1, ttft=0.2)})
+    sync_warehouse(str(json_base), str(warehouse))
+
+    # File of an older version, without the columns added since (run_id, preprocessing, ttft, ...)
+    old_partition = warehouse / "category=EarlyModernLatin" / "model=gpt-4o"
+    pq.write_table(pa.table({"image_id": ["00007.bin"], "subcategory": ["1502-Old"], "wer": [2.0], "cer": [1.0],
+                             "accuracy": [99.0], "time": [3.0], "response_length": [4]}),
+                   old_partition / "1502-Old.parquet")
+
+    df = load_results(columns=["subcategory", "cer", "ttft", "truncated", "run_id"], model="gpt-4o",
+                      warehouse_path=str(warehouse)).sort_values("subcategory")
+    assert df["subcategory"].tolist() == ["1471-Orthographia", "1502-Old"]
+    assert df["ttft"].iloc[0] == 0.2
+    assert df[["ttft", "truncated", "run_id"]].iloc[1].isna().all()
@@ -0,0 +1,190 @@
+import json
+import os
+import tarfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from utils.atomic import atomic_write_json
+
+ARCHIVE_PATH = Path("GT4HistOCR.tar")
+INDEX_PATH = Path(".cache/archive_index.json")
+CORPUS_PREFIX = "GT4HistOCR/corpus"
+
+
+def _signature(archive_path: Path) -> List[int]:
+    """Size and modification time identifying a version of the archive."""
+    stat = archive_path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _member_name(path: Union[str, Path]) -> str:
+    """Normalize a dataset path (e.g., 'GT4HistOCR/corpus/dta19/...') to a tar member name."""
+    path = os.path.normpath(path)
+    if os.path.isabs(path):
+        path = os.path.relpath(path)
+    return Path(path).as_posix()
+
+
+class ArchiveIndex:
+    """Index of the dataset tar archive: member name -> (data offset, size).
+
+    With the index, PNG and ground truth members can be read straight from the
+    uncompressed tar with a single seek, without extracting the archive.
+    """
+
+    def __init__(self, archive_path: Path = ARCHIVE_PATH, members: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.archive_path = Path(archive_path)
+        self.members: Dict[str, Tuple[int, int]] = members or {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, archive_path: Path = ARCHIVE_PATH) -> "ArchiveIndex":
+        """Scan the member headers of the archive (member data is skipped, not read)."""
+        members = {}
+        with tarfile.open(archive_path, "r:") as tar:
+            for member in tar:
+                if member.isfile():
+                    members[member.name] = (member.offset_data, member.size)
+        return cls(archive_path, members)
+
+    @classmethod
+    def load(cls, archive_path: Path = ARCHIVE_PATH, index_path: Path = INDEX_PATH) -> "ArchiveIndex":
+        """Load the stored index of the archive, rebuilding it if the archive changed."""
+        archive_path, index_path = Path(archive_path), Path(index_path)
+        signature = _signature(archive_path)
+        if index_path.exists():
+            try:
+                with open(index_path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                if stored.get("signature") == signature:
+                    return cls(archive_path, {name: tuple(entry) for name, entry in stored["members"].items()})
+            except (json.JSONDecodeError, KeyError):
+                pass
+
+        index = cls.build(archive_path)
+        atomic_write_json(index_path, {"archive": str(archive_path), "signature": signature, "members": index.members},
+                          separators=(",", ":"))
+        return index
+
+    def __contains__(self, path: Union[str, Path]) -> bool:
+        return _member_name(path) in self.members
+
+    def read(self, path: Union[str, Path]) -> bytes:
+        """Read a member of the archive."""
+        offset, size = self.members[_member_name(path)]
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.archive_path, "rb")
+            self._file.seek(offset)
+            return self._file.read(size)
+
+    def is_dir(self, folder: Union[str, Path]) -> bool:
+        """Check if the archive holds members under a folder."""
+        prefix = _member_name(folder) + "/"
+        return any(name.startswith(prefix) for name in self.members)
+
+    def listdir(self, folder: Union[str, Path]) -> List[str]:
+        """Names of the files directly inside a folder of the archive."""
+        prefix = _member_name(folder) + "/"
+        return sorted(name[len(prefix):] for name in self.members
+                      if name.startswith(prefix) and "/" not in name[len(prefix):])
+
+    def categories(self) -> List[str]:
+        """Categories of the corpus found in the archive."""
+        prefix = CORPUS_PREFIX + "/"
+        return sorted({name[len(prefix):].split("/", 1)[0] for name in self.members
+                       if name.startswith(prefix) and "/" in name[len(prefix):]})
+
+    def extract(self, categories: Optional[Iterable[str]] = None, target_root: Union[str, Path] = ".") -> int:
+        """Extract only the members of the given corpus categories (all members if None).
+
+        Members are written in archive order so the tar is read in a single forward pass.
+
+        Returns:
+            Number of extracted files
+        """
+        prefixes = tuple(f"{CORPUS_PREFIX}/{category}/" for category in categories) if categories is not None else ("",)
+        selected = sorted((entry, name) for name, entry in self.members.items() if name.startswith(prefixes))
+
+        target_root = Path(target_root).resolve()
+        with open(self.archive_path, "rb") as archive:
+            for (offset, size), name in selected:
+                destination = (target_root / name).resolve()
+                if not destination.is_relative_to(target_root):
+                    raise ValueError(f"Unsafe member path in archive: {name}")
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                archive.seek(offset)
+                with open(destination, "wb") as f:
+                    f.write(archive.read(size))
+        return len(selected)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_default_index: Optional[ArchiveIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_archive_index() -> Optional[ArchiveIndex]:
+    """Index of the dataset archive kept in the project root, if there is one."""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None and ARCHIVE_PATH.exists():
+            _default_index = ArchiveIndex.load()
+        return _default_index
+
+
+def read_dataset_buffer(path: Union[str, Path]) -> Union[bytes, memoryview]:
+    """Read a dataset file without copying it when possible.
+
+    Files of packed folders are returned as views into the memory-mapped pack; other
+    files are read from disk, falling back to the archive when they weren't extracted.
+    """
+    from utils.pack import read_packed
+
+    data = read_packed(path)
+    if data is not None:
+        return data
+    return read_dataset_file(path, packed=False)
+
+
+def read_dataset_file(path: Union[str, Path], packed: bool = True) -> bytes:
+    """Read a dataset file from its pack or disk, falling back to the archive when it wasn't extracted."""
+    if packed:
+        data = read_dataset_buffer(path)
+        return data if isinstance(data, bytes) else bytes(data)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    index = get_archive_index()
+    if index is not None and path in index:
+        return index.read(path)
+    raise FileNotFoundError(f"Dataset file not found on disk or in {ARCHIVE_PATH}: {path}")
+
+
+def dataset_folder_exists(folder: Union[str, Path]) -> bool:
+    """Check if a dataset folder exists on disk, as a pack or in the archive."""
+    from utils.pack import get_pack
+
+    if os.path.isdir(folder) or get_pack(folder) is not None:
+        return True
+    index = get_archive_index()
+    return index is not None and index.is_dir(folder)
+
+
+def list_dataset_folder(folder: Union[str, Path]) -> List[str]:
+    """Names of the files in a dataset folder, on disk, as a pack or in the archive."""
+    from utils.pack import get_pack
+
+    if os.path.isdir(folder):
+        return os.listdir(folder)
+    pack = get_pack(folder)
+    if pack is not None:
+        return pack.file_names()
+    index = get_archive_index()
+    return index.listdir(folder) if index is not None else []
@@ -0,0 +1,31 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Union
+
+
+def atomic_write_json(file_path: Union[str, Path], data: Any, **dump_kwargs) -> None:
+    """Write JSON data through a temporary file and an atomic rename.
+    
+    Readers (e.g., the dashboard server) never see a partially written file, and an
+    interrupted write leaves the previous version in place.
+    
+    Args:
+        file_path: Destination JSON file
+        data: JSON-serializable data
+        **dump_kwargs: Extra arguments for json.dump (e.g., indent=4)
+    """
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates owner-only files
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,271 @@
+import hashlib
+import os
+import sqlite3
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from utils.archive import ARCHIVE_PATH, get_archive_index, list_dataset_folder, read_dataset_file
+
+CATALOG_PATH = Path(".cache/corpus_catalog.sqlite")
+CORPUS_ROOT = "GT4HistOCR/corpus"
+RESULTS_ROOT = Path("docs/data/json")
+
+# Below this many new images a refresh describes them in-process instead of starting a pool
+_PARALLEL_THRESHOLD = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    gt_path TEXT NOT NULL,
+    category TEXT NOT NULL,
+    subcategory TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    hash TEXT NOT NULL,
+    gt_hash TEXT,
+    gt_length INTEGER,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_folder ON images (folder);
+CREATE INDEX IF NOT EXISTS images_category ON images (category, subcategory);
+CREATE INDEX IF NOT EXISTS images_hash ON images (hash);
+"""
+
+_COLUMNS = ("path", "folder", "gt_path", "category", "subcategory", "size", "width", "height",
+            "hash", "gt_hash", "gt_length", "mtime_ns")
+
+
+def image_name(image_path: Union[str, Path]) -> str:
+    """Name of an image without its '.png' extension, keeping the double extension (e.g., '00001.bin')."""
+    name = Path(image_path).name
+    return name[:-len('.png')] if name.endswith('.png') else Path(name).stem
+
+
+def gt_path_for(image_path: Union[str, Path]) -> Path:
+    """Ground truth file of an image (e.g., '00001.bin.png' -> '00001.gt.txt')."""
+    return Path(image_path).with_suffix("").with_suffix(".gt.txt")
+
+
+def result_path(image_path: Union[str, Path], results_root: Union[str, Path] = RESULTS_ROOT) -> Path:
+    """Per-image results file of an image (e.g., 'docs/data/json/GT4HistOCR/corpus/.../00001.bin.json')."""
+    return Path(results_root) / Path(image_path).parent / f"{image_name(image_path)}.json"
+
+
+def _normalize(folder: Union[str, Path]) -> str:
+    return Path(os.path.normpath(folder)).as_posix()
+
+
+def _category_of(folder: str) -> Tuple[str, str]:
+    """Category and subcategory of a dataset folder (its parent and own name outside the corpus)."""
+    parts = Path(folder).parts
+    root_parts = Path(CORPUS_ROOT).parts
+    if parts[:len(root_parts)] == root_parts and len(parts) > len(root_parts) + 1:
+        return parts[len(root_parts)], parts[len(root_parts) + 1]
+    return (parts[-2] if len(parts) > 1 else ""), parts[-1]
+
+
+def _png_dimensions(data: bytes) -> Tuple[Optional[int], Optional[int]]:
+    """Read the width and height from the IHDR chunk of a PNG without decoding it."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR":
+        return struct.unpack(">II", data[16:24])
+    return None, None
+
+
+def _modified(path: str) -> Optional[int]:
+    """Modification time of a dataset file or folder (that of its pack or the archive if it only exists there)."""
+    from utils.pack import pack_paths
+
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        pass
+    for folder in (path, os.path.dirname(path)):
+        try:
+            data_path, _ = pack_paths(folder)
+        except ValueError:  # Not a corpus folder
+            continue
+        if data_path.exists():
+            return data_path.stat().st_mtime_ns
+    return os.stat(ARCHIVE_PATH).st_mtime_ns if ARCHIVE_PATH.exists() else None
+
+
+def _describe(image_path: str) -> tuple:
+    """Catalog row of an image: sizes, dimensions and content hashes of the image and its ground truth."""
+    folder = _normalize(os.path.dirname(image_path))
+    category, subcategory = _category_of(folder)
+    data = read_dataset_file(image_path)
+    width, height = _png_dimensions(data)
+
+    gt_path = gt_path_for(image_path).as_posix()
+    try:
+        gt = read_dataset_file(gt_path)
+        gt_hash = hashlib.sha256(gt).hexdigest()
+        gt_length = len(gt.decode("utf-8").rstrip("\n"))
+    except FileNotFoundError:
+        gt_hash, gt_length = None, None
+
+    return (image_path, folder, gt_path, category, subcategory, len(data), width, height,
+            hashlib.sha256(data).hexdigest(), gt_hash, gt_length, _modified(image_path))
+
+
+class CorpusCatalog:
+    """Persistent catalog of the corpus images and their ground truth.
+
+    Each image is described once (byte size, dimensions, content hashes, ground truth
+    length) and stored in a SQLite database, so selection and validation query the
+    catalog instead of scanning and reading the dataset again. Refreshes are incremental:
+    only folders whose modification time changed are listed again, and only their new
+    or modified images are described.
+    """
+
+    def __init__(self, catalog_path: Path = CATALOG_PATH):
+        self.catalog_path = Path(catalog_path)
+        self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.catalog_path, check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def discover(self, root: str = CORPUS_ROOT) -> List[str]:
+        """Subcategory folders of the corpus, on disk, packed and in the archive (<root>/<category>/<subcategory>)."""
+        from utils.pack import PACK_ROOT
+
+        folders = set()
+        if os.path.isdir(root):
+            for category in os.scandir(root):
+                if category.is_dir():
+                    folders.update(_normalize(sub.path) for sub in os.scandir(category.path) if sub.is_dir())
+        if root == CORPUS_ROOT and PACK_ROOT.is_dir():
+            folders.update(f"{root}/{path.parent.relative_to(PACK_ROOT).as_posix()}/{path.name[:-len('.pack.json')]}"
+                           for path in PACK_ROOT.glob("*/*.pack.json"))
+        index = get_archive_index()
+        if index is not None:
+            prefix = _normalize(root) + "/"
+            folders.update(os.path.dirname(name) for name in index.members
+                           if name.startswith(prefix) and name.count("/") == prefix.count("/") + 2)
+        return sorted(folders)
+
+    def refresh(self, folders: Optional[Iterable[str]] = None, workers: Optional[int] = None) -> int:
+        """Bring the catalog up to date for the given folders (all corpus subcategories by default).
+
+        Returns:
+            Number of images (re)described
+        """
+        folders = [_normalize(folder) for folder in (self.discover() if folders is None else folders)]
+
+        with self._lock:
+            known = dict(self._connection.execute("SELECT path, mtime_ns FROM folders"))
+            changed = [folder for folder in folders if known.get(folder) != _modified(folder)]
+
+            stale = []
+            for folder in changed:
+                current = {f"{folder}/{name}" for name in list_dataset_folder(folder) if name.endswith('.png')}
+                stored = dict(self._connection.execute("SELECT path, mtime_ns FROM images WHERE folder = ?", (folder,)))
+                removed = [(path,) for path in stored if path not in current]
+                self._connection.executemany("DELETE FROM images WHERE path = ?", removed)
+                stale.extend(path for path in sorted(current) if stored.get(path) != _modified(path))
+
+            if len(stale) > _PARALLEL_THRESHOLD:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    rows = list(executor.map(_describe, stale, chunksize=64))
+            else:
+                rows = [_describe(path) for path in stale]
+
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO images ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})", rows)
+            self._connection.executemany("INSERT OR REPLACE INTO folders (path, mtime_ns) VALUES (?, ?)",
+                                         [(folder, _modified(folder)) for folder in changed])
+            self._connection.commit()
+        return len(rows)
+
+    def images(self, folder: Optional[str] = None, category: Optional[str] = None,
+               subcategory: Optional[str] = None) -> List[Dict]:
+        """Catalog entries matching the given folder and/or category and subcategory, sorted by path."""
+        clauses, params = [], []
+        for column, value in (("folder", folder and _normalize(folder)), ("category", category), ("subcategory", subcategory)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._connection.execute(f"SELECT {', '.join(_COLUMNS)} FROM images{where} ORDER BY path", params).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def entry(self, image_path: str) -> Optional[Dict]:
+        """Catalog entry of a single image."""
+        with self._lock:
+            row = self._connection.execute(f"SELECT {', '.join(_COLUMNS)} FROM images WHERE path = ?",
+                                           (Path(os.path.normpath(image_path)).as_posix(),)).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def subcategories(self) -> List[Tuple[str, str, int]]:
+        """(category, subcategory, image count) of every cataloged subcategory."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT category, subcategory, COUNT(*) FROM images GROUP BY category, subcategory ORDER BY 1, 2").fetchall()
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+_default_catalog: Optional[CorpusCatalog] = None
+_default_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> CorpusCatalog:
+    """Process-wide corpus catalog."""
+    global _default_catalog
+    with _default_catalog_lock:
+        if _default_catalog is None:
+            _default_catalog = CorpusCatalog()
+        return _default_catalog
+
+
+def list_images(folder: str) -> List[str]:
+    """Names of the PNG images of a dataset folder, from the (refreshed) catalog."""
+    catalog = get_catalog()
+    catalog.refresh([folder])
+    return [Path(entry["path"]).name for entry in catalog.images(folder=folder)]
+
+
+def group_duplicates(image_paths: Iterable[str]) -> Dict[str, List[str]]:
+    """Group byte-identical images by their content hash in the catalog.
+
+    Returns:
+        First path of each distinct content -> every path with that content, itself
+        first (uncataloged images form their own group)
+    """
+    catalog = get_catalog()
+    groups: Dict[str, List[str]] = {}
+    for image_path in image_paths:
+        entry = catalog.entry(image_path)
+        groups.setdefault(entry["hash"] if entry is not None else image_path, []).append(image_path)
+    return {paths[0]: paths for paths in groups.values()}
+
+
+def list_subcategories(folder: str = CORPUS_ROOT) -> List[str]:
+    """Subcategory folders of the corpus at or under a folder (the corpus root, a category or a subcategory)."""
+    prefix = _normalize(folder)
+    return [path for path in get_catalog().discover() if path == prefix or path.startswith(prefix + "/")]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or refresh the corpus catalog")
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    catalog = get_catalog()
+    described = catalog.refresh(workers=args.workers)
+    subcategories = catalog.subcategories()
+    print(f"Cataloged {described} new or modified images; "
+          f"{sum(count for _, _, count in subcategories)} images in {len(subcategories)} subcategories")
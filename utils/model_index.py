@@ -0,0 +1,115 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.atomic import atomic_write_json
+
+INDEX_PATH = Path(".cache/model_index.json")
+EXCLUDED_FILES = {"manifest.json"}
+
+
+def _scan_json_files(base_path: str) -> Dict[str, int]:
+    """Find all result JSON files with their modification time."""
+    json_files = {}
+    for root, dirs, files in os.walk(base_path):
+        for file in files:
+            if file.endswith('.json') and file not in EXCLUDED_FILES and not file.startswith('.'):
+                path = os.path.join(root, file)
+                json_files[path] = os.stat(path).st_mtime_ns
+    return json_files
+
+
+def _read_models(file_path: str) -> Tuple[str, Optional[List[str]]]:
+    """Read the model keys of a result file. Returns None as keys for unreadable files."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return file_path, None
+    return file_path, list(data) if isinstance(data, dict) else []
+
+
+def is_aggregated_file(file_path: str) -> bool:
+    """Check if a result file aggregates a folder of results (subcategory aggregate or rollup)."""
+    return file_path.endswith('.json') and os.path.isdir(file_path[:-len('.json')])
+
+
+class ModelIndex:
+    """Persistent index of which result files contain which model keys.
+
+    The index is refreshed incrementally: only files whose modification time changed
+    since the last refresh are parsed again.
+    """
+
+    def __init__(self, base_path: str = "docs/data/json", index_path: Path = INDEX_PATH):
+        self.base_path = str(base_path)
+        self.index_path = Path(index_path)
+        self.files: Dict[str, Dict] = {}  # path -> {"mtime_ns": int, "models": list | None}
+
+    @classmethod
+    def load(cls, base_path: str = "docs/data/json", index_path: Path = INDEX_PATH) -> "ModelIndex":
+        """Load the stored index (an empty one if missing or built for another base path)."""
+        index = cls(base_path, index_path)
+        if index.index_path.exists():
+            try:
+                with open(index.index_path, 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+                if stored.get("base_path") == index.base_path:
+                    index.files = stored.get("files", {})
+            except json.JSONDecodeError:
+                pass
+        return index
+
+    def refresh(self, workers: Optional[int] = None) -> "ModelIndex":
+        """Re-read new and modified files in parallel and forget deleted ones."""
+        current = _scan_json_files(self.base_path)
+
+        for path in [path for path in self.files if path not in current]:
+            del self.files[path]
+
+        stale = [path for path, mtime in current.items()
+                 if self.files.get(path, {}).get("mtime_ns") != mtime]
+        if stale:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for path, models in executor.map(_read_models, stale, chunksize=64):
+                    self.files[path] = {"mtime_ns": current[path], "models": models}
+        return self
+
+    def update_file(self, file_path: str, models: Optional[Iterable[str]]) -> None:
+        """Record the models of a file that was just rewritten (or drop it if it was removed)."""
+        if not os.path.exists(file_path):
+            self.files.pop(file_path, None)
+            return
+        self.files[file_path] = {
+            "mtime_ns": os.stat(file_path).st_mtime_ns,
+            "models": list(models) if models is not None else None
+        }
+
+    def files_with(self, model_names: Iterable[str]) -> Dict[str, List[str]]:
+        """Get the files containing any of the given models, with the models each one contains."""
+        model_names = set(model_names)
+        matches = {}
+        for path, entry in self.files.items():
+            found = [model for model in (entry["models"] or []) if model in model_names]
+            if found:
+                matches[path] = found
+        return matches
+
+    @property
+    def invalid_files(self) -> List[str]:
+        """Files that could not be parsed during the last refresh."""
+        return sorted(path for path, entry in self.files.items() if entry["models"] is None)
+
+    def model_counts(self) -> Dict[str, int]:
+        """Number of files referencing each model key."""
+        counts: Dict[str, int] = {}
+        for entry in self.files.values():
+            for model in entry["models"] or []:
+                counts[model] = counts.get(model, 0) + 1
+        return counts
+
+    def save(self) -> None:
+        """Persist the index."""
+        atomic_write_json(self.index_path, {"base_path": self.base_path, "files": self.files})
@@ -0,0 +1,108 @@
+import io
+import re
+from typing import List, Optional, Sequence, Union
+
+# Ways of packing several line images into one request
+PACKING_MODES = ("images", "tile")
+
+TILE_GAP = 12  # White pixels between tiled lines
+TILE_GUTTER = 40  # Width of the left column holding the line numbers
+
+_NUMBERED_LINE = re.compile(r"^\s*\[?(\d+)\s*[\]\.:\)]\s?(.*)$")
+
+
+def build_prompt(lines: int, packing: str) -> str:
+    """Prompt asking for a numbered transcription of several line images."""
+    if packing == "tile":
+        source = f"This image contains {lines} numbered text lines, one below the other."
+    else:
+        source = f"These {lines} images each contain one text line, in order."
+    return (
+        f"{source} Please provide an accurate transcription of each line. "
+        f"Return exactly {lines} lines, each starting with its number followed by a colon "
+        f"(e.g., '1: ...'), and nothing else."
+    )
+
+
+def tile_images(images: Sequence[Union[bytes, memoryview]]) -> bytes:
+    """Stack line images vertically into a single PNG, numbering each line in a left gutter."""
+    from PIL import Image, ImageDraw
+
+    decoded = []
+    for data in images:
+        with Image.open(io.BytesIO(data)) as img:
+            decoded.append(img.convert("RGB"))
+
+    width = TILE_GUTTER + max(img.width for img in decoded)
+    height = sum(img.height for img in decoded) + TILE_GAP * (len(decoded) - 1)
+    composite = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(composite)
+
+    top = 0
+    for number, img in enumerate(decoded, start=1):
+        composite.paste(img, (TILE_GUTTER, top))
+        draw.text((4, top + max(0, img.height // 2 - 6)), f"{number}:", fill="black")
+        top += img.height + TILE_GAP
+        if number < len(decoded):
+            # Light separator in the middle of the gap
+            separator = top - TILE_GAP // 2
+            draw.line([(0, separator), (width, separator)], fill=(200, 200, 200))
+
+    output = io.BytesIO()
+    composite.save(output, "PNG", optimize=True)
+    return output.getvalue()
+
+
+def split_response(text: Optional[str], lines: int) -> List[str]:
+    """Split a numbered multi-line transcription back into one transcription per line.
+
+    Lines are matched by their number; lines the model skipped come back empty. If the
+    model didn't number its output but returned exactly the expected number of lines,
+    they are assigned in order.
+    """
+    transcriptions = [""] * lines
+    raw_lines = [line for line in (text or "").splitlines() if line.strip()]
+
+    numbered = 0
+    for line in raw_lines:
+        match = _NUMBERED_LINE.match(line)
+        if match and 1 <= int(match.group(1)) <= lines:
+            index = int(match.group(1)) - 1
+            # A line wrapped by the model continues its transcription
+            transcriptions[index] = f"{transcriptions[index]} {match.group(2).strip()}".strip()
+            numbered += 1
+
+    if numbered == 0 and len(raw_lines) == lines:
+        transcriptions = [line.strip() for line in raw_lines]
+    return transcriptions
+
+
+def compare_packing(category: Optional[str] = None, model: Optional[str] = None):
+    """Compare throughput and accuracy per model and number of lines packed per request.
+
+    Returns:
+        DataFrame indexed by (model, packed_lines) with lines/sec and mean CER, WER and accuracy
+    """
+    from utils.warehouse import load_results
+
+    df = load_results(columns=["model", "packed_lines", "time", "cer", "wer", "accuracy"], category=category, model=model)
+    # Batch results have no request time
+    df = df.dropna(subset=["time"])
+    df["packed_lines"] = df["packed_lines"].fillna(1).astype(int)
+    summary = (df.groupby(["model", "packed_lines"])
+                 .agg(lines=("cer", "size"), time=("time", "sum"), cer=("cer", "mean"),
+                      wer=("wer", "mean"), accuracy=("accuracy", "mean")))
+    # Stored times are per line (request time divided by its lines), so sequential throughput is lines / time
+    summary["lines_per_sec"] = summary["lines"] / summary["time"]
+    return summary.drop(columns="time").round(3)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare single-line and multi-line request results")
+    parser.add_argument('--category', help='Only compare results of this category')
+    parser.add_argument('--model', help='Only compare results of this model')
+    args = parser.parse_args()
+
+    print(compare_packing(category=args.category, model=args.model).to_string())
@@ -0,0 +1,242 @@
+import json
+import mmap
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from utils.archive import list_dataset_folder, read_dataset_file
+from utils.atomic import atomic_write_json
+from utils.catalog import CORPUS_ROOT, gt_path_for
+
+PACK_ROOT = Path("GT4HistOCR/packed")
+PACK_VERSION = 2
+
+
+def pack_paths(folder: Union[str, Path], pack_root: Path = PACK_ROOT) -> Tuple[Path, Path]:
+    """Data and index files of the pack of a subcategory folder."""
+    relative = Path(os.path.normpath(folder)).relative_to(CORPUS_ROOT)
+    base = Path(pack_root) / relative
+    return base.with_name(f"{base.name}.pack"), base.with_name(f"{base.name}.pack.json")
+
+
+def pack_folder(folder: Union[str, Path], pack_root: Path = PACK_ROOT) -> Path:
+    """Consolidate the images and ground truth of a folder into a single data file plus an offset index.
+
+    The data file holds each image followed by its ground truth; the index maps each
+    image name to (image offset, image size, ground truth offset, ground truth size),
+    with -1 offsets for images without ground truth. The index also records the size
+    and modification time of the loose files packed, so a pack older than its folder
+    is noticed (see is_current).
+
+    Returns:
+        Path of the data file
+    """
+    data_path, index_path = pack_paths(folder, pack_root)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+
+    entries = {}
+    sources = {}
+    fd, temp_path = tempfile.mkstemp(dir=data_path.parent, prefix=f".{data_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for name in sorted(name for name in list_dataset_folder(folder) if name.endswith('.png')):
+                image_path = Path(folder) / name
+                image = read_dataset_file(image_path, packed=False)
+                image_offset = f.tell()
+                f.write(image)
+                try:
+                    gt = read_dataset_file(gt_path_for(image_path), packed=False)
+                    gt_offset = f.tell()
+                    f.write(gt)
+                except FileNotFoundError:
+                    gt, gt_offset = b"", -1
+                entries[name] = [image_offset, len(image), gt_offset, len(gt)]
+                for path in (image_path, gt_path_for(image_path)):
+                    if path.exists():  # Files read from the archive have no loose copy to compare later
+                        sources[path.name] = _fingerprint(path)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, data_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    atomic_write_json(index_path, {"version": PACK_VERSION, "folder": Path(folder).as_posix(), "entries": entries,
+                                   "sources": sources}, separators=(",", ":"))
+    return data_path
+
+
+def _fingerprint(path: Path) -> List[int]:
+    """Size and modification time (ns) of a file."""
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def is_current(folder: Union[str, Path], index_path: Union[str, Path]) -> bool:
+    """Whether a pack still matches the loose files of its folder.
+
+    A folder without loose files (removed after packing) has only the pack, which is
+    current. Otherwise every image and ground truth file must be the one packed: none
+    added, removed or changed since. Packs of older versions record no files to
+    compare and count as stale while loose files exist.
+    """
+    if not os.path.isdir(folder):
+        return True
+    with open(index_path, "r", encoding="utf-8") as f:
+        sources = json.load(f).get("sources")
+    if sources is None:
+        return False
+    names = [name for name in os.listdir(folder) if name.endswith(('.png', '.gt.txt'))]
+    return (len(names) == len(sources)
+            and all(sources.get(name) == _fingerprint(Path(folder) / name) for name in names))
+
+
+class PackReader:
+    """Memory-mapped reader of a packed folder.
+
+    Images are returned as memoryviews into the mapping, so reading one costs no
+    system call and no copy until the caller needs its own bytes.
+    """
+
+    def __init__(self, data_path: Union[str, Path], index_path: Union[str, Path]):
+        with open(index_path, "r", encoding="utf-8") as f:
+            self.entries: Dict[str, List[int]] = json.load(f)["entries"]
+        with open(data_path, "rb") as f:
+            # An empty file can't be mapped
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else None
+        self._view = memoryview(self._mmap) if self._mmap is not None else memoryview(b"")
+        # Ground truth files are named after the image without its kind ('00001.gt.txt' for '00001.bin.png')
+        self._gt_names = {name.split('.', 1)[0]: name for name in self.entries}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def names(self) -> List[str]:
+        """Names of the packed images."""
+        return sorted(self.entries)
+
+    def file_names(self) -> List[str]:
+        """Dataset names of every packed file (images and their '.gt.txt' files)."""
+        return sorted([*self.entries, *(f"{stem}.gt.txt" for stem, name in self._gt_names.items()
+                                        if self.entries[name][2] >= 0)])
+
+    def image(self, name: str) -> memoryview:
+        """Bytes of an image, as a view into the mapped data file."""
+        offset, size, _, _ = self.entries[name]
+        return self._view[offset:offset + size]
+
+    def gt_bytes(self, name: str) -> Optional[memoryview]:
+        """Ground truth bytes of an image, as a view into the mapped data file (None if it has none)."""
+        _, _, offset, size = self.entries[name]
+        return self._view[offset:offset + size] if offset >= 0 else None
+
+    def gt(self, name: str) -> Optional[str]:
+        """Ground truth of an image (None if it has none)."""
+        data = self.gt_bytes(name)
+        return str(data, "utf-8") if data is not None else None
+
+    def read(self, file_name: str) -> Optional[memoryview]:
+        """Bytes of a packed file by its dataset name (an image or a '.gt.txt' file), None if not packed."""
+        if file_name.endswith('.gt.txt'):
+            name = self._gt_names.get(file_name[:-len('.gt.txt')])
+            return self.gt_bytes(name) if name is not None else None
+        return self.image(file_name) if file_name in self.entries else None
+
+    def close(self) -> None:
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+
+_readers: Dict[str, Optional[PackReader]] = {}
+_readers_lock = threading.Lock()
+
+
+def get_pack(folder: Union[str, Path]) -> Optional[PackReader]:
+    """Reader of the pack of a folder, if it was packed (readers are opened once per process).
+
+    A pack whose folder changed since it was packed (e.g., an edited ground truth) is
+    not used, with a warning: the loose files are read instead until it is repacked.
+    """
+    folder = Path(os.path.normpath(folder)).as_posix()
+    with _readers_lock:
+        if folder not in _readers:
+            try:
+                data_path, index_path = pack_paths(folder)
+            except ValueError:  # Not a corpus folder
+                data_path = index_path = None
+            reader = None
+            if index_path is not None and index_path.exists() and data_path.exists():
+                if is_current(folder, index_path):
+                    reader = PackReader(data_path, index_path)
+                else:
+                    print(f"Warning: {folder} changed since it was packed, reading its loose files "
+                          f"(repack it with python -m utils.pack {folder})")
+            _readers[folder] = reader
+        return _readers[folder]
+
+
+def read_packed(path: Union[str, Path]) -> Optional[memoryview]:
+    """Bytes of a dataset file from its folder's pack (images and '.gt.txt' files), or None if not packed."""
+    path = Path(path)
+    pack = get_pack(path.parent)
+    return pack.read(path.name) if pack is not None else None
+
+
+def benchmark(folder: str, samples: int = 200, seed: int = 0) -> Dict[str, float]:
+    """Compare the time to load a random sample of images and ground truth, loose files vs pack.
+
+    Returns:
+        Seconds per sample for each layout
+    """
+    pack = get_pack(folder)
+    if pack is None:
+        raise FileNotFoundError(f"No pack for {folder}, pack it first")
+    names = random.Random(seed).choices(pack.names(), k=samples)
+
+    start = time.perf_counter()
+    for name in names:
+        image_path = Path(folder) / name
+        with open(image_path, "rb") as f:
+            f.read()
+        with open(gt_path_for(image_path), "r") as f:
+            f.read()
+    loose = (time.perf_counter() - start) / samples
+
+    start = time.perf_counter()
+    for name in names:
+        bytes(pack.image(name))
+        pack.gt(name)
+    packed = (time.perf_counter() - start) / samples
+
+    return {"loose": loose, "packed": packed}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pack corpus folders into memory-mapped data files")
+    parser.add_argument('folders', nargs='*', help="Subcategory folders (default: every corpus subcategory)")
+    parser.add_argument('--benchmark', action='store_true', help='Compare random-sample load time of loose files vs packs')
+    parser.add_argument('--samples', type=int, default=200, help='Images loaded per benchmark (default: 200)')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if not args.folders:
+        from utils.catalog import get_catalog
+        args.folders = get_catalog().discover()
+
+    if args.benchmark:
+        for folder in args.folders:
+            timings = benchmark(folder, args.samples)
+            print(f"{folder}: loose {timings['loose'] * 1e6:.0f} µs, packed {timings['packed'] * 1e6:.0f} µs per image "
+                  f"({timings['loose'] / timings['packed']:.1f}x)")
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for data_path in executor.map(pack_folder, args.folders):
+                print(f"Packed {data_path}")
@@ -0,0 +1,142 @@
+import hashlib
+import io
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from config.schemas import PreprocessingProfile
+from utils.archive import read_dataset_buffer
+
+CACHE_ROOT = Path(".cache/preprocessed")
+
+MIME_TYPES = {"png": "image/png", "webp": "image/webp"}
+
+
+def profile_key(profile: PreprocessingProfile) -> str:
+    """Short key identifying the settings of a profile, so editing a profile invalidates its cache."""
+    return hashlib.sha1(profile.model_dump_json().encode()).hexdigest()[:12]
+
+
+def preprocess_image(data: Union[bytes, memoryview], profile: PreprocessingProfile) -> bytes:
+    """Apply a preprocessing profile to an encoded image.
+
+    The image is downscaled to the target height (never upscaled), converted to
+    grayscale or bilevel, and re-encoded losslessly with maximum compression.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        if profile.target_height and img.height > profile.target_height:
+            width = max(1, round(img.width * profile.target_height / img.height))
+            img = img.resize((width, profile.target_height), Image.Resampling.LANCZOS)
+
+        if profile.color == "grayscale":
+            img = img.convert("L")
+        elif profile.color == "bilevel":
+            threshold = profile.bilevel_threshold
+            img = img.convert("L").point(lambda value: 255 if value >= threshold else 0, mode="1")
+
+        output = io.BytesIO()
+        if profile.format == "webp":
+            # WebP only stores RGB(A)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if img.mode in ("LA", "P", "PA") else "RGB")
+            img.save(output, "WebP", lossless=True, quality=100, method=6)
+        else:
+            img.save(output, "PNG", optimize=True)
+        return output.getvalue()
+
+
+@lru_cache(maxsize=None)
+def _load_profiles():
+    from config.loader import ConfigLoader
+    return ConfigLoader().load_preprocessing_config()
+
+
+def get_profile(provider: str) -> Optional[Tuple[str, PreprocessingProfile]]:
+    """Get the (name, profile) used for a provider, None if its images are sent unchanged."""
+    config = _load_profiles()
+    name = config.profile_for(provider)
+    return (name, config.profiles[name]) if name else None
+
+
+def load_image(image_path: str, provider: str = "",
+               profile: Optional[Tuple[str, PreprocessingProfile]] = None) -> Tuple[Union[bytes, memoryview], str, Optional[str]]:
+    """Get the payload of an image for a provider, preprocessed with its profile.
+
+    Preprocessed images are cached by content hash and profile settings, so each image
+    is only processed once per profile.
+
+    Args:
+        image_path: Path to the dataset image
+        provider: Provider the image is sent to (e.g., 'OpenAI')
+        profile: (name, profile) to use instead of the provider's profile
+
+    Returns:
+        Tuple of (image bytes, MIME type, profile name or None if unchanged)
+    """
+    data = read_dataset_buffer(image_path)
+    profile = profile or get_profile(provider)
+    if profile is None:
+        return data, MIME_TYPES["png"], None
+
+    name, settings = profile
+    cache_path = CACHE_ROOT / profile_key(settings) / f"{hashlib.sha256(data).hexdigest()}.{settings.format}"
+    if cache_path.exists():
+        return cache_path.read_bytes(), MIME_TYPES[settings.format], name
+
+    processed = preprocess_image(data, settings)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(processed)
+    os.replace(temp_path, cache_path)
+    return processed, MIME_TYPES[settings.format], name
+
+
+def compare_profiles(category: Optional[str] = None, model: Optional[str] = None):
+    """Compare payload size, latency and error rates per model and preprocessing profile.
+
+    Returns:
+        DataFrame indexed by (model, preprocessing) with mean payload bytes, time, CER and WER
+    """
+    from utils.warehouse import load_results
+
+    df = load_results(columns=["model", "preprocessing", "payload_bytes", "time", "cer", "wer"],
+                      category=category, model=model)
+    df["preprocessing"] = df["preprocessing"].fillna("none")
+    return (df.groupby(["model", "preprocessing"])
+              .agg(images=("cer", "size"), payload_bytes=("payload_bytes", "mean"),
+                   time=("time", "mean"), cer=("cer", "mean"), wer=("wer", "mean"))
+              .round(3))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Preprocess images with a profile or compare the results of profiles")
+    parser.add_argument('--compare', action='store_true', help='Compare payload size, latency and CER per model and profile')
+    parser.add_argument('--warm', metavar='FOLDER', help='Preprocess every image of a folder with --profile ahead of a run')
+    parser.add_argument('--profile', help='Profile name from preprocessing_config.yaml')
+    parser.add_argument('--category', help='Only compare results of this category')
+    args = parser.parse_args()
+
+    if args.compare:
+        print(compare_profiles(category=args.category).to_string())
+    elif args.warm:
+        from utils.catalog import list_images
+
+        config = _load_profiles()
+        if args.profile not in config.profiles:
+            parser.error(f"Unknown profile: {args.profile}. Available: {', '.join(config.profiles)}")
+        original = processed = 0
+        for name in list_images(args.warm):
+            image_path = os.path.join(args.warm, name)
+            original += len(read_dataset_buffer(image_path))
+            processed += len(load_image(image_path, profile=(args.profile, config.profiles[args.profile]))[0])
+        print(f"{args.warm}: {original} -> {processed} bytes ({processed / max(original, 1):.0%})")
+    else:
+        parser.print_help()
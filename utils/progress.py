@@ -0,0 +1,70 @@
+import asyncio
+import time
+from typing import Callable, Dict, Optional
+
+from rich.console import Console
+from rich.live import Live
+from rich.table import Table
+
+
+class ProgressTable:
+    """Compact progress of a run: one row per model, in place of the per-result output.
+
+    Rows show the results completed and failed, the requests in flight, the throughput
+    and the running mean CER of each model; status adds a caption (e.g., the ETA).
+
+    Args:
+        metrics: Metric summaries per model display name, updated as results come in
+        failed: Number of failed images per model display name
+        in_flight: Requests in flight of a model, by display name
+        status: Caption under the table
+    """
+
+    def __init__(self, metrics: Dict[str, Dict], failed: Dict[str, int], in_flight: Callable[[str], int],
+                 status: Optional[Callable[[], str]] = None):
+        self.metrics = metrics
+        self.failed = failed
+        self.in_flight = in_flight
+        self.status = status
+        self.start = time.time()
+
+    def render(self) -> Table:
+        elapsed = max(time.time() - self.start, 1e-9)
+        table = Table(title="Progress", caption=self.status() if self.status else None, title_style="bold blue")
+        table.add_column("Model", style="bold blue")
+        for column in ("Completed", "Failed", "In flight", "Results/min", "CER"):
+            table.add_column(column, justify="right")
+        for name, stats in self.metrics.items():
+            completed = stats["cer"].count
+            table.add_row(
+                name,
+                str(completed),
+                str(self.failed.get(name, 0)),
+                str(self.in_flight(name)),
+                f"{completed * 60 / elapsed:.1f}",
+                f"{stats['cer'].mean:.2%}" if completed else "-",
+            )
+        return table
+
+    async def show(self, console: Console, interval: float = 1.0, snapshot_interval: float = 30.0) -> None:
+        """Keep the table up to date until cancelled.
+
+        On a terminal the table is redrawn in place every interval seconds; otherwise
+        (logs of headless runs) a snapshot is printed every snapshot_interval seconds
+        and once more when the display stops.
+        """
+        if console.is_terminal:
+            with Live(self.render(), console=console, auto_refresh=False) as live:
+                try:
+                    while True:
+                        await asyncio.sleep(interval)
+                        live.update(self.render(), refresh=True)
+                finally:
+                    live.update(self.render(), refresh=True)
+        else:
+            try:
+                while True:
+                    await asyncio.sleep(snapshot_interval)
+                    console.print(self.render())
+            finally:
+                console.print(self.render())
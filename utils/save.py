@@ -1,9 +1,13 @@
 from models.model_utils import get_model_display_name
+from evaluation.stats import MetricStats, METRICS, STREAMING_METRICS, summarize, new_model_stats, add_result
+from utils.archive import read_dataset_file
+from utils.catalog import result_path
 
+import io
 import json
 import os
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 from collections import defaultdict
 
 from rich.console import Console
@@ -41,8 +45,8 @@ def copy_image_for_web(image_path: str) -> bool:
         if web_image_path.exists():
             return True
         
-        # Open and convert image
-        with Image.open(image_path) as img:
+        # Open and convert image (read through the archive when the dataset wasn't extracted)
+        with Image.open(io.BytesIO(read_dataset_file(image_path))) as img:
             # Convert to RGB if necessary (for WebP compatibility)
             if img.mode in ('RGBA', 'LA', 'P'):
                 img = img.convert('RGB')
@@ -78,7 +82,11 @@ def _save_to_json(file_path: str, data: Dict[str, Any]) -> None:
 
 
 def to_json(model, gt: str, response, wer: float, cer: float, 
-           accuracy: float, exec_time: float, image_path: str) -> None:
+           accuracy: float, exec_time: Optional[float], image_path: str, run_id: Optional[str] = None,
+           preprocessing: Optional[str] = None, payload_bytes: Optional[int] = None,
+           packed_lines: Optional[int] = None, batch_id: Optional[str] = None,
+           ttft: Optional[float] = None, tokens_per_sec: Optional[float] = None, truncated: bool = False,
+           duplicate_of: Optional[str] = None, batch_time: Optional[float] = None) -> None:
     """Save individual image evaluation results.
     
     Args:
@@ -88,21 +96,22 @@ def to_json(model, gt: str, response, wer: float, cer: float,
         wer: Word Error Rate
         cer: Character Error Rate
         accuracy: Accuracy score
-        exec_time: Execution time in seconds
+        exec_time: Execution time in seconds (None for batch results, which have no request latency)
         image_path: Path to the evaluated image (e.g., 'GT4HistOCR/corpus/EarlyModernLatin/1471-Orthographia-Tortellius/00001.bin.png')
+        run_id: Identifier of the benchmark run that produced the result
+        preprocessing: Name of the preprocessing profile applied to the image (None if sent unchanged)
+        payload_bytes: Size of the image sent to the model
+        packed_lines: Number of lines sent in the same request, for multi-line requests
+        batch_id: Provider batch that produced the result, for batch mode
+        ttft: Time to first token in seconds, for streamed responses
+        tokens_per_sec: Output tokens per second after the first token, for streamed responses
+        truncated: Whether the generation was cut off at the ground truth based output limit
+        duplicate_of: Byte-identical image whose transcription was reused for this one
+        batch_time: Share of the batch's wall time, for batch mode
     """
     
-    path = Path(image_path)
-    
-    # Extract the filename with double extension preserved (e.g., "00001.bin" from "00001.bin.png")
-    # Remove only the final .png extension to preserve the double extension pattern
-    if path.name.endswith('.png'):
-        base_filename = path.name[:-4]  # Remove '.png' to get "00001.bin" or "00283.nrm"
-    else:
-        # Fallback: use stem (filename without final extension)
-        base_filename = path.stem
-    
-    file_path = Path("docs/data/json") / path.parent / f"{base_filename}.json"
+    # Keeps the double extension (e.g., "00001.bin.json" for "00001.bin.png")
+    file_path = result_path(image_path)
     
     # Use standardized display name instead of raw model ID
     display_name = get_model_display_name(model.id)
@@ -117,17 +126,38 @@ def to_json(model, gt: str, response, wer: float, cer: float,
             "time": exec_time
         }
     }
+    if run_id:
+        data[display_name]["run_id"] = run_id
+    if preprocessing:
+        data[display_name]["preprocessing"] = preprocessing
+    if payload_bytes is not None:
+        data[display_name]["payload_bytes"] = payload_bytes
+    if packed_lines:
+        data[display_name]["packed_lines"] = packed_lines
+    if batch_id:
+        data[display_name]["batch_id"] = batch_id
+    if batch_time is not None:
+        data[display_name]["batch_time"] = batch_time
+    if ttft is not None:
+        data[display_name]["ttft"] = ttft
+    if tokens_per_sec is not None:
+        data[display_name]["tokens_per_sec"] = tokens_per_sec
+    if truncated:
+        data[display_name]["truncated"] = True
+    if duplicate_of:
+        data[display_name]["duplicate_of"] = duplicate_of
     _save_to_json(file_path, data)
     
     # Copy and convert image for web display
     copy_image_for_web(image_path)
 
 
-def aggregate_folder_results(folder_path: str) -> Dict[str, Any]:
+def aggregate_folder_results(folder_path: str, rollups: bool = True) -> Dict[str, Any]:
     """Manually aggregate results from all JSON files in a folder and calculate average metrics per model.
     
     Args:
         folder_path: Path to folder containing JSON files (e.g., 'docs/data/json/GT4HistOCR/corpus/EarlyModernLatin/1471-Orthographia-Tortellius')
+        rollups: Whether to refresh the category and corpus rollups afterwards
     
     Returns:
         Dictionary with aggregated results per model
@@ -137,15 +167,11 @@ def aggregate_folder_results(folder_path: str) -> Dict[str, Any]:
     if not folder_path.exists():
         raise FileNotFoundError(f"Folder not found: {folder_path}")
     
-    # Collect all metrics per model
-    model_metrics = defaultdict(lambda: {
-        'wer': [],
-        'cer': [],
-        'accuracy': [],
-        'time': []
-    })
+    # Collect mergeable summaries of all metrics per model, seeded by subcategory and model so
+    # re-aggregating gives the same intervals
+    model_metrics = {}
     
-    json_files = list(folder_path.glob("*.json"))
+    json_files = sorted(folder_path.glob("*.json"))
     if not json_files:
         raise ValueError(f"No JSON files found in {folder_path}")
     
@@ -156,11 +182,10 @@ def aggregate_folder_results(folder_path: str) -> Dict[str, Any]:
             
             # Extract metrics for each model in this file
             for model_id, metrics in data.items():
-                if isinstance(metrics, dict) and all(key in metrics for key in ['wer', 'cer', 'accuracy', 'time']):
-                    model_metrics[model_id]['wer'].append(metrics['wer'])
-                    model_metrics[model_id]['cer'].append(metrics['cer'])
-                    model_metrics[model_id]['accuracy'].append(metrics['accuracy'])
-                    model_metrics[model_id]['time'].append(metrics['time'])
+                if isinstance(metrics, dict) and all(key in metrics for key in METRICS):
+                    if model_id not in model_metrics:
+                        model_metrics[model_id] = new_model_stats(seed=f"{folder_path.parent.name}/{folder_path.name}/{model_id}")
+                    add_result(model_metrics[model_id], metrics)
         
         except (json.JSONDecodeError, KeyError) as e:
             print(f"Warning: Skipping invalid JSON file {json_file}: {e}")
@@ -177,28 +202,174 @@ def aggregate_folder_results(folder_path: str) -> Dict[str, Any]:
     if source_path.startswith('docs/data/json/'):
         source_path = source_path[15:]  # Remove 'docs/data/json/' prefix
     
-    for model_id, metrics in model_metrics.items():
-        if metrics['wer']:  # Ensure we have data
+    for model_id, stats in model_metrics.items():
+        if stats['wer'].count:  # Ensure we have data
             aggregated_results[model_id] = {
                 "source": source_path,
-                "images": len(metrics['wer']),
-                "avg_wer": sum(metrics['wer']) / len(metrics['wer']),
-                "avg_cer": sum(metrics['cer']) / len(metrics['cer']),
-                "avg_accuracy": sum(metrics['accuracy']) / len(metrics['accuracy']),
-                "avg_time": sum(metrics['time']) / len(metrics['time'])
+                "images": stats['wer'].count,
+                **summarize(stats)
             }
     
     output_file = f"{folder_path}.json"
     os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
     with open(output_file, 'w') as f:
         json.dump(aggregated_results, f, indent=4)
+    _save_stats(output_file, {model_id: model_metrics[model_id] for model_id in aggregated_results})
     
     console.print(f"\nAggregated results saved to: {output_file}", style="dim")
     console.print(f"Processed {len(json_files)} json files, found {len(aggregated_results)} models", style="dim")
     
+    if rollups:
+        update_rollups(folder_path)
+    
     return aggregated_results
 
 
+def _stats_path(aggregated_file: str) -> Path:
+    """Get the summaries sidecar of an aggregated file (e.g., '1471-Orthographia-Tortellius.stats.json')."""
+    return Path(f"{str(aggregated_file)[:-len('.json')]}.stats.json")
+
+
+def _save_stats(aggregated_file: str, model_stats: Dict[str, Dict[str, MetricStats]]) -> None:
+    """Save the mergeable metric summaries next to an aggregated file.
+    
+    Summaries are kept out of the aggregated file itself so the dashboard only loads the flat fields.
+    """
+    data = {
+        model_id: {metric: summary.to_dict() for metric, summary in stats.items() if metric in METRICS or summary.count}
+        for model_id, stats in model_stats.items()
+    }
+    with open(_stats_path(aggregated_file), 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+
+def _load_stats(aggregated_file: Path, data: Dict[str, Any]) -> Dict[str, Dict[str, MetricStats]]:
+    """Load the metric summaries of every model of an aggregated file.
+    
+    Files aggregated before summaries were stored only carry averages, so their
+    models are approximated as all images sharing the average value.
+    """
+    stats_path = _stats_path(aggregated_file)
+    stored = {}
+    if stats_path.exists():
+        with open(stats_path, 'r') as f:
+            stored = json.load(f)
+    
+    model_stats = {}
+    for model_id, entry in data.items():
+        if not isinstance(entry, dict) or "images" not in entry:
+            continue
+        model_stats[model_id] = new_model_stats()
+        if model_id in stored:
+            model_stats[model_id].update({metric: MetricStats.from_dict(summary) for metric, summary in stored[model_id].items()})
+            continue
+        
+        for metric in METRICS + STREAMING_METRICS:
+            if entry.get(f"avg_{metric}") is None:
+                continue
+            summary = MetricStats()
+            summary.count = entry["images"] if metric in METRICS else entry.get("streamed", entry["images"])
+            summary.mean = entry[f"avg_{metric}"]
+            summary.digest.add(summary.mean, summary.count)
+            summary.bootstrap = None
+            model_stats[model_id][metric] = summary
+    return model_stats
+
+
+def _write_rollup(input_files: List[Path], output_file: Path) -> Dict[str, Any]:
+    """Merge aggregated files into a rollup covering all of them.
+    
+    Args:
+        input_files: Aggregated files of the lower level (e.g., all subcategories of a category)
+        output_file: Rollup file to write (e.g., 'docs/data/json/GT4HistOCR/corpus/EarlyModernLatin.json')
+    
+    Returns:
+        Dictionary with rolled up results per model
+    """
+    model_stats = {}
+    model_sources = defaultdict(int)
+    
+    for input_file in input_files:
+        with open(input_file, 'r') as f:
+            data = json.load(f)
+        
+        for model_id, stats in _load_stats(input_file, data).items():
+            if model_id not in model_stats:
+                model_stats[model_id] = stats
+            else:
+                for metric in METRICS + STREAMING_METRICS:
+                    model_stats[model_id][metric].merge(stats[metric])
+            model_sources[model_id] += data[model_id].get("subcategories", 1)
+    
+    source_path = str(output_file.with_suffix(""))
+    if source_path.startswith('docs/data/json/'):
+        source_path = source_path[15:]  # Remove 'docs/data/json/' prefix
+    
+    rollup = {
+        model_id: {
+            "source": source_path,
+            "images": stats['wer'].count,
+            "subcategories": model_sources[model_id],
+            **summarize(stats)
+        }
+        for model_id, stats in model_stats.items()
+    }
+    
+    if rollup:
+        with open(output_file, 'w') as f:
+            json.dump(rollup, f, indent=4)
+        _save_stats(str(output_file), model_stats)
+    else:
+        for stale_file in (output_file, _stats_path(output_file)):
+            if stale_file.exists():
+                stale_file.unlink()
+    
+    return rollup
+
+
+def _aggregated_children(folder: Path) -> List[Path]:
+    """Get the aggregated files of the sub-folders of a folder (e.g., 'EarlyModernLatin/1471-Orthographia-Tortellius.json')."""
+    if not folder.exists():
+        return []
+    return sorted(
+        Path(f"{child}.json") for child in folder.iterdir()
+        if child.is_dir() and Path(f"{child}.json").exists()
+    )
+
+
+def update_rollups(folder_path: str) -> None:
+    """Refresh the category and corpus rollups after a subcategory aggregate changed.
+    
+    Only the category of the subcategory and the corpus level are recomputed, each from
+    the small aggregated files of the level below.
+    
+    Args:
+        folder_path: Subcategory folder (e.g., 'docs/data/json/GT4HistOCR/corpus/EarlyModernLatin/1471-Orthographia-Tortellius')
+    """
+    category_dir = Path(folder_path).parent
+    corpus_dir = category_dir.parent
+    
+    _write_rollup(_aggregated_children(category_dir), Path(f"{category_dir}.json"))
+    _write_rollup(_aggregated_children(corpus_dir), Path(f"{corpus_dir}.json"))
+
+
+def rebuild_rollups(corpus_path: str = "docs/data/json/GT4HistOCR/corpus", refresh_aggregates: bool = False) -> None:
+    """Rebuild all category rollups and the corpus rollup.
+    
+    Args:
+        corpus_path: Corpus results folder
+        refresh_aggregates: Re-aggregate every subcategory first (adds summaries to older aggregated files)
+    """
+    corpus_dir = Path(corpus_path)
+    for category_dir in sorted(p for p in corpus_dir.iterdir() if p.is_dir()):
+        if refresh_aggregates:
+            for subcategory_dir in sorted(p for p in category_dir.iterdir() if p.is_dir()):
+                aggregate_folder_results(str(subcategory_dir), rollups=False)
+        _write_rollup(_aggregated_children(category_dir), Path(f"{category_dir}.json"))
+    _write_rollup(_aggregated_children(corpus_dir), Path(f"{corpus_dir}.json"))
+    console.print(f"Rollups rebuilt for {corpus_dir}", style="dim")
+
+
 if __name__ == "__main__":
     # Manual example usage if needed
-    aggregate_folder_results('docs/data/json/GT4HistOCR/corpus/EarlyModernLatin/1564-Thucydides-Valla')
\ No newline at end of file
+    aggregate_folder_results('docs/data/json/GT4HistOCR/corpus/EarlyModernLatin/1564-Thucydides-Valla')
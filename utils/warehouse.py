@@ -0,0 +1,247 @@
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from rich.console import Console
+console = Console()
+
+JSON_BASE = Path("docs/data/json/GT4HistOCR/corpus")
+WAREHOUSE_PATH = Path("warehouse/results")
+STATE_FILE = "_state.json"
+
+# Columns stored in every data file, partition columns are encoded in the directory names
+SCHEMA = pa.schema([
+    ("image_id", pa.string()),
+    ("subcategory", pa.string()),
+    ("wer", pa.float64()),
+    ("cer", pa.float64()),
+    ("accuracy", pa.float64()),
+    ("time", pa.float64()),
+    ("response_length", pa.int64()),
+    ("run_id", pa.string()),
+    ("preprocessing", pa.string()),
+    ("payload_bytes", pa.int64()),
+    ("packed_lines", pa.int64()),
+    ("ttft", pa.float64()),
+    ("tokens_per_sec", pa.float64()),
+    ("truncated", pa.bool_()),
+])
+PARTITIONING = ds.partitioning(
+    pa.schema([("category", pa.string()), ("model", pa.string())]),
+    flavor="hive"
+)
+
+
+def _partition_dir(warehouse_path: Path, category: str, model: str) -> Path:
+    """Get the directory of a (category, model) partition."""
+    # Model names may contain '/', keep them a single path component
+    safe_model = model.replace("/", "%2F")
+    return warehouse_path / f"category={category}" / f"model={safe_model}"
+
+
+def _subcategory_signature(folder: Path) -> List[int]:
+    """Cheap change signature of a subcategory folder: file count and latest mtime."""
+    count = 0
+    latest = 0
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.endswith('.json'):
+                count += 1
+                latest = max(latest, entry.stat().st_mtime_ns)
+    return [count, latest]
+
+
+def _find_subcategories(json_base: Path) -> Dict[str, Path]:
+    """Find all subcategory folders with individual results, keyed by 'category/subcategory'."""
+    subcategories = {}
+    if not json_base.exists():
+        return subcategories
+    for category in sorted(p for p in json_base.iterdir() if p.is_dir()):
+        for subcategory in sorted(p for p in category.iterdir() if p.is_dir()):
+            subcategories[f"{category.name}/{subcategory.name}"] = subcategory
+    return subcategories
+
+
+def _read_subcategory(folder: Path) -> Dict[str, Dict[str, list]]:
+    """Read all individual result files of a subcategory into columns grouped by model."""
+    columns_by_model: Dict[str, Dict[str, list]] = {}
+    for json_file in sorted(folder.glob("*.json")):
+        try:
+            with open(json_file, 'r') as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            console.print(f"Warning: Skipping invalid JSON file {json_file}: {e}", style="yellow")
+            continue
+
+        image_id = json_file.name[:-5]  # e.g. "00001.bin" from "00001.bin.json"
+        for model, metrics in data.items():
+            if not isinstance(metrics, dict) or not all(key in metrics for key in ['wer', 'cer', 'accuracy', 'time']):
+                continue
+            columns = columns_by_model.setdefault(model, {name: [] for name in SCHEMA.names})
+            columns["image_id"].append(image_id)
+            columns["subcategory"].append(folder.name)
+            columns["wer"].append(metrics["wer"])
+            columns["cer"].append(metrics["cer"])
+            columns["accuracy"].append(metrics["accuracy"])
+            columns["time"].append(metrics["time"])
+            columns["response_length"].append(len(metrics.get("response") or ""))
+            columns["run_id"].append(metrics.get("run_id"))
+            columns["preprocessing"].append(metrics.get("preprocessing"))
+            columns["payload_bytes"].append(metrics.get("payload_bytes"))
+            columns["packed_lines"].append(metrics.get("packed_lines"))
+            columns["ttft"].append(metrics.get("ttft"))
+            columns["tokens_per_sec"].append(metrics.get("tokens_per_sec"))
+            columns["truncated"].append(metrics.get("truncated", False))
+    return columns_by_model
+
+
+def _remove_subcategory(warehouse_path: Path, category: str, subcategory: str) -> None:
+    """Remove the data files of a subcategory from every model partition of its category."""
+    category_dir = warehouse_path / f"category={category}"
+    if not category_dir.exists():
+        return
+    for data_file in category_dir.glob(f"model=*/{subcategory}.parquet"):
+        data_file.unlink()
+        if not any(data_file.parent.iterdir()):
+            data_file.parent.rmdir()
+
+
+def _write_subcategory(warehouse_path: Path, key: str, folder: Path) -> int:
+    """Rewrite the data files of one subcategory. Returns the number of rows written."""
+    category, subcategory = key.split("/", 1)
+    columns_by_model = _read_subcategory(folder)
+    _remove_subcategory(warehouse_path, category, subcategory)
+
+    rows = 0
+    for model, columns in columns_by_model.items():
+        partition = _partition_dir(warehouse_path, category, model)
+        partition.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pydict(columns, schema=SCHEMA)
+        tmp_path = partition / f".{subcategory}.parquet.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, partition / f"{subcategory}.parquet")
+        rows += table.num_rows
+    return rows
+
+
+def sync_warehouse(json_base: str = str(JSON_BASE), warehouse_path: str = str(WAREHOUSE_PATH),
+                   full: bool = False, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Bring the columnar results dataset in line with the JSON results.
+
+    The dataset is partitioned by category and model, with one Parquet file per
+    subcategory inside each partition. Only subcategories whose JSON files changed
+    since the last sync are re-read and rewritten.
+
+    Args:
+        json_base: Root of the individual JSON results (e.g., 'docs/data/json/GT4HistOCR/corpus')
+        warehouse_path: Root directory of the Parquet dataset
+        full: Rebuild every subcategory, ignoring the sync state
+        workers: Number of threads used to read and write subcategories
+
+    Returns:
+        Dictionary with sync statistics
+    """
+    json_base = Path(json_base)
+    warehouse_path = Path(warehouse_path)
+    state_path = warehouse_path / STATE_FILE
+
+    if full and warehouse_path.exists():
+        shutil.rmtree(warehouse_path)
+    warehouse_path.mkdir(parents=True, exist_ok=True)
+
+    state = {}
+    if state_path.exists():
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+
+    subcategories = _find_subcategories(json_base)
+    signatures = {key: _subcategory_signature(folder) for key, folder in subcategories.items()}
+    changed = [key for key in subcategories if state.get(key) != signatures[key]]
+    removed = [key for key in state if key not in subcategories]
+
+    for key in removed:
+        _remove_subcategory(warehouse_path, *key.split("/", 1))
+        del state[key]
+
+    rows = 0
+    if changed:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            rows = sum(executor.map(lambda key: _write_subcategory(warehouse_path, key, subcategories[key]), changed))
+        for key in changed:
+            state[key] = signatures[key]
+
+    tmp_state = state_path.with_suffix(".tmp")
+    with open(tmp_state, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_state, state_path)
+
+    stats = {
+        "subcategories": len(subcategories),
+        "updated": len(changed),
+        "removed": len(removed),
+        "rows_written": rows
+    }
+    console.print(f"Warehouse synced: {stats['updated']} updated, {stats['removed']} removed, "
+                  f"{stats['rows_written']} rows written", style="dim")
+    return stats
+
+
+def load_results(columns: Optional[Sequence[str]] = None, category: Optional[str] = None,
+                 subcategory: Optional[str] = None, model: Optional[str] = None,
+                 warehouse_path: str = str(WAREHOUSE_PATH)) -> pd.DataFrame:
+    """Query the columnar results dataset.
+
+    Partition filters (category, model) prune whole directories, data files are memory-mapped.
+
+    Args:
+        columns: Columns to load (all columns if None)
+        category: Only load this category (e.g., 'EarlyModernLatin')
+        subcategory: Only load this subcategory (e.g., '1471-Orthographia-Tortellius')
+        model: Only load this model display name (e.g., 'gpt-4o')
+
+    Returns:
+        DataFrame with one row per (image, model) result
+    """
+    warehouse_path = Path(warehouse_path)
+    if not warehouse_path.exists():
+        raise FileNotFoundError(f"Warehouse not found: {warehouse_path}. Run sync_warehouse() first")
+
+    dataset = ds.dataset(
+        str(warehouse_path),
+        format="parquet",
+        # Explicit schema, so files written before a column was added read it as null
+        schema=pa.unify_schemas([SCHEMA, PARTITIONING.schema]),
+        partitioning=PARTITIONING,
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+        exclude_invalid_files=True,
+        ignore_prefixes=[".", "_"]
+    )
+
+    expression = None
+    for name, value in (("category", category), ("subcategory", subcategory), ("model", model)):
+        if value is None:
+            continue
+        condition = ds.field(name) == value
+        expression = condition if expression is None else expression & condition
+
+    # Hive partition values are URI-decoded on read, so '%2F' in model directories maps back to '/'
+    return dataset.to_table(columns=list(columns) if columns else None, filter=expression).to_pandas()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sync the columnar results dataset from the JSON results")
+    parser.add_argument('--full', action='store_true', help='Rebuild the whole dataset instead of changed subcategories only')
+    args = parser.parse_args()
+
+    sync_warehouse(full=args.full)